@@ -28,9 +28,12 @@
 from . import utilities
 from . import uniformizations
 from . import formulas
+from . import time
 from . import trees
 from . import worlds
 from . import assets
+from . import portfolios
+from . import calculators
 from . import solutions_of_exercises
 from . import demos
 
@@ -31,6 +31,7 @@
 ########################################################################
 
 from ..formulas import *
+from ..trees import *
 from ..worlds import *
 
 class Asset():
@@ -42,7 +43,7 @@ class Asset():
   def get_value(self, time):
     """Returns value at specific time."""
     if time == 0:
-      if hasattr(self, initial_value):
+      if hasattr(self, 'initial_value'):
         return self.initial_value
       else:
         return NotImplementedError('Primitively implemented abstract method')
@@ -315,6 +316,103 @@ class NoCostsNoDividendsAsset(NoCostsAsset, NoDividendsAsset):
   """Asset which costs nothing to maintain and which produce no dividends."""
   pass
 
+class DividendSchedule():
+  r"""
+  Discrete (cash) dividends paid at given times, in given amounts.
+
+  Sums of dividends over time intervals, plain or discounted, are answered
+  from prefix sums of the amounts and a binary search for the endpoints of
+  the interval, instead of a scan over all dividends. Prefix sums of the
+  amounts are computed at initialization, and those of the discounted
+  amounts once for every interest rate asked for.
+  """
+
+  def __init__(self, times, amounts):
+    import numpy as np
+    times = np.asarray(times, dtype = float)
+    amounts = np.asarray(amounts, dtype = float)
+    if times.shape != amounts.shape or times.ndim != 1:
+      raise ValueError('Expected times and amounts as lists of same length')
+    order = np.argsort(times, kind = 'stable')
+    self.times = times[order]
+    self.amounts = amounts[order]
+    # Item idx is the sum of the first idx amounts
+    self.cumulative_amounts = np.concatenate([[0.0], np.cumsum(self.amounts)])
+    self.cumulative_discounted_amounts_by_interest_rate = {}
+
+  def __len__(self):
+    """Returns the number of dividends in the schedule."""
+    return len(self.times)
+
+  def count_dividends_paid_until(self, time):
+    """Returns number of dividends paid at or before time (or array of times)."""
+    import numpy as np
+    return np.searchsorted(self.times, time, side = 'right')
+
+  def get_cumulative_discounted_amounts(self, interest_rate):
+    r"""
+    Returns array whose item idx is the sum of the first idx amounts,
+    each discounted to time 0 at given (continuously compounded) rate.
+    """
+    import numpy as np
+    if interest_rate not in self.cumulative_discounted_amounts_by_interest_rate:
+      self.cumulative_discounted_amounts_by_interest_rate[interest_rate] = np.concatenate(
+          [[0.0], np.cumsum(self.amounts*np.exp(-interest_rate*self.times))])
+    return self.cumulative_discounted_amounts_by_interest_rate[interest_rate]
+
+  def get_dividends(self, initial_time, final_time):
+    r"""
+    Returns sum of dividends paid after initial_time and up to final_time.
+
+    Times can be numbers or arrays (returning then an array).
+    """
+    sums = self.cumulative_amounts[self.count_dividends_paid_until(final_time)] \
+        - self.cumulative_amounts[self.count_dividends_paid_until(initial_time)]
+    return sums if sums.ndim else float(sums)
+
+  def get_present_value_of_dividends(self, initial_time, final_time, interest_rate):
+    r"""
+    Returns value at initial_time of the dividends paid after initial_time
+    and up to final_time, discounted at given continuously compounded rate.
+
+    Times can be numbers or arrays (returning then an array).
+    """
+    import numpy as np
+    cumulative_discounted_amounts = self.get_cumulative_discounted_amounts(interest_rate)
+    present_values = np.exp(interest_rate*np.asarray(initial_time, dtype = float))*(
+        cumulative_discounted_amounts[self.count_dividends_paid_until(final_time)]
+        - cumulative_discounted_amounts[self.count_dividends_paid_until(initial_time)])
+    return present_values if present_values.ndim else float(present_values)
+
+  def get_present_values_of_dividends_at_levels(self, number_of_steps, step_length,
+      interest_rate, horizon_levels = None):
+    r"""
+    Returns array whose item idx is the value at the time of level idx of
+    a lattice (that is, idx*step_length) of the dividends paid after it
+    and up to the time of the last level.
+
+    If horizon_levels is given (as a list of levels), returns instead an
+    array with a row per horizon level, where dividends are only counted
+    up to the time of that level (none after it).
+
+    This is used for lattices with escrowed dividends: the lattice models
+    the asset value minus the present value of those dividends, which
+    evolves without jumps at dividend payments and thus recombines, and
+    the values at the nodes are obtained by adding the present values back.
+    Dividends paid after the expiry of an option do not affect it, so they
+    are escrowed only up to that expiry, its horizon level.
+    """
+    import numpy as np
+    times_of_levels = step_length*np.arange(number_of_steps + 1)
+    if horizon_levels is None:
+      final_times = number_of_steps*step_length
+    else:
+      horizon_times = step_length*np.asarray(horizon_levels, dtype = float)[:, None]
+      final_times = np.maximum(horizon_times, times_of_levels)
+      times_of_levels = np.broadcast_to(times_of_levels, final_times.shape)
+    return self.get_present_value_of_dividends(
+        times_of_levels, final_times, interest_rate)
+
 class DiscreteAsset(Asset):
   """Asset which has value for (finitely many or infinitely many) discrete values."""
   pass
@@ -330,11 +428,33 @@ class EqualUpDownBinaryTreeAsset(BinaryTreeAsset):
   r"""
   Asset which behaves as a binary tree. In every step, the value of the asset
   is bumped up or down by a specific value.
+
+  Optionally, a schedule of jump amounts can be given, its item idx being
+  the jump amount at step idx + 1 (steps beyond the schedule use the jump
+  amount). On the risk-neutral lattice the node after idx up jumps and
+  level - idx down jumps is then worth initial_value + a*(2*idx - level),
+  a being the jump amount of that step, so that the lattice still recombines.
+
+  The asset can also pay discrete dividends, given by a DividendSchedule.
+  Lattices then use escrowed dividends: the jumps apply to the asset value
+  minus the present value of the dividends up to the last level of the
+  lattice (or up to the expiry of each option priced on it, see
+  build_risk_neutral_lattice), and the values at the nodes add that
+  present value back.
   """
   
-  def __init__(self, initial_value, jump_amount):
+  def __init__(self, initial_value, jump_amount, jump_amount_schedule = None,
+      dividend_schedule = None):
     self.initial_value = initial_value
     self.jump_amount = jump_amount
+    self.jump_amount_schedule = jump_amount_schedule
+    self.dividend_schedule = dividend_schedule
+
+  def get_dividends(self, initial_time, final_time):
+    """Returns sum of discrete dividends paid in the time interval."""
+    if self.dividend_schedule is None:
+      return 0
+    return self.dividend_schedule.get_dividends(initial_time, final_time)
   
   @staticmethod
   def produce_all_possible_paths_of_signs(length):
@@ -374,11 +494,12 @@ class EqualUpDownBinaryTreeAsset(BinaryTreeAsset):
         return parent_value - jump_amount
       else:
         return parent_value + jump_amount
-    inner_formula = Formula(inner_function)
+    # The same values come again and again on a recombining tree
+    inner_formula = Formula(inner_function, memoize = True)
     processing_dict = {
-        'parent_value': ('kwargs', 'parent_node_dict', 'asset_value'), 
+        'parent_value': ('kwargs', 'parent_dict', 'asset_value'), 
         'jump_amount': ('kwargs', 'all_other_args', 'jump_amount'),
-        'is_it_left_instead_or_right': ('kwargs', '', 'is_it_left_instead_or_right')}
+        'is_it_left_instead_or_right': ('kwargs', 'all_other_args', 'is_it_left_instead_of_right')}
     formula_on_dicts = FormulaOnDicts(processing_dict, inner_formula)
     return formula_on_dicts
     
@@ -396,6 +517,211 @@ class EqualUpDownBinaryTreeAsset(BinaryTreeAsset):
     ### WORK HERE ###
     return NotImplementedError('Working on it')
 
+  def get_jump_amounts_by_level(self, number_of_steps):
+    r"""
+    Returns list whose item idx is the jump amount which leads to the nodes
+    of level idx of a lattice with number_of_steps steps (the item at
+    level 0 is not used to build a lattice, and is the one of level 1).
+    """
+    if self.jump_amount_schedule is None:
+      schedule = []
+    else:
+      schedule = list(self.jump_amount_schedule[:number_of_steps])
+    schedule += [self.jump_amount]*(number_of_steps - len(schedule))
+    return schedule[:1] + schedule if schedule else [self.jump_amount]
+
+  def build_risk_neutral_lattice(self, world, number_of_steps, step_length,
+      dividend_horizon_levels = None):
+    r"""
+    Returns a FrozenRecombiningBinaryTree modeling the asset in a risk-neutral
+    world for number_of_steps steps, each lasting step_length.
+
+    The node reached after idx up jumps (right child operations) and
+    level - idx down jumps (left child operations) holds in its level dict
+    the value of the asset, `asset_value`, and the risk-neutral probability
+    of the up jump from it, `probability_of_right`. The shared data has
+    `step_length` and the one-step `discount_factor`.
+
+    If the asset pays discrete dividends, dividend_horizon_levels can give
+    the expiry levels of the options to be priced on the lattice, so that
+    dividends are escrowed up to each expiry: the columns then have a
+    leading axis with one row per option.
+
+    Raises an Error if any probability falls outside [0, 1], that is,
+    if the jump amount is too small for the world to be arbitrage-free.
+    """
+    return self.static_build_risk_neutral_lattice(
+        initial_value = self.initial_value,
+        jump_amounts_by_level = self.get_jump_amounts_by_level(number_of_steps),
+        interest_rate = world.get_interest_rate(),
+        step_length = step_length,
+        dividend_schedule = self.dividend_schedule,
+        dividend_horizon_levels = dividend_horizon_levels)
+
+  @staticmethod
+  def static_build_risk_neutral_lattice(initial_value, jump_amounts_by_level,
+      interest_rate, step_length, lattice = None,
+      derivatives_of_jump_amounts_by_level = None, dividend_schedule = None,
+      dividend_horizon_levels = None, skip_checks = False):
+    r"""
+    Builds (or rebuilds) the risk-neutral lattice of an asset behaving as an
+    instance of this class, with jump amounts given level by level (as
+    produced by get_jump_amounts_by_level), and possibly paying dividends
+    given by a DividendSchedule (modeled as escrowed dividends, up to the
+    last level or, if dividend_horizon_levels is given, up to each of those
+    levels, with a row per level in the columns; see
+    DividendSchedule.get_present_values_of_dividends_at_levels).
+
+    If a lattice of the right height is given, its columns are overwritten
+    instead of building a new one, reusing the column `jump_multiplier`
+    (the 2*idx - level of each node) which only depends on the structure.
+
+    If derivatives_of_jump_amounts_by_level is given, as an array whose
+    row idx holds the derivatives of the jump amount of level idx with
+    respect to some parameters, also sets the columns `asset_value_tangents`
+    and `probability_of_right_tangents`, with the derivatives of the
+    corresponding columns with respect to those parameters (one row each).
+
+    Unless skip_checks is True, raises an Error if any probability falls
+    outside [0, 1].
+    """
+    import numpy as np
+    from math import exp
+    number_of_steps = len(jump_amounts_by_level) - 1
+    growth_factor = exp(interest_rate*step_length)
+    if lattice is None:
+      lattice = FrozenRecombiningBinaryTree(height = number_of_steps)
+    elif lattice.get_height() != number_of_steps:
+      raise ValueError('Given lattice does not have the right height')
+    lattice.shared_data['step_length'] = step_length
+    lattice.shared_data['discount_factor'] = 1/growth_factor
+    if derivatives_of_jump_amounts_by_level is not None:
+      derivatives_of_jump_amounts_by_level = np.asarray(
+          derivatives_of_jump_amounts_by_level, dtype = float)
+    if dividend_schedule is not None:
+      if dividend_horizon_levels is not None and derivatives_of_jump_amounts_by_level is not None:
+        raise ValueError('Tangents are not available with dividend horizon levels')
+      present_values_of_dividends = dividend_schedule.get_present_values_of_dividends_at_levels(
+          number_of_steps, step_length, interest_rate, dividend_horizon_levels)
+      # A row per horizon level, if any
+      initial_value = (initial_value - present_values_of_dividends[..., 0])[..., None]
+    for level in range(number_of_steps + 1):
+      if 'jump_multiplier' not in lattice.get_level_dict(level):
+        lattice.set_column('jump_multiplier', level, 2.0*np.arange(level + 1) - level)
+      jump_multipliers = lattice.get_column('jump_multiplier', level)
+      asset_values = initial_value + jump_amounts_by_level[level]*jump_multipliers
+      # The value grown at the interest rate must be the expected value of
+      #the children, initial_value + next_jump_amount*(jump_multipliers +- 1)
+      next_level = min(level + 1, number_of_steps)
+      next_jump_amount = jump_amounts_by_level[next_level]
+      excesses_of_grown_values = asset_values*growth_factor - initial_value
+      probabilities = excesses_of_grown_values/(2*next_jump_amount) - (jump_multipliers - 1)/2
+      if not skip_checks and level < number_of_steps \
+          and (probabilities.min() < 0 or probabilities.max() > 1):
+        raise ValueError('Jump amount too small for a risk-neutral world')
+      if dividend_schedule is not None:
+        asset_values = asset_values + present_values_of_dividends[..., level][..., None]
+      lattice.set_column('asset_value', level, asset_values)
+      lattice.set_column('probability_of_right', level, probabilities)
+      if derivatives_of_jump_amounts_by_level is not None:
+        asset_value_tangents = derivatives_of_jump_amounts_by_level[level][:, None]*jump_multipliers
+        probability_tangents = growth_factor*asset_value_tangents/(2*next_jump_amount) \
+            - derivatives_of_jump_amounts_by_level[next_level][:, None] \
+            *excesses_of_grown_values/(2*next_jump_amount**2)
+        lattice.set_column('asset_value_tangents', level, asset_value_tangents)
+        lattice.set_column('probability_of_right_tangents', level, probability_tangents)
+    return lattice
+
+class ExponentialUpDownBinaryTreeAsset(BinaryTreeAsset):
+  r"""
+  Asset which behaves as a binary tree. In every step, the value of the
+  asset is multiplied or divided by the same factor, exp(volatility*sqrt(step)),
+  as in the Cox-Ross-Rubinstein model.
+
+  The asset can also pay discrete dividends, given by a DividendSchedule,
+  modeled on lattices as escrowed dividends (as for EqualUpDownBinaryTreeAsset).
+  """
+
+  def __init__(self, initial_value, volatility, dividend_schedule = None):
+    self.initial_value = initial_value
+    self.volatility = volatility
+    self.dividend_schedule = dividend_schedule
+
+  def get_dividends(self, initial_time, final_time):
+    """Returns sum of discrete dividends paid in the time interval."""
+    if self.dividend_schedule is None:
+      return 0
+    return self.dividend_schedule.get_dividends(initial_time, final_time)
+
+  def build_risk_neutral_lattice(self, world, number_of_steps, step_length,
+      dividend_horizon_levels = None):
+    r"""
+    Returns a FrozenRecombiningBinaryTree modeling the asset in a risk-neutral
+    world for number_of_steps steps, each lasting step_length.
+
+    The level dicts and shared data are as in the lattices produced by
+    EqualUpDownBinaryTreeAsset.build_risk_neutral_lattice, and so is the
+    use of dividend_horizon_levels.
+    """
+    return self.static_build_risk_neutral_lattice(
+        initial_values = self.initial_value,
+        volatilities = self.volatility,
+        interest_rates = world.get_interest_rate(),
+        number_of_steps = number_of_steps,
+        step_lengths = step_length,
+        dividend_schedule = self.dividend_schedule,
+        dividend_horizon_levels = dividend_horizon_levels)
+
+  @staticmethod
+  def static_build_risk_neutral_lattice(initial_values, volatilities,
+      interest_rates, number_of_steps, step_lengths, dividend_schedule = None,
+      dividend_horizon_levels = None, skip_checks = False):
+    r"""
+    Returns a FrozenRecombiningBinaryTree modeling (in risk-neutral worlds)
+    one or many assets behaving as instances of this class.
+
+    Arguments other than number_of_steps and dividend_schedule can be
+    numbers, or arrays of the same length, case in which every column of
+    the lattice has a leading axis with one row per asset, as well as the
+    discount factor in its shared data. A dividend schedule (modeled as
+    escrowed dividends) needs a single interest rate and step length; with
+    dividend_horizon_levels, the rows are those of the horizon levels (see
+    EqualUpDownBinaryTreeAsset.static_build_risk_neutral_lattice).
+
+    Unless skip_checks is True, raises an Error if any risk-neutral
+    probability falls outside [0, 1].
+    """
+    import numpy as np
+    shared_data = {'step_length': step_lengths}
+    if dividend_schedule is not None:
+      if np.ndim(interest_rates) or np.ndim(step_lengths):
+        raise ValueError('Dividends need a single interest rate and step length')
+      present_values_of_dividends = dividend_schedule.get_present_values_of_dividends_at_levels(
+          number_of_steps, step_lengths, interest_rates, dividend_horizon_levels)
+      initial_values = np.asarray(initial_values, dtype = float) - present_values_of_dividends[..., 0]
+    initial_values, volatilities, interest_rates, step_lengths = (
+        np.asarray(item, dtype = float)[..., None] for item in
+        [initial_values, volatilities, interest_rates, step_lengths])
+    log_jumps = volatilities*np.sqrt(step_lengths)
+    growth_factors = np.exp(interest_rates*step_lengths)
+    # p*exp(log_jump) + (1 - p)*exp(-log_jump) must be the growth factor
+    probabilities = (growth_factors - np.exp(-log_jumps))/(2*np.sinh(log_jumps))
+    if not skip_checks:
+      if number_of_steps and (probabilities.min() < 0 or probabilities.max() > 1):
+        raise ValueError('Volatility too small for a risk-neutral world')
+    shared_data['discount_factor'] = 1/growth_factors
+    lattice = FrozenRecombiningBinaryTree(
+        height = number_of_steps,
+        shared_data = shared_data)
+    for level in range(number_of_steps + 1):
+      asset_values = initial_values*np.exp(log_jumps*(2*np.arange(level + 1) - level))
+      if dividend_schedule is not None:
+        asset_values = asset_values + present_values_of_dividends[..., level][..., None]
+      lattice.set_column('asset_value', level, asset_values)
+      lattice.set_column('probability_of_right', level,
+          np.broadcast_to(probabilities, asset_values.shape))
+    return lattice
+
 ########################################################################
 
 class Derivative(Asset):
@@ -412,7 +738,7 @@ class VanillaOption(Derivative, NoCostsNoDividendsAsset):
   def __init__(self, underlying, expiry, struck):
     self.expiry = expiry
     self.struck = struck
-    super(VanillaOption, self).__init__
+    super(VanillaOption, self).__init__(underlying)
     
   def set_american_or_european(self, is_american_instead_of_european):
     if is_american_instead_of_european:
@@ -432,16 +758,199 @@ class VanillaOption(Derivative, NoCostsNoDividendsAsset):
     
   def value_at_expiry_given_asset_value_at_expiry(self, asset_value_at_expiry):
     if self.is_call:
-      return max(0, asset_value_at_expiry - struck)
+      return max(0, asset_value_at_expiry - self.struck)
     elif self.is_put:
-      return max(0, struck - asset_value_at_expiry)
+      return max(0, self.struck - asset_value_at_expiry)
     else:
       raise ValueError()
 
-  def compute_present_value_in_risk_neutral_world(self, world):
-    """Evaluates asset in a risk-neutral world."""
-    # Can be computed if the underlying is, for example, an EqualUpDownBinaryTreeAsset
-    return NotImplementedError('Primitively implemented abstract method')
+  def compute_present_value_in_risk_neutral_world(self, world, step_length = 1):
+    r"""
+    Evaluates asset in a risk-neutral world.
+
+    The underlying must be able to build a risk-neutral lattice (as, for
+    example, an EqualUpDownBinaryTreeAsset does) whose steps last step_length.
+    By default, a step lasts a unit of time, as between the levels of the
+    modeling tree of an EqualUpDownBinaryTreeAsset.
+    """
+    number_of_steps = self.get_number_of_steps_until_expiry(step_length)
+    lattice = self.underlying.build_risk_neutral_lattice(
+        world = world,
+        number_of_steps = number_of_steps,
+        step_length = step_length)
+    return self.static_price_vanilla_options_on_lattice([self], lattice)[0]
+
+  def get_number_of_steps_until_expiry(self, step_length):
+    """Returns number of steps of given length from present to expiry."""
+    number_of_steps = round(self.expiry/step_length)
+    if abs(number_of_steps*step_length - self.expiry) > 1e-9*max(1, abs(self.expiry)):
+      raise ValueError('Expiry is not a whole number of steps')
+    return number_of_steps
+
+  @staticmethod
+  def static_price_vanilla_options_on_lattice(list_of_options, lattice):
+    r"""
+    Prices many vanilla options on a single risk-neutral lattice of their
+    (common) underlying, returning a list with their present values.
+
+    All options are evaluated together in a single backward pass, each
+    level of the lattice holding a column `option_value` with one row
+    per option. Expiries may differ, but must fall on the step grid of the
+    lattice (given by the `step_length` in its shared data) and must not
+    be beyond its height.
+    """
+    step_length = lattice.shared_data['step_length']
+    return VanillaOption.static_price_vanilla_options_on_lattice_from_arrays(
+        strucks = [option.struck for option in list_of_options],
+        are_calls = [option.is_call for option in list_of_options],
+        are_american = [option.is_american for option in list_of_options],
+        expiry_levels = [option.get_number_of_steps_until_expiry(step_length)
+            for option in list_of_options],
+        lattice = lattice).tolist()
+
+  @staticmethod
+  def static_price_vanilla_options_on_lattice_from_arrays(strucks, are_calls,
+      are_american, expiry_levels, lattice, compute_tangents = False):
+    r"""
+    Prices many vanilla options described by arrays (one item per option)
+    on a single risk-neutral lattice, returning an array of present values.
+
+    The expiry of each option is given by the level of the lattice at
+    which it happens. The columns `asset_value` and `probability_of_right`
+    of the lattice, as well as the `discount_factor` in its shared data,
+    may have a leading axis with one row per option, so that options
+    on different (for example, differently parametrized) lattices of the
+    same height are also priced together.
+
+    If compute_tangents is True, the lattice must also have the columns
+    `asset_value_tangents` and `probability_of_right_tangents` (with one
+    row per parameter, as set by EqualUpDownBinaryTreeAsset when building
+    lattices), and the derivatives of the present values with respect to
+    those parameters are propagated in the same backward pass. The return
+    is then a tuple with the present values and an array of derivatives
+    (one row per parameter, one column per option).
+    """
+    import numpy as np
+    discount_factor = lattice.shared_data['discount_factor']
+    expiry_levels = np.asarray(expiry_levels, dtype = int)
+    if expiry_levels.size and expiry_levels.max() > lattice.get_height():
+      raise ValueError('Lattice does not reach expiry of every option')
+    strucks = np.asarray(strucks, dtype = float)[:, None]
+    signs = np.where(np.asarray(are_calls, dtype = bool), 1.0, -1.0)[:, None]
+    are_american = np.asarray(are_american, dtype = bool)
+    if compute_tangents:
+      output_key = 'option_value_and_tangents'
+    else:
+      output_key = 'option_value'
+    def compute_exercise_values_and_tangents(level_dict):
+      # Tangents are only computed (otherwise they are None) if requested
+      moneyness = signs*(level_dict['asset_value'] - strucks)
+      exercise_values = np.maximum(0.0, moneyness)
+      if compute_tangents:
+        exercise_tangents = (signs*(moneyness > 0))*level_dict['asset_value_tangents'][:, None, :]
+      else:
+        exercise_tangents = None
+      return (exercise_values, exercise_tangents)
+    def stack_values_and_tangents(values, tangents):
+      if compute_tangents:
+        return np.concatenate([values[None], tangents])
+      else:
+        return values
+    def compute_option_values(very_level_dict, left_child_dict, right_child_dict, all_other_args):
+      # Options which have not yet expired are worth the discounted expected
+      #value of their children, or their exercise value if American and larger
+      # Rows of options which expired before this level hold meaningless
+      #values which are never read
+      level = all_other_args['level']
+      probabilities = very_level_dict['probability_of_right']
+      left_values = left_child_dict[output_key]
+      right_values = right_child_dict[output_key]
+      if compute_tangents:
+        left_values, left_tangents = left_values[0], left_values[1:]
+        right_values, right_tangents = right_values[0], right_values[1:]
+      continuation_values = discount_factor*(probabilities*right_values
+          + (1 - probabilities)*left_values)
+      exercise_values, exercise_tangents = compute_exercise_values_and_tangents(very_level_dict)
+      are_exercised = (expiry_levels == level)[:, None] \
+          | ((are_american & (expiry_levels > level))[:, None] & (exercise_values > continuation_values))
+      option_values = np.where(are_exercised, exercise_values, continuation_values)
+      if compute_tangents:
+        continuation_tangents = discount_factor*(
+            very_level_dict['probability_of_right_tangents'][:, None, :]*(right_values - left_values)
+            + probabilities*right_tangents + (1 - probabilities)*left_tangents)
+        option_tangents = np.where(are_exercised, exercise_tangents, continuation_tangents)
+      else:
+        option_tangents = None
+      return stack_values_and_tangents(option_values, option_tangents)
+    height = lattice.get_height()
+    lattice.set_column(output_key, height, stack_values_and_tangents(
+        *compute_exercise_values_and_tangents(lattice.get_level_dict(height))))
+    lattice.propagate_function_up(
+        output_key = output_key,
+        function = compute_option_values,
+        forget_output_at_children = True)
+    present_values = lattice.get_column(output_key, 0)[..., 0]
+    del lattice.get_level_dict(0)[output_key]
+    if compute_tangents:
+      return (present_values[0], present_values[1:])
+    else:
+      return present_values
+
+  @staticmethod
+  def static_compute_standard_normal_cdf(x):
+    r"""
+    Computes the cumulative distribution function of the standard normal
+    distribution on an array (or number), with double precision.
+
+    Uses Hart's rational approximation (as presented by West in "Better
+    approximations to cumulative normal functions"), avoiding SciPy.
+    """
+    import numpy as np
+    x = np.asarray(x, dtype = float)
+    absolute_x = np.abs(x)
+    exponential = np.exp(-absolute_x*absolute_x/2)
+    numerator = 3.52624965998911e-02
+    for coefficient in [0.700383064443688, 6.37396220353165, 33.912866078383,
+        112.079291497871, 221.213596169931, 220.206867912376]:
+      numerator = numerator*absolute_x + coefficient
+    denominator = 8.83883476483184e-02
+    for coefficient in [1.75566716318264, 16.064177579207, 86.7807322029461,
+        296.564248779674, 637.333633378831, 793.826512519948, 440.413735824752]:
+      denominator = denominator*absolute_x + coefficient
+    # Continued fraction for the tail
+    continued_fraction = absolute_x + 0.65
+    for coefficient in [4, 3, 2, 1]:
+      continued_fraction = absolute_x + coefficient/continued_fraction
+    lower_tail = np.where(
+        absolute_x < 7.07106781186547,
+        exponential*numerator/denominator,
+        exponential/continued_fraction/2.506628274631)
+    lower_tail = np.where(absolute_x > 37, 0.0, lower_tail)
+    return np.where(x > 0, 1 - lower_tail, lower_tail)
+
+  @staticmethod
+  def static_compute_black_scholes_prices_and_vegas(initial_values, strucks,
+      expiries, interest_rates, volatilities, are_calls):
+    r"""
+    Computes prices of European vanilla options by the Black-Scholes formula,
+    as well as their vegas (derivatives with respect to the volatility).
+
+    All arguments can be arrays (broadcast together) or numbers. Interest
+    rates are continuously compounded. Returns a tuple of two arrays.
+    """
+    import numpy as np
+    initial_values, strucks, expiries, interest_rates, volatilities = (
+        np.asarray(item, dtype = float) for item in
+        [initial_values, strucks, expiries, interest_rates, volatilities])
+    signs = np.where(np.asarray(are_calls, dtype = bool), 1.0, -1.0)
+    discounted_strucks = strucks*np.exp(-interest_rates*expiries)
+    standard_deviations = volatilities*np.sqrt(expiries)
+    d1 = (np.log(initial_values/discounted_strucks))/standard_deviations + standard_deviations/2
+    d2 = d1 - standard_deviations
+    cdf = VanillaOption.static_compute_standard_normal_cdf
+    prices = signs*(initial_values*cdf(signs*d1) - discounted_strucks*cdf(signs*d2))
+    vegas = initial_values*np.sqrt(expiries)*np.exp(-d1*d1/2)/np.sqrt(2*np.pi)
+    return (prices, vegas)
 
 class VanillaCallOption(VanillaOption):
   """Vanilla call option"""
@@ -26,6 +26,9 @@
 
 ########################################################################
 
+from ..assets import *
+from ..time import *
+
 class Calculator():
   r"""
   An object which executes a kind of calculation for some purpose in
@@ -35,18 +38,893 @@ class Calculator():
   pass
 
 
+class ImpliedVolatilityCalculator(Calculator):
+  r"""
+  Calculations of implied volatilities of vanilla options from their
+  prices, done for many quotes (for example, a whole option chain) at once.
+
+  European options are priced by the Black-Scholes formula. American
+  options are priced on lattices of ExponentialUpDownBinaryTreeAsset with
+  `number_of_steps` steps until expiry, all quotes on a single lattice
+  (with one row per quote).
+
+  The solver is a safeguarded Newton method: every quote keeps a bracket
+  for its implied volatility, which shrinks at every iteration, and a
+  bisection step is taken whenever the Newton step would leave it. All
+  quotes are iterated together, and quotes which converge are masked out
+  of further computations.
+  """
+
+  def __init__(self, tolerance = 1e-8, max_iterations = 100,
+      min_volatility = 1e-4, max_volatility = 5.0, number_of_steps = 200,
+      relative_bump_for_lattice_vegas = 1e-4):
+    self.tolerance = tolerance
+    self.max_iterations = max_iterations
+    self.min_volatility = min_volatility
+    self.max_volatility = max_volatility
+    self.number_of_steps = number_of_steps
+    self.relative_bump_for_lattice_vegas = relative_bump_for_lattice_vegas
+
+  def compute_prices_and_vegas(self, volatilities, initial_values, strucks,
+      expiries, interest_rates, are_calls, are_american):
+    r"""
+    Computes prices of vanilla options and their vegas (derivatives with
+    respect to volatility), with all arguments being arrays of same length.
+
+    Vegas of American options are computed by a finite difference, pricing
+    the bumped volatilities on the same lattice as the original ones.
+    """
+    import numpy as np
+    prices = np.empty(len(volatilities))
+    vegas = np.empty(len(volatilities))
+    are_european = ~are_american
+    if are_european.any():
+      prices[are_european], vegas[are_european] = \
+          VanillaOption.static_compute_black_scholes_prices_and_vegas(
+              initial_values = initial_values[are_european],
+              strucks = strucks[are_european],
+              expiries = expiries[are_european],
+              interest_rates = interest_rates[are_european],
+              volatilities = volatilities[are_european],
+              are_calls = are_calls[are_european])
+    if are_american.any():
+      bumps = self.relative_bump_for_lattice_vegas*volatilities[are_american]
+      stack = lambda array: np.concatenate([array[are_american]]*2)
+      lattice = ExponentialUpDownBinaryTreeAsset.static_build_risk_neutral_lattice(
+          initial_values = stack(initial_values),
+          volatilities = np.concatenate([volatilities[are_american],
+              volatilities[are_american] + bumps]),
+          interest_rates = stack(interest_rates),
+          number_of_steps = self.number_of_steps,
+          step_lengths = stack(expiries)/self.number_of_steps,
+          skip_checks = True)
+      lattice_prices = VanillaOption.static_price_vanilla_options_on_lattice_from_arrays(
+          strucks = stack(strucks),
+          are_calls = stack(are_calls),
+          are_american = np.ones(2*len(bumps), dtype = bool),
+          expiry_levels = np.full(2*len(bumps), self.number_of_steps),
+          lattice = lattice)
+      prices[are_american] = lattice_prices[:len(bumps)]
+      vegas[are_american] = (lattice_prices[len(bumps):] - lattice_prices[:len(bumps)])/bumps
+    return (prices, vegas)
+
+  @staticmethod
+  def compute_initial_guesses(prices, initial_values, strucks, expiries,
+      interest_rates, are_calls):
+    r"""
+    Returns initial guesses for implied volatilities by the approximation
+    of Corrado and Miller (falling back to the one of Brenner and
+    Subrahmanyam when it is not defined).
+
+    Puts are converted to calls via put-call parity, which is only
+    approximate for American options (but this is only a guess).
+    """
+    import numpy as np
+    discounted_strucks = strucks*np.exp(-interest_rates*expiries)
+    call_prices = np.where(are_calls, prices, prices + initial_values - discounted_strucks)
+    half_moneyness = (initial_values - discounted_strucks)/2
+    radicand = (call_prices - half_moneyness)**2 - 4*half_moneyness**2/np.pi
+    return np.sqrt(2*np.pi/expiries)/(initial_values + discounted_strucks) \
+        *(call_prices - half_moneyness + np.sqrt(np.maximum(radicand, 0)))
+
+  def compute_implied_volatilities(self, prices, initial_values, strucks,
+      expiries, interest_rates, are_calls, are_american = False):
+    r"""
+    Returns array with the implied volatilities of vanilla options with
+    given prices.
+
+    Arguments can be arrays (of same length) or numbers, which are
+    broadcast. Interest rates are continuously compounded.
+
+    Quotes whose price cannot be attained with a volatility between
+    `min_volatility` and `max_volatility`, as well as quotes which did
+    not converge, get NaN as implied volatility.
+    """
+    import numpy as np
+    prices, initial_values, strucks, expiries, interest_rates = (
+        np.array(item, dtype = float) for item in np.broadcast_arrays(
+            prices, initial_values, strucks, expiries, interest_rates,
+            are_calls, are_american)[:5])
+    are_calls, are_american = (np.broadcast_to(np.asarray(item, dtype = bool),
+        prices.shape).copy() for item in [are_calls, are_american])
+    arrays = [initial_values, strucks, expiries, interest_rates, are_calls, are_american]
+    number_of_quotes = prices.size
+    lower_bounds = np.full(number_of_quotes, float(self.min_volatility))
+    upper_bounds = np.full(number_of_quotes, float(self.max_volatility))
+    # Lattices need jumps larger than the growth at the interest rate
+    #for their risk-neutral probabilities to be in [0, 1]
+    with np.errstate(invalid = 'ignore'):
+      lattice_bounds = 1.01*np.abs(interest_rates)*np.sqrt(expiries/self.number_of_steps)
+    lower_bounds = np.where(are_american, np.maximum(lower_bounds, lattice_bounds), lower_bounds)
+    # Quotes whose price is outside the range attained in the initial
+    #bracket have no implied volatility
+    is_valid = (expiries > 0) & (prices > 0) & (lower_bounds < upper_bounds)
+    indices = np.flatnonzero(is_valid)
+    selected_arrays = [array[indices] for array in arrays]
+    lower_prices = self.compute_prices_and_vegas(lower_bounds[indices], *selected_arrays)[0]
+    upper_prices = self.compute_prices_and_vegas(upper_bounds[indices], *selected_arrays)[0]
+    slack = self.tolerance*np.maximum(1, prices[indices])
+    is_valid[indices] = (lower_prices - slack <= prices[indices]) \
+        & (prices[indices] <= upper_prices + slack)
+    volatilities = np.full(number_of_quotes, np.nan)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+      volatilities[is_valid] = np.clip(
+          self.compute_initial_guesses(prices[is_valid], initial_values[is_valid],
+              strucks[is_valid], expiries[is_valid], interest_rates[is_valid],
+              are_calls[is_valid]),
+          lower_bounds[is_valid], upper_bounds[is_valid])
+    volatilities[is_valid] = np.where(np.isnan(volatilities[is_valid]),
+        (lower_bounds[is_valid] + upper_bounds[is_valid])/2, volatilities[is_valid])
+    is_active = is_valid.copy()
+    for iteration in range(self.max_iterations):
+      indices = np.flatnonzero(is_active)
+      if not indices.size:
+        break
+      current_volatilities = volatilities[indices]
+      model_prices, vegas = self.compute_prices_and_vegas(
+          current_volatilities, *[array[indices] for array in arrays])
+      differences = model_prices - prices[indices]
+      # Prices increase with volatility, so the sign of the difference tells
+      #on which side of the implied volatility the current one is
+      lower_bounds[indices] = np.where(differences < 0, current_volatilities, lower_bounds[indices])
+      upper_bounds[indices] = np.where(differences > 0, current_volatilities, upper_bounds[indices])
+      with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        newton_volatilities = current_volatilities - differences/vegas
+      is_newton_safe = (vegas > 0) & (newton_volatilities > lower_bounds[indices]) \
+          & (newton_volatilities < upper_bounds[indices])
+      # Convergence is judged on volatilities (size of the Newton step, or
+      #of the bracket), as prices of far out of the money options are tiny
+      has_converged = (differences == 0) \
+          | (is_newton_safe & (np.abs(newton_volatilities - current_volatilities) <= self.tolerance)) \
+          | (upper_bounds[indices] - lower_bounds[indices] <= self.tolerance)
+      volatilities[indices] = np.where(has_converged, current_volatilities,
+          np.where(is_newton_safe, newton_volatilities,
+              (lower_bounds[indices] + upper_bounds[indices])/2))
+      is_active[indices[has_converged]] = False
+    volatilities[is_active] = np.nan
+    return volatilities
+
+  def compute_implied_volatilities_of_options(self, list_of_options, prices, world):
+    r"""
+    Returns array with the implied volatilities of given vanilla options
+    (on underlyings with known initial values) in given world.
+    """
+    return self.compute_implied_volatilities(
+        prices = prices,
+        initial_values = [option.underlying.get_initial_value() for option in list_of_options],
+        strucks = [option.struck for option in list_of_options],
+        expiries = [option.expiry for option in list_of_options],
+        interest_rates = world.get_interest_rate(),
+        are_calls = [option.is_call for option in list_of_options],
+        are_american = [option.is_american for option in list_of_options])
+
+
+class JumpAmountCalibrationCalculator(Calculator):
+  r"""
+  Calibration, by least squares, of the jump amounts of an
+  EqualUpDownBinaryTreeAsset to observed prices of vanilla options on it.
+
+  There can be a single jump amount, or a schedule of them: jump amounts
+  are calibrated at `number_of_jump_amounts` equally spaced steps (called
+  knots), from the first to the last, and linearly interpolated between
+  them. (Abrupt changes of jump amounts would take the risk-neutral
+  probabilities at the outer nodes of the lattice out of [0, 1].)
+
+  The lattice is built once, and only its columns are overwritten between
+  iterations. The derivatives of the prices with respect to the jump
+  amounts are propagated in the same backward pass which computes the
+  prices, and feed a Levenberg-Marquardt iteration.
+  """
+
+  def __init__(self, initial_value, world, step_length,
+      number_of_jump_amounts = 1, max_iterations = 100, tolerance = 1e-12):
+    self.initial_value = initial_value
+    self.world = world
+    self.step_length = step_length
+    self.number_of_jump_amounts = number_of_jump_amounts
+    self.max_iterations = max_iterations
+    self.tolerance = tolerance
+    self.lattice = None
+
+  def compute_derivatives_of_jump_amounts_by_level(self, number_of_steps):
+    r"""
+    Returns array whose row idx has the derivatives of the jump amount
+    leading to level idx with respect to the jump amounts at the knots,
+    that is, the weights of the linear interpolation.
+    """
+    import numpy as np
+    if not 1 <= self.number_of_jump_amounts <= max(number_of_steps, 1):
+      raise ValueError('Expected between 1 and number of steps jump amounts')
+    if self.number_of_jump_amounts == 1:
+      return np.ones((number_of_steps + 1, 1))
+    # Level 0 is treated as level 1, the first knot
+    levels = np.maximum(np.arange(number_of_steps + 1), 1)
+    knots = np.linspace(1, number_of_steps, self.number_of_jump_amounts)
+    return np.maximum(0, 1 - np.abs(levels[:, None] - knots)/(knots[1] - knots[0]))
+
+  def compute_prices_and_jacobian(self, jump_amounts, strucks, are_calls,
+      are_american, expiry_levels):
+    r"""
+    Returns tuple with the prices of vanilla options given by arrays
+    and the array of their derivatives with respect to the jump amounts
+    (one row per option, one column per jump amount).
+    """
+    import numpy as np
+    number_of_steps = int(np.max(expiry_levels))
+    derivatives_of_jump_amounts_by_level = self.compute_derivatives_of_jump_amounts_by_level(
+        number_of_steps)
+    if self.lattice is not None and self.lattice.get_height() != number_of_steps:
+      self.lattice = None
+    self.lattice = EqualUpDownBinaryTreeAsset.static_build_risk_neutral_lattice(
+        initial_value = self.initial_value,
+        jump_amounts_by_level = derivatives_of_jump_amounts_by_level @ jump_amounts,
+        interest_rate = self.world.get_interest_rate(),
+        step_length = self.step_length,
+        lattice = self.lattice,
+        derivatives_of_jump_amounts_by_level = derivatives_of_jump_amounts_by_level)
+    prices, tangents = VanillaOption.static_price_vanilla_options_on_lattice_from_arrays(
+        strucks = strucks,
+        are_calls = are_calls,
+        are_american = are_american,
+        expiry_levels = expiry_levels,
+        lattice = self.lattice,
+        compute_tangents = True)
+    return (prices, tangents.T)
+
+  def compute_calibrated_jump_amounts(self, prices, strucks, expiries, are_calls,
+      are_american = False, initial_jump_amount = None):
+    r"""
+    Returns tuple with array of calibrated jump amounts (one per knot)
+    and array of residuals (model prices minus given prices).
+
+    Expiries must fall on the step grid. If no initial jump amount is
+    given, starts from the one of a volatility of 20% around the
+    initial value.
+
+    Raises an Error if no jump amounts produce a risk-neutral lattice
+    near the initial one.
+    """
+    import numpy as np
+    from math import exp, sqrt
+    prices = np.asarray(prices, dtype = float)
+    strucks, are_calls, are_american = (np.broadcast_to(item, prices.shape)
+        for item in [strucks, are_calls, are_american])
+    expiry_levels = np.rint(np.asarray(expiries, dtype = float)/self.step_length).astype(int)
+    expiry_levels = np.broadcast_to(expiry_levels, prices.shape)
+    if np.any(np.abs(expiry_levels*self.step_length - expiries) > 1e-9*np.maximum(1, np.abs(expiries))):
+      raise ValueError('Expiries must be whole numbers of steps')
+    if initial_jump_amount is None:
+      growth_factor = exp(self.world.get_interest_rate()*self.step_length)
+      initial_jump_amount = max(0.2*abs(self.initial_value)*sqrt(self.step_length),
+          2*abs(self.initial_value*(growth_factor - 1)))
+    evaluate = lambda jump_amounts: self.compute_prices_and_jacobian(
+        jump_amounts, strucks, are_calls, are_american, expiry_levels)
+    jump_amounts = np.full(self.number_of_jump_amounts, float(initial_jump_amount))
+    model_prices, jacobian = evaluate(jump_amounts)
+    residuals = model_prices - prices
+    cost = residuals @ residuals
+    damping = 1e-3
+    for iteration in range(self.max_iterations):
+      normal_matrix = jacobian.T @ jacobian
+      gradient = jacobian.T @ residuals
+      step = np.linalg.solve(
+          normal_matrix + damping*np.diag(np.diag(normal_matrix) + 1e-12),
+          -gradient)
+      new_jump_amounts = jump_amounts + step
+      try:
+        if new_jump_amounts.min() <= 0:
+          raise ValueError('Jump amounts must be positive')
+        new_model_prices, new_jacobian = evaluate(new_jump_amounts)
+      except ValueError:
+        # Step leads outside of risk-neutral lattices, retry with a shorter one
+        damping *= 4
+        continue
+      new_residuals = new_model_prices - prices
+      new_cost = new_residuals @ new_residuals
+      if new_cost <= cost:
+        has_converged = cost - new_cost <= self.tolerance*max(cost, 1) \
+            or np.abs(step).max() <= self.tolerance*np.abs(jump_amounts).max()
+        jump_amounts, jacobian, residuals, cost = \
+            new_jump_amounts, new_jacobian, new_residuals, new_cost
+        damping /= 3
+        if has_converged:
+          break
+      else:
+        damping *= 4
+    return (jump_amounts, residuals)
+
+  def calibrate_asset(self, list_of_options, prices, initial_jump_amount = None):
+    r"""
+    Returns a new EqualUpDownBinaryTreeAsset (with a schedule of jump
+    amounts, if more than one knot is calibrated) fitting the
+    given prices of vanilla options by least squares.
+    """
+    jump_amounts, residuals = self.compute_calibrated_jump_amounts(
+        prices = prices,
+        strucks = [option.struck for option in list_of_options],
+        expiries = [option.expiry for option in list_of_options],
+        are_calls = [option.is_call for option in list_of_options],
+        are_american = [option.is_american for option in list_of_options],
+        initial_jump_amount = initial_jump_amount)
+    if self.number_of_jump_amounts == 1:
+      return EqualUpDownBinaryTreeAsset(self.initial_value, jump_amounts[0])
+    else:
+      number_of_steps = self.lattice.get_height()
+      schedule = self.compute_derivatives_of_jump_amounts_by_level(number_of_steps)[1:] @ jump_amounts
+      return EqualUpDownBinaryTreeAsset(self.initial_value, jump_amounts[-1], list(schedule))
+
+
 class FixedInstallmentLoanCalculator(Calculator):
   r"""
   Calculations for loans to be paid back in fixed installments.
+
+  Schedules can be computed for many loans at once by compute_schedules,
+  with one row per loan and one column per installment, in closed form:
+  there is no loop over loans, nor over installments.
+
+  Two amortization systems are available: 'price' (Price table, also called
+  French system, with all installments equal) and 'sac' (constant
+  amortization, with installments decreasing as interest decreases).
   """
-  
+
+  AMORTIZATION_SYSTEMS = ['price', 'sac']
+
   class FixedInstallmentLoan():
-  	r"""
-  	A loan to be paid in a number of equal installments.
-  	"""
-  	
-  	pass
-  
-  
-  
-  
+    r"""
+    A loan to be paid in a number of installments, one per period, with
+    interest at given (effective, per period) rate, as in the Price table
+    (equal installments) or SAC (constant amortization) systems.
+    """
+
+    def __init__(self, principal, rate_per_period, number_of_installments,
+        amortization_system = 'price'):
+      self.principal = principal
+      self.rate_per_period = rate_per_period
+      self.number_of_installments = number_of_installments
+      self.amortization_system = amortization_system
+
+    def compute_schedule(self):
+      r"""
+      Returns dict with arrays `interest`, `amortization`, `installment` and
+      `balance` (after each installment), one item per installment.
+      """
+      schedules = FixedInstallmentLoanCalculator.static_compute_schedules(
+          principals = [self.principal],
+          rates_per_period = [self.rate_per_period],
+          numbers_of_installments = [self.number_of_installments],
+          amortization_system = self.amortization_system)
+      return {key: matrix[0] for key, matrix in schedules.items()}
+
+  def __init__(self, amortization_system = 'price', period_unit = 'month'):
+    if amortization_system not in self.AMORTIZATION_SYSTEMS:
+      raise ValueError('Inexistent option for amortization system')
+    self.amortization_system = amortization_system
+    self.period_unit = period_unit
+
+  def get_rates_per_period(self, rates):
+    r"""
+    Returns array of effective rates per period, from a RateArray (converted
+    to the unit of the periods) or from numbers already per period.
+    """
+    import numpy as np
+    if isinstance(rates, RateArray):
+      return rates.convertToUnits(self.period_unit).getNumbers()
+    return np.asarray(rates, dtype = float)
+
+  def compute_schedules(self, principals, rates, numbers_of_installments):
+    r"""
+    Returns dict with matrices `interest`, `amortization`, `installment` and
+    `balance`, with a row per loan, see static_compute_schedules.
+
+    Rates are given as a RateArray (in any units, see get_rates_per_period)
+    or as effective rates per period.
+    """
+    return self.static_compute_schedules(
+        principals = principals,
+        rates_per_period = self.get_rates_per_period(rates),
+        numbers_of_installments = numbers_of_installments,
+        amortization_system = self.amortization_system)
+
+  @staticmethod
+  def static_compute_schedules(principals, rates_per_period, numbers_of_installments,
+      amortization_system = 'price'):
+    r"""
+    Returns dict with matrices `interest`, `amortization`, `installment` and
+    `balance` (after each installment), with a row per loan and a column per
+    installment up to the largest number of installments (columns after the
+    last installment of a loan holding zeros).
+
+    Price table: the installment is P*i/(1 - (1 + i)**(-n)) (or P/n if i
+    is zero), and the balance after k installments is the present value of
+    the n - k remaining installments.
+    SAC: the amortization is P/n, and the balance after k installments is
+    P*(1 - k/n). In both, interest is i times the balance before.
+
+    Memory grows with loans times installments (four matrices of floats),
+    so very large portfolios should be given in slices.
+    """
+    import numpy as np
+    principals = np.asarray(principals, dtype = float)[:, None]
+    rates = np.asarray(rates_per_period, dtype = float)[:, None]
+    numbers_of_installments = np.asarray(numbers_of_installments)[:, None]
+    if np.any(numbers_of_installments < 1):
+      raise ValueError('Expected numbers of installments to be positive')
+    if np.any(rates <= -1):
+      raise ValueError('Expected rates per period above -100%')
+    ks = np.arange(1, numbers_of_installments.max() + 1)[None, :]
+    are_paid = ks <= numbers_of_installments
+    log_growths = np.log1p(rates) # More precise than log(1 + _)
+    if amortization_system == 'price':
+      # Annuity factor a(i, m) = (1 - (1 + i)**(-m))/i, tending to m as i
+      #tends to 0; the balance after k installments is the present value
+      #of the n - k remaining ones, which (unlike the future value of the
+      #principal minus that of the installments paid) does not cancel
+      are_rates_zero = rates == 0
+      safe_rates = np.where(are_rates_zero, 1.0, rates)
+      def compute_annuity_factors(numbers_of_periods):
+        return np.where(are_rates_zero, numbers_of_periods,
+            -np.expm1(-numbers_of_periods*log_growths)/safe_rates)
+      installments = principals/compute_annuity_factors(numbers_of_installments)
+      balances = installments*compute_annuity_factors(np.maximum(numbers_of_installments - ks, 0))
+      installments = np.broadcast_to(installments, balances.shape)
+    elif amortization_system == 'sac':
+      balances = principals*(1 - ks/numbers_of_installments)
+    else:
+      raise ValueError('Inexistent option for amortization system')
+    balances = np.where(are_paid, balances, 0.0)
+    balances_before = np.concatenate([principals, balances[:, :-1]], axis = 1)
+    interest = np.where(are_paid, balances_before*rates, 0.0)
+    if amortization_system == 'price':
+      installments = np.where(are_paid, installments, 0.0)
+      amortization = installments - interest
+    else:
+      amortization = np.where(are_paid, principals/numbers_of_installments, 0.0)
+      installments = amortization + interest
+    return {
+        'interest': interest,
+        'amortization': amortization,
+        'installment': installments,
+        'balance': balances}
+
+  def aggregate_cash_flows_from_csv(self, path, chunk_size = 2000,
+      principal_column = 'principal', rate_column = 'rate',
+      number_of_installments_column = 'number_of_installments',
+      rate_unit = None, are_rates_percentages = False, separator = ',',
+      print_progress = False):
+    r"""
+    Reads loans from CSV file (with a header naming its columns) in chunks
+    of chunk_size rows, computes schedules of each chunk by compute_schedules
+    and sums them into arrays with an item per period, so peak memory is
+    bounded by chunk size times the largest number of installments.
+
+    About 11 matrices of floats (schedules and intermediate arrays) with a
+    row per loan and a column per period are alive at the peak, that is,
+    about 90 bytes per row and period: with 360 monthly installments, some
+    32 KB per row, so the default chunk of 2000 rows peaks below 65 MB (and
+    100000 rows would need over 3 GB).
+
+    Rates are per period, unless rate_unit is given (such as 'year'), in
+    which case they are composite rates in that unit, converted by RateArray.
+
+    Returns dict with the summed `interest`, `amortization`, `installment`
+    and `balance` per period, `number_of_active_loans` per period (loans
+    with an installment in the period), `number_of_rows`, `elapsed_seconds`
+    and `rows_per_second`. If print_progress, prints rows/second per chunk.
+    """
+    import csv
+    import numpy as np
+    from itertools import islice
+    from time import perf_counter
+    keys = ['interest', 'amortization', 'installment', 'balance', 'number_of_active_loans']
+    totals = {key: np.zeros(0) for key in keys}
+    number_of_rows = 0
+    start = perf_counter()
+    with open(path, newline = '') as file:
+      reader = csv.reader(file, delimiter = separator)
+      header = [name.strip() for name in next(reader)]
+      try:
+        indices = [header.index(column) for column in
+            [principal_column, rate_column, number_of_installments_column]]
+      except ValueError:
+        raise ValueError('Expected columns not found in header of ' + str(path))
+      while True:
+        rows = [[row[idx] for idx in indices] for row in islice(reader, chunk_size) if row]
+        if not rows:
+          break
+        # Conversion from strings done by NumPy on the whole chunk
+        fields = np.array(rows)
+        principals = fields[:, 0].astype(float)
+        rates = fields[:, 1].astype(float)
+        numbers_of_installments = fields[:, 2].astype(float).astype(np.int64)
+        if rate_unit is not None:
+          rates = RateArray(rates, rate_unit, asPercentage = are_rates_percentages)
+        elif are_rates_percentages:
+          rates = rates/100.0
+        schedules = self.compute_schedules(principals, rates, numbers_of_installments)
+        number_of_periods = schedules['balance'].shape[1]
+        schedules['number_of_active_loans'] = \
+            np.arange(1, number_of_periods + 1) <= numbers_of_installments[:, None]
+        for key in keys:
+          if len(totals[key]) < number_of_periods:
+            totals[key] = np.pad(totals[key], (0, number_of_periods - len(totals[key])))
+          totals[key][:number_of_periods] += schedules[key].sum(axis = 0)
+        number_of_rows += len(rows)
+        if print_progress:
+          elapsed_seconds = perf_counter() - start
+          print(str(number_of_rows) + ' rows, ' + str(round(number_of_rows/elapsed_seconds)) + ' rows/second')
+    elapsed_seconds = perf_counter() - start
+    totals['number_of_active_loans'] = totals['number_of_active_loans'].astype(np.int64)
+    totals['number_of_rows'] = number_of_rows
+    totals['elapsed_seconds'] = elapsed_seconds
+    totals['rows_per_second'] = number_of_rows/elapsed_seconds if elapsed_seconds > 0 else float('inf')
+    return totals
+
+  def compute_implied_rates(self, principals, installments, numbers_of_installments,
+      as_rate_array = False, tolerance = 1e-12, max_iterations = 100):
+    r"""
+    Returns rates per period implied by principals, installments and numbers
+    of installments of loans on the Price table (equal installments), see
+    static_compute_implied_rates, as an array or as a RateArray (composite
+    rates in the unit of the periods).
+    """
+    rates = self.static_compute_implied_rates(
+        principals = principals,
+        installments = installments,
+        numbers_of_installments = numbers_of_installments,
+        tolerance = tolerance,
+        max_iterations = max_iterations)
+    if as_rate_array:
+      return RateArray(rates, self.period_unit)
+    return rates
+
+  @staticmethod
+  def static_compute_implied_rates(principals, installments, numbers_of_installments,
+      tolerance = 1e-12, max_iterations = 100):
+    r"""
+    Returns array of rates per period i such that the principal P is the
+    present value of the n installments I, that is, P = I*a(i, n) with
+    annuity factor a(i, n) = (1 - (1 + i)**(-n))/i (equal to n if i is 0).
+
+    Found by static_solve_by_bracketed_newton, with the analytic derivative
+    of the annuity factor, starting from the linearization of a around 0.
+    The rate is in [0, I/P) if n*I >= P (as a(i, n) < 1/i), else in (-1, 0).
+    """
+    import numpy as np
+    principals, installments, numbers_of_installments = np.broadcast_arrays(
+        np.asarray(principals, dtype = float),
+        np.asarray(installments, dtype = float),
+        np.asarray(numbers_of_installments, dtype = float))
+    if np.any(principals <= 0) or np.any(installments <= 0) or np.any(numbers_of_installments < 1):
+      raise ValueError('Expected positive principals, installments and numbers of installments')
+    are_rates_nonnegative = numbers_of_installments*installments >= principals
+    lows = np.where(are_rates_nonnegative, 0.0, -1 + 1e-9)
+    highs = np.where(are_rates_nonnegative, installments/principals, 0.0)
+    initial_guesses = 2*(numbers_of_installments*installments - principals) \
+        /(numbers_of_installments*(numbers_of_installments + 1)*installments)
+    def compute_values_and_derivatives(rates, indices):
+      p = principals[indices]
+      pmt = installments[indices]
+      n = numbers_of_installments[indices]
+      is_small = np.abs(rates) < 1e-8
+      safe_rates = np.where(is_small, 1.0, rates)
+      discounts = np.exp(-n*np.log1p(rates))
+      annuity_factors = -np.expm1(-n*np.log1p(rates))/safe_rates
+      derivatives = (n*discounts/(1 + rates) - annuity_factors)/safe_rates
+      # Near zero, by the Taylor expansion
+      annuity_factors = np.where(is_small, n - n*(n + 1)/2*rates, annuity_factors)
+      derivatives = np.where(is_small, -n*(n + 1)/2, derivatives)
+      return (pmt*annuity_factors - p, pmt*derivatives)
+    return FixedInstallmentLoanCalculator.static_solve_by_bracketed_newton(
+        compute_values_and_derivatives = compute_values_and_derivatives,
+        lows = lows,
+        highs = highs,
+        initial_guesses = initial_guesses,
+        tolerance = tolerance,
+        max_iterations = max_iterations)
+
+  @staticmethod
+  def static_compute_internal_rates_of_return(cash_flows, times = None,
+      highest_rate = 10.0, tolerance = 1e-12, max_iterations = 100):
+    r"""
+    Returns array of internal rates of return (per period) of rows of a
+    matrix of cash flows, paid at periods 0, 1, 2 and so on, or at given
+    times (in periods, an array shared by all rows), the rates zeroing
+    the net present value: sum of cash_flows[:, t]*(1 + i)**(-times[t]).
+
+    Rates are searched in (-1, highest_rate]. Rows whose net present value
+    has no change of sign in there get NaN; rows with several changes of
+    sign (several internal rates of return) get one of them.
+    """
+    import numpy as np
+    cash_flows = np.atleast_2d(np.asarray(cash_flows, dtype = float))
+    if times is None:
+      times = np.arange(cash_flows.shape[1], dtype = float)
+    times = np.asarray(times, dtype = float)[None, :]
+    are_nonzero = cash_flows != 0
+    def compute_values_and_derivatives(rates, indices):
+      # Values and derivatives are both divided by the largest discount
+      #factor of a nonzero cash flow of each row (when above 1, that is,
+      #for negative rates): signs and Newton steps are kept, and, near -1,
+      #late cash flows do not overflow (to infinities, or NaN for zeros)
+      log_discount_factors = np.where(are_nonzero[indices],
+          -times*np.log1p(rates)[:, None], -np.inf)
+      log_scales = np.maximum(log_discount_factors.max(axis = 1), 0.0)
+      discounted_cash_flows = cash_flows[indices]*np.exp(log_discount_factors - log_scales[:, None])
+      values = discounted_cash_flows.sum(axis = 1)
+      derivatives = -(times*discounted_cash_flows).sum(axis = 1)/(1 + rates)
+      return (values, derivatives)
+    number_of_rows = len(cash_flows)
+    all_indices = np.arange(number_of_rows)
+    lows = np.full(number_of_rows, -1 + 1e-9)
+    highs = np.full(number_of_rows, float(highest_rate))
+    with np.errstate(under = 'ignore'):
+      values_at_lows = compute_values_and_derivatives(lows, all_indices)[0]
+      values_at_highs = compute_values_and_derivatives(highs, all_indices)[0]
+    are_bracketed = (np.sign(values_at_lows)*np.sign(values_at_highs) <= 0) & are_nonzero.any(axis = 1)
+    rates = np.full(number_of_rows, np.nan)
+    indices = all_indices[are_bracketed]
+    if len(indices) == 0:
+      return rates
+    def compute_values_and_derivatives_of_bracketed(rates, sub_indices):
+      return compute_values_and_derivatives(rates, indices[sub_indices])
+    rates[indices] = FixedInstallmentLoanCalculator.static_solve_by_bracketed_newton(
+        compute_values_and_derivatives = compute_values_and_derivatives_of_bracketed,
+        lows = lows[indices],
+        highs = highs[indices],
+        initial_guesses = np.zeros(len(indices)),
+        tolerance = tolerance,
+        max_iterations = max_iterations)
+    return rates
+
+  @staticmethod
+  def static_solve_by_bracketed_newton(compute_values_and_derivatives, lows, highs,
+      initial_guesses, tolerance = 1e-12, max_iterations = 100):
+    r"""
+    Returns array of roots of many functions at once, each with a root in
+    [lows, highs], where the function changes sign.
+
+    compute_values_and_derivatives(xs, indices) gives values and derivatives
+    of the functions of given indices at xs. At each iteration, only the
+    functions not yet converged are evaluated; brackets shrink by the sign
+    of the values, and Newton steps leaving the brackets are replaced by
+    bisection, so every function converges. Converged when the step is at
+    most tolerance*max(1, abs(x)), or the value is exactly zero.
+    """
+    import numpy as np
+    lows = np.array(lows, dtype = float)
+    highs = np.array(highs, dtype = float)
+    xs = np.clip(np.asarray(initial_guesses, dtype = float), lows, highs)
+    # Values near the ends of brackets may overflow to infinities, keeping signs
+    with np.errstate(over = 'ignore', divide = 'ignore', invalid = 'ignore'):
+      signs_at_lows = np.sign(compute_values_and_derivatives(lows, np.arange(len(xs)))[0])
+    indices = np.arange(len(xs))
+    for iteration in range(max_iterations):
+      if len(indices) == 0:
+        break
+      x = xs[indices]
+      with np.errstate(over = 'ignore', divide = 'ignore', invalid = 'ignore'):
+        values, derivatives = compute_values_and_derivatives(x, indices)
+        newton_x = x - values/derivatives
+      # Shrink brackets, keeping the change of sign between lows and highs
+      are_on_low_side = np.sign(values) == signs_at_lows[indices]
+      low = np.where(are_on_low_side, x, lows[indices])
+      high = np.where(are_on_low_side, highs[indices], x)
+      are_inside = (newton_x > low) & (newton_x < high)
+      new_x = np.where(are_inside, newton_x, (low + high)/2)
+      lows[indices] = low
+      highs[indices] = high
+      xs[indices] = new_x
+      are_converged = (np.abs(new_x - x) <= tolerance*np.maximum(1.0, np.abs(x))) | (values == 0)
+      xs[indices[values == 0]] = x[values == 0]
+      indices = indices[~are_converged]
+    else:
+      if len(indices) > 0:
+        raise ValueError('Solver did not converge')
+    return xs
+
+  SIMULATION_KEYS = ['interest', 'scheduled_principal', 'prepayment', 'default',
+      'recovery', 'loss', 'balance', 'cash_flow']
+
+  def convert_annual_rates_to_period_rates(self, annual_rates):
+    r"""
+    Converts annual rates of events, such as CPR (prepayments) and CDR
+    (defaults), to rates per period, such as SMM and MDR, as
+    1 - (1 - annual_rate)**(1/number of periods per year): the survivals
+    1 - rate compound, so this is the conversion of the composite rates
+    -annual_rate by RateArray.
+    """
+    import numpy as np
+    annual_rates = np.asarray(annual_rates, dtype = float)
+    negated_rates = RateArray(-annual_rates.ravel(), 'year').convertToUnits(self.period_unit)
+    return -negated_rates.getNumbers().reshape(annual_rates.shape)
+
+  def simulate_cash_flows(self, principals, rates, numbers_of_installments,
+      prepayment_rates, default_rates, severity = 0.0, are_curves_annual = True,
+      is_monte_carlo = False, number_of_paths = 1, seed = None,
+      number_of_workers = None):
+    r"""
+    Returns cash-flow cube of a portfolio of loans (all starting at period
+    0) under scenarios, as a dict with a matrix per key of SIMULATION_KEYS,
+    with a row per scenario and a column per period.
+
+    Curves of prepayment_rates and default_rates (CPR and CDR if
+    are_curves_annual, else SMM and MDR) have a row per scenario (or a
+    single row, or number, shared by the scenarios) and an item per period
+    (extended with the last item, if shorter). In each period, loans
+    default first (losing severity of their balance, and recovering the
+    rest), then the remaining ones pay interest and scheduled principal,
+    and then prepay. Prepayments are partial, so schedules shrink in
+    proportion, as by the survival factor of the pool.
+
+    If not is_monte_carlo, cash flows are the expected ones, from the sums
+    of the schedules over loans (see static_compute_expected_cash_flows).
+    Else, each loan draws whether and when it defaults or prepays in full,
+    on each of number_of_paths paths per scenario, and cash flows are
+    averaged over the paths (see static_draw_cash_flows), with random
+    generators seeded per scenario, so results do not depend on workers.
+
+    Expected cash flows of all scenarios are computed at once, as matrices.
+    Monte Carlo scenarios go to a pool of processes (at most
+    number_of_workers, by default the number of processors) unless there
+    is a single scenario or number_of_workers is 1.
+    """
+    import numpy as np
+    prepayment_rates = np.atleast_2d(np.asarray(prepayment_rates, dtype = float))
+    default_rates = np.atleast_2d(np.asarray(default_rates, dtype = float))
+    # Checked before conversion, which would turn rates above 1 into NaN
+    for curves in [prepayment_rates, default_rates]:
+      if not np.all((curves >= 0) & (curves <= 1)):
+        raise ValueError('Expected prepayment and default rates between 0 and 1')
+    if are_curves_annual:
+      prepayment_rates = self.convert_annual_rates_to_period_rates(prepayment_rates)
+      default_rates = self.convert_annual_rates_to_period_rates(default_rates)
+    numbers_of_installments = np.asarray(numbers_of_installments)
+    number_of_periods = int(numbers_of_installments.max())
+    def extend_curves(curves):
+      if curves.shape[1] < number_of_periods:
+        padding = np.repeat(curves[:, -1:], number_of_periods - curves.shape[1], axis = 1)
+        curves = np.concatenate([curves, padding], axis = 1)
+      return curves[:, :number_of_periods]
+    prepayment_rates, default_rates = np.broadcast_arrays(
+        extend_curves(prepayment_rates), extend_curves(default_rates))
+    rates_per_period = self.get_rates_per_period(rates)
+    if not is_monte_carlo:
+      schedules = self.static_compute_schedules(principals, rates_per_period,
+          numbers_of_installments, self.amortization_system)
+      sums_of_schedules = {key: matrix.sum(axis = 0) for key, matrix in schedules.items()}
+      cash_flows = self.static_compute_expected_cash_flows(
+          sums_of_schedules, prepayment_rates, default_rates, severity)
+      return {key: cash_flows[key] for key in self.SIMULATION_KEYS}
+    list_of_kwargs = [{
+        'prepayment_rates': prepayment_rates[scenario],
+        'default_rates': default_rates[scenario],
+        'severity': severity} for scenario in range(len(prepayment_rates))]
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(list_of_kwargs))
+    for kwargs, seed_sequence in zip(list_of_kwargs, seed_sequences):
+      kwargs.update({
+          'principals': principals,
+          'rates_per_period': rates_per_period,
+          'numbers_of_installments': numbers_of_installments,
+          'amortization_system': self.amortization_system,
+          'number_of_paths': number_of_paths,
+          'seed_sequence': seed_sequence})
+    function = self.static_draw_cash_flows
+    if len(list_of_kwargs) == 1 or number_of_workers == 1:
+      results = [function(**kwargs) for kwargs in list_of_kwargs]
+    else:
+      from concurrent.futures import ProcessPoolExecutor
+      with ProcessPoolExecutor(max_workers = number_of_workers) as executor:
+        futures = [executor.submit(function, **kwargs) for kwargs in list_of_kwargs]
+        results = [future.result() for future in futures]
+    return {key: np.stack([result[key] for result in results])
+        for key in self.SIMULATION_KEYS}
+
+  @staticmethod
+  def static_compute_expected_cash_flows(sums_of_schedules, prepayment_rates,
+      default_rates, severity = 0.0):
+    r"""
+    Returns dict with expected cash flows per period (a key per item of
+    SIMULATION_KEYS) of loans with given sums of schedules over the loans
+    (as by static_compute_schedules), under curves of rates per period
+    (arrays with an item per period, or matrices with a row per scenario,
+    giving matrices of cash flows).
+
+    With survival factor S (fraction of the pool neither defaulted nor
+    prepaid) before the period, and MDR d and SMM s in the period, the
+    balance before defaults by S*d, interest and scheduled principal are
+    paid by S*(1 - d), the balance after those prepays by S*(1 - d)*s, and
+    the survival factor becomes S*(1 - d)*(1 - s).
+    """
+    import numpy as np
+    survivals = np.cumprod((1 - default_rates)*(1 - prepayment_rates), axis = -1)
+    survivals_before = np.concatenate(
+        [np.ones(survivals.shape[:-1] + (1,)), survivals[..., :-1]], axis = -1)
+    performing_factors = survivals_before*(1 - default_rates)
+    balances = sums_of_schedules['balance']
+    balances_before = balances + sums_of_schedules['amortization']
+    cash_flows = {
+        'interest': performing_factors*sums_of_schedules['interest'],
+        'scheduled_principal': performing_factors*sums_of_schedules['amortization'],
+        'prepayment': performing_factors*prepayment_rates*balances,
+        'default': survivals_before*default_rates*balances_before,
+        'balance': survivals*balances}
+    return FixedInstallmentLoanCalculator.static_complete_cash_flows(cash_flows, severity)
+
+  @staticmethod
+  def static_draw_cash_flows(principals, rates_per_period, numbers_of_installments,
+      prepayment_rates, default_rates, severity = 0.0, amortization_system = 'price',
+      number_of_paths = 1, seed_sequence = None):
+    r"""
+    Returns dict with cash flows per period (a key per item of
+    SIMULATION_KEYS) of loans each defaulting or prepaying in full at a
+    random period, averaged over number_of_paths paths.
+
+    Periods of default and of prepayment are drawn independently for each
+    loan, by inverting the cumulative hazards of the curves at standard
+    exponential draws; a loan defaulting and prepaying at the same period
+    defaults. The expected cash flows are those of
+    static_compute_expected_cash_flows.
+    """
+    import numpy as np
+    generator = np.random.default_rng(seed_sequence)
+    schedules = FixedInstallmentLoanCalculator.static_compute_schedules(
+        principals, rates_per_period, numbers_of_installments, amortization_system)
+    balances = schedules['balance']
+    balances_before = balances + schedules['amortization']
+    number_of_loans, number_of_periods = balances.shape
+    periods = np.arange(number_of_periods)[None, :]
+    with np.errstate(divide = 'ignore'):
+      cumulative_default_hazards = np.cumsum(-np.log1p(-default_rates))
+      cumulative_prepayment_hazards = np.cumsum(-np.log1p(-prepayment_rates))
+    sums = {key: np.zeros(number_of_periods) for key in
+        ['interest', 'scheduled_principal', 'prepayment', 'default', 'balance']}
+    for path in range(number_of_paths):
+      # Periods of events (number_of_periods if none), as first periods
+      #with cumulative hazards reaching exponential draws
+      default_periods = np.searchsorted(cumulative_default_hazards,
+          generator.standard_exponential(number_of_loans))[:, None]
+      prepayment_periods = np.searchsorted(cumulative_prepayment_hazards,
+          generator.standard_exponential(number_of_loans))[:, None]
+      are_alive = (periods <= default_periods) & (periods <= prepayment_periods)
+      are_defaulting = (periods == default_periods) & are_alive
+      are_performing = are_alive & ~are_defaulting
+      are_prepaying = (periods == prepayment_periods) & are_performing
+      sums['interest'] += (schedules['interest']*are_performing).sum(axis = 0)
+      sums['scheduled_principal'] += (schedules['amortization']*are_performing).sum(axis = 0)
+      sums['prepayment'] += (balances*are_prepaying).sum(axis = 0)
+      sums['default'] += (balances_before*are_defaulting).sum(axis = 0)
+      sums['balance'] += (balances*(are_performing & ~are_prepaying)).sum(axis = 0)
+    cash_flows = {key: total/number_of_paths for key, total in sums.items()}
+    return FixedInstallmentLoanCalculator.static_complete_cash_flows(cash_flows, severity)
+
+  @staticmethod
+  def static_complete_cash_flows(cash_flows, severity):
+    r"""
+    Adds `recovery`, `loss` and `cash_flow` (interest, scheduled principal,
+    prepayment and recovery) to dict of cash flows per period, in place.
+    """
+    cash_flows['recovery'] = (1 - severity)*cash_flows['default']
+    cash_flows['loss'] = severity*cash_flows['default']
+    cash_flows['cash_flow'] = cash_flows['interest'] + cash_flows['scheduled_principal'] \
+        + cash_flows['prepayment'] + cash_flows['recovery']
+    return cash_flows
@@ -26,6 +26,8 @@
 
 ########################################################################
 
+from collections import OrderedDict as collections_OrderedDict
+
 class Formula():
   r"""
   Object which implements a rule in which objects given as values
@@ -37,17 +39,119 @@ class Formula():
   The class allows for additional handling operations specified in
   instantiation, via the attribute `argument_handler`. In their absence,
   is not very much different from its inner function.
+
+  If `memoize` is True, results are cached on the (handled) arguments, in
+  a least-recently-used cache holding at most `cache_size` results (or
+  unbounded if `cache_size` is None). This pays off when the same
+  arguments come again and again, as on recombining trees. Arguments
+  which are not hashable are converted into hashable keys (lists and tuples
+  item by item, dicts and sets by their sorted items, NumPy arrays by
+  their shape, dtype and bytes); calls whose arguments still cannot be
+  converted are not cached. Counters of hits, misses, evictions and
+  uncacheable calls are given by get_cache_statistics, so that it can be
+  told which formulas benefit from it.
+
+  An optional name identifies the formula (for example, when profiling);
+  by default it is the name of the inner function.
   """
   
-  def __init__(self, inner_function, argument_handler = None):
+  def __init__(self, inner_function, argument_handler = None, memoize = False,
+      cache_size = 1024, name = None):
     self.func = inner_function
     self.argument_handler = argument_handler
+    self.name = name
+    self.memoize = memoize
+    if memoize:
+      if cache_size is not None and cache_size < 1:
+        raise ValueError('Expected cache_size to be positive or None')
+      from collections import OrderedDict
+      self.cache_size = cache_size
+      self.cache = OrderedDict()
+      self.reset_cache_statistics()
   
   def call(self, *posargs, **kwargs):
     """Executes the formula on given arguments, allowing argument handling."""
     if self.argument_handler:
       posargs, kwargs = self.argument_handler(*posargs, **kwargs)
-    return self.inner_function(*posargs, **kwargs) # That is, __call__ of it
+    if self.memoize:
+      return self.call_with_memoization(posargs, kwargs)
+    return self.func(*posargs, **kwargs) # That is, __call__ of it
+
+  def call_with_memoization(self, posargs, kwargs):
+    """Executes the inner function, unless the result is already cached."""
+    try:
+      key = (posargs, frozenset(kwargs.items()))
+      hash(key)
+    except TypeError:
+      key = self.static_produce_hashable_key(posargs, kwargs)
+      if key is None:
+        self.cache_statistics['uncacheable'] += 1
+        return self.func(*posargs, **kwargs)
+    try:
+      result = self.cache[key]
+    except KeyError:
+      self.cache_statistics['misses'] += 1
+      result = self.func(*posargs, **kwargs)
+      self.cache[key] = result
+      if self.cache_size is not None and len(self.cache) > self.cache_size:
+        self.cache.popitem(last = False) # Least recently used
+        self.cache_statistics['evictions'] += 1
+    else:
+      self.cache_statistics['hits'] += 1
+      self.cache.move_to_end(key)
+    return result
+
+  @staticmethod
+  def static_produce_hashable_key(posargs, kwargs):
+    r"""
+    Returns a hashable key equivalent to given arguments for memoization,
+    or None if some argument cannot be converted.
+    """
+    def make_hashable(obj):
+      # The type is kept so that, for example, (1, 2) and [1, 2] differ
+      if isinstance(obj, (list, tuple)):
+        return (type(obj).__name__,) + tuple(make_hashable(item) for item in obj)
+      elif isinstance(obj, dict):
+        return ('dict',) + tuple(sorted(
+            (make_hashable(key), make_hashable(value)) for key, value in obj.items()))
+      elif isinstance(obj, (set, frozenset)):
+        return ('set',) + tuple(sorted(make_hashable(item) for item in obj))
+      elif hasattr(obj, 'tobytes') and hasattr(obj, 'dtype'): # NumPy arrays
+        return ('ndarray', obj.shape, str(obj.dtype), obj.tobytes())
+      else:
+        hash(obj)
+        return obj
+    try:
+      return (make_hashable(posargs), make_hashable(kwargs))
+    except TypeError: # Unhashable, or unsortable items in dicts or sets
+      return None
+
+  def get_cache_statistics(self):
+    r"""
+    Returns dict with counters of hits, misses, evictions and uncacheable
+    calls since creation (or last reset), as well as the current size.
+    """
+    if not self.memoize:
+      raise ValueError('Formula does not memoize')
+    cache_statistics = dict(self.cache_statistics)
+    cache_statistics['size'] = len(self.cache)
+    return cache_statistics
+
+  def get_name(self):
+    """Returns name of the formula, or of its inner function if not named."""
+    if self.name is not None:
+      return self.name
+    return getattr(self.func, '__name__', repr(self.func))
+
+  def reset_cache_statistics(self):
+    """Sets all counters of the cache statistics to zero."""
+    self.cache_statistics = {'hits': 0, 'misses': 0, 'evictions': 0, 'uncacheable': 0}
+    return None
+
+  def clear_cache(self):
+    """Forgets all cached results (counters are kept)."""
+    self.cache.clear()
+    return None
     
 class FormulaOnDicts():
   r"""
@@ -61,17 +165,19 @@ class FormulaOnDicts():
   
   This Formula (or alternatively its instantiation arguments) and the
   dictionary for correct extraction (or alternatively the appropriate
-  argument transforming/processing object) are given at instantiation.
+  argument transforming/processing object) are given at instantiation,
+  as well as an optional name (by default, that of the inner formula).
   """
   
   def __init__(self, dict_for_argument_processing, inner_formula = None,
-      inner_function = None, argument_handler = None):
+      inner_function = None, argument_handler = None, name = None):
     # Formula inside the FormulaOnDicts may be given explicitly
     #or implicitly, in which case it is formed by the given inner_function
     #and argument_handler
     if inner_formula is None:
       inner_formula = Formula(inner_function, argument_handler)
     self.inner_formula = inner_formula # This might even be None
+    self.name = name
     # Can give either a DictArgumentProcessor instance, or a dict
     #which conforms to the requirements of DictArgumentProcessor
     if isinstance(dict_for_argument_processing, DictArgumentProcessor):
@@ -79,17 +185,325 @@ class FormulaOnDicts():
     elif isinstance(dict_for_argument_processing, dict):
       # It is fundamental, for the objectives of this class, to set
       #`raise_error_if_not_all_input_items_are_dicts` to True
-      self.dict_processor = DictArgumentProcessor(
+      # Processors with the same rules are shared, validated only once
+      self.dict_processor = DictArgumentProcessor.get_interned_instance(
           dict_for_argument_processing = dict_for_argument_processing,
           raise_error_if_not_all_input_items_are_dicts = True)
     else:
       raise TypeError('dict_for_argument_processing must be either a dict'\
           'or a DictArgumentProcessor')
+    self.set_callables()
+
+  def set_callables(self):
+    """Sets the attributes `extractor` and `inner_callable` used by call."""
+    # The compiled extractor is called directly, skipping a method call,
+    #and so is the inner function if there is no argument handling
+    self.extractor = self.dict_processor.extractor
+    if not self.inner_formula.argument_handler and not self.inner_formula.memoize:
+      self.inner_callable = self.inner_formula.func
+    else:
+      self.inner_callable = self.call_inner_formula
+
+  def call_inner_formula(self, *posargs, **kwargs):
+    r"""
+    Calls the inner formula, looking its `call` method up at every call
+    (so that it can be replaced later, as FormulaProfiler does).
+    """
+    return self.inner_formula.call(*posargs, **kwargs)
+
+  def __getstate__(self):
+    # Callables are set again after unpickling (for example, in another
+    #process), as the compiled extractor cannot be pickled
+    state = dict(self.__dict__)
+    del state['extractor']
+    del state['inner_callable']
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self.set_callables()
 
   def call(self, *posargs, **kwargs):
     """Executes the inner formula and therefore the inner function"""
-    new_posargs, new_kwargs = self.dict_processor.process(posargs, kwargs)
-    return self.inner_formula.call(*new_posargs, **new_kwargs)
+    new_posargs, new_kwargs = self.extractor(posargs, kwargs)
+    return self.inner_callable(*new_posargs, **new_kwargs)
+
+  def get_name(self):
+    """Returns name of the formula, or of its inner formula if not named."""
+    if self.name is not None:
+      return self.name
+    return self.inner_formula.get_name()
+
+  def get_keys_read_from_argument(self, argument_name):
+    r"""
+    Returns set of the keys read from the dict given as the keyword
+    argument of given name (for example, `very_node_dict`).
+    """
+    return {value[2] for value in self.dict_processor.dict_for_argument_processing.values()
+        if value[0].lower().startswith('k') and value[1] == argument_name
+        and value[2] is not None}
+
+  @staticmethod
+  def static_order_by_dependencies(output_keys_and_formulas, argument_name,
+      renamings = None):
+    r"""
+    Given a list of tuples of output key and FormulaOnDicts, whose outputs
+    are written to the dict given as keyword argument `argument_name`,
+    returns a list of the same tuples ordered so that every formula comes
+    after those whose outputs it reads from that dict (other than its own,
+    which it reads before updating it).
+
+    Relative order is kept whenever possible. Raises ValueError if output
+    keys are repeated or if dependencies are circular.
+
+    If a dict renamings is given, a key read is taken as its value in it
+    (if present) for the purpose of dependencies.
+    """
+    if renamings is None:
+      renamings = {}
+    output_keys = [output_key for output_key, formula_on_dicts in output_keys_and_formulas]
+    if len(set(output_keys)) != len(output_keys):
+      raise ValueError('Output keys cannot be repeated')
+    dependencies = {
+        output_key: ({renamings.get(key, key)
+            for key in formula_on_dicts.get_keys_read_from_argument(argument_name)}
+            & set(output_keys)) - {output_key} # A formula may update its own output
+        for output_key, formula_on_dicts in output_keys_and_formulas}
+    ordered = []
+    already_ordered = set()
+    remaining = list(output_keys_and_formulas)
+    while remaining:
+      # Take the first formula whose dependencies are all computed
+      for idx, (output_key, formula_on_dicts) in enumerate(remaining):
+        if dependencies[output_key] <= already_ordered:
+          break
+      else:
+        raise ValueError('Circular dependencies among formulas')
+      ordered.append(remaining.pop(idx))
+      already_ordered.add(output_key)
+    return ordered
+
+class VectorizedFormulaOnDicts(FormulaOnDicts):
+  r"""
+  A FormulaOnDicts meant for dicts whose values are whole columns (NumPy
+  arrays) of node data, as the level dicts of a FrozenRecombiningBinaryTree,
+  instead of the data of a single node.
+
+  The processing rules are the same: for example, the value
+  ('kwarg', 'parent_dict', 'asset_value') reads the column under key
+  `asset_value` of the dict given as keyword argument `parent_dict`. The
+  inner function is then called once on whole arrays. Inner functions
+  written with arithmetic operators or NumPy functions work unchanged;
+  others (with branching, or using the module math) need
+  `vectorize_inner_function` set to True, which wraps them with
+  numpy.vectorize (still looping over nodes, but without per-node
+  argument processing).
+  """
+
+  def __init__(self, dict_for_argument_processing, inner_formula = None,
+      inner_function = None, argument_handler = None,
+      vectorize_inner_function = False, name = None):
+    self.vectorize_inner_function = vectorize_inner_function
+    super().__init__(
+        dict_for_argument_processing = dict_for_argument_processing,
+        inner_formula = inner_formula,
+        inner_function = inner_function,
+        argument_handler = argument_handler,
+        name = name)
+
+  def set_callables(self):
+    """Sets the attributes `extractor` and `inner_callable` used by call."""
+    super().set_callables()
+    if self.vectorize_inner_function:
+      import numpy as np
+      self.inner_callable = np.vectorize(self.inner_callable)
+
+  @staticmethod
+  def static_produce_from_formula_on_dicts(formula_on_dicts):
+    r"""
+    Returns a VectorizedFormulaOnDicts with the same rules and inner formula
+    as a given FormulaOnDicts, or the very instance if already vectorized.
+    """
+    if isinstance(formula_on_dicts, VectorizedFormulaOnDicts):
+      return formula_on_dicts
+    return VectorizedFormulaOnDicts(
+        dict_for_argument_processing = formula_on_dicts.dict_processor,
+        inner_formula = formula_on_dicts.inner_formula,
+        name = formula_on_dicts.name)
+
+class FormulaGraph():
+  r"""
+  A set of named FormulaOnDicts evaluated together at every node of a
+  tree, sharing intermediate quantities (such as a one-step discount
+  factor or a risk-neutral probability) instead of recomputing them.
+
+  Every formula reads its inputs from the dicts given as keyword arguments
+  `very_node_dict` (the data of the node, plus the results of the formulas
+  of the graph already evaluated there) and `all_other_args`, as in
+  compute_formula_at_nodes, and produces the value under its name. Inputs
+  are read from the processing rules, so nothing else is declared.
+
+  When added, formulas which would compute the same thing (same inner
+  function and argument handler reading the same inputs, up to renaming of
+  deduplicated intermediates) are detected, and the later one becomes an
+  alias of the earlier one, not being evaluated. Formulas reading nothing
+  from `very_node_dict`, except results of other such formulas, give the
+  same value at every node of a level (they may still depend on the key
+  `level` of `all_other_args`): they are evaluated once per level.
+
+  Only names added with `is_output` True are written to the nodes; the
+  others are intermediates, forgotten after use. The method explain
+  describes the evaluation plan, including what was deduplicated.
+  """
+
+  def __init__(self):
+    self.list_of_names = [] # Of distinct formulas, in order of addition
+    self.formulas_by_name = {}
+    self.signatures_by_name = {}
+    self.names_by_signature = {}
+    self.aliases = {} # Maps name of duplicate to name of formula evaluated
+    self.output_names = []
+
+  def add_formula(self, name, formula_on_dicts, is_output = True):
+    r"""
+    Adds a FormulaOnDicts producing the value under given name, returning
+    the name under which it is actually evaluated (another one if it
+    duplicates a formula already in the graph).
+    """
+    if name in self.formulas_by_name or name in self.aliases:
+      raise ValueError('Name already in formula graph')
+    if is_output:
+      self.output_names.append(name)
+    signature = self.produce_signature(formula_on_dicts)
+    if signature in self.names_by_signature:
+      self.aliases[name] = self.names_by_signature[signature]
+      return self.aliases[name]
+    self.names_by_signature[signature] = name
+    self.signatures_by_name[name] = signature
+    self.formulas_by_name[name] = formula_on_dicts
+    self.list_of_names.append(name)
+    return name
+
+  def produce_signature(self, formula_on_dicts):
+    r"""
+    Returns a hashable object which is the same for formulas computing the
+    same thing, with names of deduplicated formulas replaced by the names
+    of the formulas evaluated instead.
+    """
+    rules = []
+    for key, value in formula_on_dicts.dict_processor.dict_for_argument_processing.items():
+      kind = value[0][0].lower()
+      if kind == 'k' and value[1] == 'very_node_dict':
+        value = (kind, value[1], self.aliases.get(value[2], value[2]))
+      else:
+        value = (kind, value[1], value[2])
+      rules.append((key, value))
+    inner_formula = formula_on_dicts.inner_formula
+    return (
+        inner_formula.func,
+        inner_formula.argument_handler,
+        getattr(formula_on_dicts, 'vectorize_inner_function', False),
+        tuple(sorted(rules, key = repr)))
+
+  def get_name_evaluated(self, name):
+    """Returns the name of the formula evaluated to produce given name."""
+    return self.aliases.get(name, name)
+
+  def produce_plan(self):
+    r"""
+    Returns list of tuples (name, formula_on_dicts, is_level_invariant,
+    aliases) with the distinct formulas, in an order solving their
+    dependencies, aliases being the names deduplicated into each.
+    """
+    ordered = FormulaOnDicts.static_order_by_dependencies(
+        [(name, self.formulas_by_name[name]) for name in self.list_of_names],
+        argument_name = 'very_node_dict',
+        renamings = self.aliases)
+    plan = []
+    level_invariant_names = set()
+    for name, formula_on_dicts in ordered:
+      keys_read = {self.get_name_evaluated(key)
+          for key in formula_on_dicts.get_keys_read_from_argument('very_node_dict')}
+      # Keys read which are not names of the graph come from node data
+      is_level_invariant = keys_read <= level_invariant_names
+      if is_level_invariant:
+        level_invariant_names.add(name)
+      aliases = sorted(alias for alias, aliased in self.aliases.items() if aliased == name)
+      plan.append((name, formula_on_dicts, is_level_invariant, aliases))
+    return plan
+
+  def evaluate_at_dict(self, very_node_dict, all_other_args, plan = None,
+      level_invariant_values = None):
+    r"""
+    Evaluates the graph with the data of a node (or the columns of a level),
+    returning a dict with the value under every output name.
+
+    The dict `level_invariant_values`, if given, caches the results of
+    level-invariant formulas: they are computed only if absent from it.
+    Data of the node is not altered.
+    """
+    if plan is None:
+      plan = self.produce_plan()
+    if level_invariant_values is None:
+      level_invariant_values = {}
+    scope = dict(very_node_dict)
+    for name, formula_on_dicts, is_level_invariant, aliases in plan:
+      if is_level_invariant:
+        if name not in level_invariant_values:
+          level_invariant_values[name] = formula_on_dicts.call(
+              very_node_dict = scope,
+              all_other_args = all_other_args)
+        scope[name] = level_invariant_values[name]
+      else:
+        scope[name] = formula_on_dicts.call(
+            very_node_dict = scope,
+            all_other_args = all_other_args)
+      for alias in aliases:
+        scope[alias] = scope[name]
+    return {name: scope[name] for name in self.output_names}
+
+  def explain(self, output_as = 'single_string'):
+    r"""
+    Returns a single string (or returns a list of several lines, or prints)
+    describing the evaluation plan: formulas in order of evaluation, their
+    inputs, whether evaluated once per node or once per level, and the
+    formulas deduplicated.
+
+    Possible values for output_as:
+    'single_string': returns a single string, likely with '\n' characters within
+    'list_of_lines': returns a list of lines (strings without line breaks)
+    'print_instead': prints the result (returning None)
+    """
+    plan = self.produce_plan()
+    all_lines = ['FormulaGraph with {} formulas, {} evaluated, {} deduplicated'.format(
+        len(self.list_of_names) + len(self.aliases), len(plan), len(self.aliases))]
+    for idx, (name, formula_on_dicts, is_level_invariant, aliases) in enumerate(plan):
+      if is_level_invariant:
+        frequency = 'once per level'
+      else:
+        frequency = 'once per node'
+      if name in self.output_names:
+        kind = 'output'
+      else:
+        kind = 'intermediate'
+      all_lines.append('{}. {} ({}, {})'.format(idx + 1, name, kind, frequency))
+      for argument_name in ['very_node_dict', 'all_other_args']:
+        keys_read = formula_on_dicts.get_keys_read_from_argument(argument_name)
+        if keys_read:
+          all_lines.append('   reads from {}: {}'.format(
+              argument_name, ', '.join(sorted(keys_read))))
+      if aliases:
+        all_lines.append('   also serves (deduplicated): {}'.format(', '.join(aliases)))
+    if output_as == 'single_string':
+      return '\n'.join(all_lines)
+    elif output_as == 'list_of_lines':
+      return all_lines
+    elif output_as == 'print_instead':
+      for line in all_lines:
+        print(line)
+      return None
+    else:
+      raise ValueError('Inexistent option for output format')
 
 class DictArgumentProcessor():
   r"""
@@ -160,9 +574,27 @@ class DictArgumentProcessor():
   On the other hand, the option `raise_error_if_any_input_items_is_dict`,
   does a similar thing in the opposite direction: `value[2]` should then
   be None, not allowing for direct "read dict key" operations.
+
+  Since the rules are fixed, they are validated and compiled only once, at
+  initialization, into a function stored as the attribute `extractor`
+  (with its source code as `extractor_source`), which does the work of
+  `transform` without loops or branching. For example, the dict
+  {0: ('p', 1, 'a'), 'x': ('k', 'y', None)} is compiled into:
+
+  def extractor(posargs, kwargs):
+    return ((posargs[1]['a'],), {'x': kwargs['y']})
+
+  Instances can also be obtained by get_interned_instance, which creates
+  (and validates) an instance only once per process for the same rules and
+  options, sharing it afterwards. FormulaOnDicts does so.
   """
+
+  # Class attributes, see get_interned_instance
+  interned_instances = collections_OrderedDict()
+  maximum_number_of_interned_instances = 1024
   
   def __init__(
+      self,
       dict_for_argument_processing,
       complete_new_posargs_with_nones = False,
       raise_error_if_posargs_and_kwargs_coexist = False,
@@ -183,14 +615,137 @@ class DictArgumentProcessor():
       if not error_message:
         error_message = 'Expected a valid dictionary for argument processing.'
       raise ValueError(error_message)
-    self.dict_for_argument_processing = dict_for_argument_processing
+    # A copy, so that later changes to the given dict have no effect
+    self.dict_for_argument_processing = dict(dict_for_argument_processing)
     self.complete_new_posargs_with_nones = complete_new_posargs_with_nones
+    self.extractor_source = self.static_produce_extractor_source(
+        dict_for_argument_processing,
+        complete_new_posargs_with_nones)
+    self.set_extractor()
+
+  @classmethod
+  def get_interned_instance(cls, dict_for_argument_processing, **kwargs):
+    r"""
+    Returns an instance with given rules and options (given as keyword
+    arguments, as for initialization), creating and validating it only if
+    no such instance was asked for before in the process; otherwise, the
+    instance created then is returned, shared.
+
+    Instances are interned by a canonical frozen form of their rules and
+    options (see produce_canonical_key), and are never altered after
+    initialization, so sharing them is safe. They are kept even when no
+    longer in use (as with formulas built anew at every call, such as the
+    one of compute_formula_on_dictionary_for_modeling_tree), in a
+    least-recently-used cache holding at most
+    `maximum_number_of_interned_instances` of them, so memory does not grow
+    with the number of distinct rules ever asked for. They are released by
+    clear_interned_instances.
+    """
+    key = cls.produce_canonical_key(dict_for_argument_processing, **kwargs)
+    if key is None: # Not even hashable, so invalid: let initialization raise
+      return cls(dict_for_argument_processing, **kwargs)
+    instance = cls.interned_instances.get(key)
+    if instance is None:
+      instance = cls(dict_for_argument_processing, **kwargs)
+      cls.interned_instances[key] = instance
+      if len(cls.interned_instances) > cls.maximum_number_of_interned_instances:
+        cls.interned_instances.popitem(last = False) # Least recently used
+    else:
+      cls.interned_instances.move_to_end(key)
+    return instance
+
+  @classmethod
+  def clear_interned_instances(cls):
+    r"""
+    Forgets all interned instances, releasing their memory, and returns
+    None. Instances in use are not affected, but are no longer shared with
+    those asked for later.
+    """
+    cls.interned_instances.clear()
+    return None
+
+  @staticmethod
+  def produce_canonical_key(dict_for_argument_processing, **kwargs):
+    r"""
+    Returns a hashable frozen form of rules and options, equal for equal
+    rules and options (irrespective of order), or None if impossible.
+
+    Types are part of the key, so that for example the keys 1 and True
+    (equal in Python) give different keys.
+    """
+    try:
+      rules = tuple(sorted(
+          ((type(key).__name__, key), tuple((type(item).__name__, item) for item in value))
+          for key, value in dict_for_argument_processing.items()))
+      options = tuple(sorted((name, bool(option)) for name, option in kwargs.items()))
+      key = (rules, options)
+      hash(key)
+    except (TypeError, AttributeError):
+      return None
+    return key
+
+  def set_extractor(self):
+    """Sets the attribute `extractor` compiling `extractor_source`."""
+    namespace = {}
+    exec(self.extractor_source, namespace)
+    self.extractor = namespace['extractor']
+
+  def __getstate__(self):
+    # The extractor is compiled again after unpickling
+    state = dict(self.__dict__)
+    del state['extractor']
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self.set_extractor()
     
-  def transform(posargs, kwargs):
+  def transform(self, posargs, kwargs):
     r"""
     Tranforms/processes a tuple and a dict into new ones according to
     rules set in the `dict_for_argument_processing` attribute.
     """
+    return self.extractor(posargs, kwargs)
+
+  @staticmethod
+  def static_produce_extractor_source(dict_for_argument_processing,
+      complete_new_posargs_with_nones = False):
+    r"""
+    Produces the source code of a function `extractor`, receiving `posargs`
+    and `kwargs`, which does what `transform` does according to a dict
+    assumed to be valid for processing.
+
+    Keys and indices are written with repr, so that only ints and strings
+    (as ensured by is_dict_valid_for_processing) reach the code.
+    """
+    expressions_in_new_posargs = {}
+    expressions_in_new_kwargs = []
+    for key, value in dict_for_argument_processing.items():
+      if value[0].lower().startswith('p'):
+        expression = 'posargs[{!r}]'.format(value[1])
+      else:
+        expression = 'kwargs[{!r}]'.format(value[1])
+      if value[2] is not None:
+        expression += '[{!r}]'.format(value[2])
+      if isinstance(key, int):
+        expressions_in_new_posargs[key] = expression
+      else:
+        expressions_in_new_kwargs.append('{!r}: {}'.format(key, expression))
+    # Gaps are filled with None (if not allowed, validation already failed)
+    max_index_in_tuple = max(expressions_in_new_posargs, default = -1)
+    new_posargs_source = ''.join(
+        expressions_in_new_posargs.get(idx, 'None') + ', '
+        for idx in range(max_index_in_tuple + 1))
+    new_kwargs_source = ', '.join(expressions_in_new_kwargs)
+    return 'def extractor(posargs, kwargs):\n'\
+        '  return (({}), {{{}}})\n'.format(new_posargs_source, new_kwargs_source)
+
+  def transform_without_compilation(self, posargs, kwargs):
+    r"""
+    Tranforms/processes a tuple and a dict into new ones according to
+    rules set in the `dict_for_argument_processing` attribute, reading
+    the rules at every call (and thus much slower than `transform`).
+    """
     # Note: sometimes what is done is called transformation, sometimes processing
     pre_pre_new_posargs = {} # First do a dictionary, convert to tuple later
     new_kwargs = {}
@@ -222,11 +777,11 @@ class DictArgumentProcessor():
     max_index_in_tuple = -1 # Empty tuple
     for key in pre_pre_new_posargs:
       max_index_in_tuple = max(max_index_in_tuple, key)
-    if not complete_new_posarg_with_nones:
+    if not self.complete_new_posargs_with_nones:
       if len(pre_pre_new_posargs) != max_index_in_tuple + 1:
         raise ValueError('Integer keys of dict must form a full range.')
     pre_new_posargs = []
-    for idx in range(max_index_in_tuple):
+    for idx in range(max_index_in_tuple + 1):
       if idx in pre_pre_new_posargs:
         pre_new_posargs.append(pre_pre_new_posargs[idx])
       else:
@@ -293,7 +848,7 @@ class DictArgumentProcessor():
           was_problem_detected = True
           error_message = 'Expected value of dict to be tuple of length 3'
           break
-        elif not isinstance(value[0], str) or (value[0][0].lower() not in p_and_k):
+        elif not isinstance(value[0], str) or not value[0] or (value[0][0].lower() not in p_and_k):
           was_problem_detected = True
           error_message = 'Expected first item of value to start with \'p\' or \'k\''
           break
@@ -320,7 +875,7 @@ class DictArgumentProcessor():
             break
           else:
             total_numerical_output_indices_detected += 1
-            max_numerical_output_index_detected = max(max_numerical_output_index_detected, value[1])
+            max_numerical_output_index_detected = max(max_numerical_output_index_detected, key)
         else: # Certainly isinstance(key, str) by previous tests
           if not key:
             was_problem_detected = True
@@ -370,3 +925,221 @@ class DictArgumentProcessor():
         was_problem_detected = True
         error_message = 'Expected no gaps in indices for output tuple'
     return (not was_problem_detected, error_message)
+
+class FormulaProfiler():
+  r"""
+  Opt-in instrumentation of formulas and of the formula and function
+  methods of trees, recording for every formula (by name) and tree level:
+  number of calls, cumulative and per-call wall time and, for
+  FormulaOnDicts, the time spent extracting arguments versus the time
+  spent in the inner function.
+
+  Instrumentation is done by replacing the methods of the classes by
+  timed versions while the profiler is enabled (by enable and disable,
+  or in a with statement), and putting the originals back afterwards, so
+  that it costs nothing when disabled. Only one profiler can be enabled
+  at a time.
+
+  Records are keyed by tuples (category, name, level), category being the
+  qualified name of the method (for example, `FormulaOnDicts.call`), name
+  the name of the formula (or the output key for tree methods receiving
+  functions) and level the tree level of the call. The level is the key
+  `level` of `all_other_args` if present (as on FrozenRecombiningBinaryTree)
+  and otherwise, within a method of a FrozenBinaryTreeOfDicts, the length
+  of the path of the node whose dict is given (or None elsewhere). Tree
+  methods get a record per call, with level None, and those receiving
+  functions also a record per level, timing the calls of the function.
+  Records can be exported by to_dict and to_json.
+  """
+
+  enabled_profiler = None # Class attribute, the profiler enabled if any
+  
+  def __init__(self):
+    self.records = {}
+    self.original_methods = []
+    # Levels of nodes by id of their dicts, within methods of trees of dicts
+    self.levels_by_dict_id = {}
+
+  def __enter__(self):
+    self.enable()
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.disable()
+    return False
+
+  def is_enabled(self):
+    """Returns whether this profiler is the one enabled."""
+    return FormulaProfiler.enabled_profiler is self
+
+  def add_to_record(self, category, name, level, total_time,
+      extraction_time = 0.0, inner_time = 0.0):
+    """Adds a call with given times to the record of its key."""
+    key = (category, name, level)
+    record = self.records.get(key)
+    if record is None:
+      record = {'calls': 0, 'total_time': 0.0, 'extraction_time': 0.0, 'inner_time': 0.0}
+      self.records[key] = record
+    record['calls'] += 1
+    record['total_time'] += total_time
+    record['extraction_time'] += extraction_time
+    record['inner_time'] += inner_time
+    return None
+
+  def get_level(self, kwargs):
+    r"""
+    Returns level given in the dict `all_other_args` of kwargs, or else
+    the level of the node whose dict is given (as `very_node_dict` or
+    `relevant_child_dict`) within a method of a tree of dicts, or None.
+    """
+    all_other_args = kwargs.get('all_other_args')
+    if isinstance(all_other_args, dict) and 'level' in all_other_args:
+      return all_other_args['level']
+    for argument_name in ['very_node_dict', 'relevant_child_dict']:
+      if argument_name in kwargs:
+        return self.levels_by_dict_id.get(id(kwargs[argument_name]))
+    return None
+
+  def produce_timed_formula_call(self, original_method):
+    """Returns timed version of Formula.call."""
+    from time import perf_counter
+    profiler = self
+    def call(formula, *posargs, **kwargs):
+      start = perf_counter()
+      result = original_method(formula, *posargs, **kwargs)
+      elapsed = perf_counter() - start
+      profiler.add_to_record('Formula.call', formula.get_name(), None, elapsed,
+          inner_time = elapsed)
+      return result
+    return call
+
+  def produce_timed_formula_on_dicts_call(self, original_method):
+    """Returns timed version of FormulaOnDicts.call, timing each part."""
+    from time import perf_counter
+    profiler = self
+    def call(formula_on_dicts, *posargs, **kwargs):
+      start = perf_counter()
+      new_posargs, new_kwargs = formula_on_dicts.extractor(posargs, kwargs)
+      extracted = perf_counter()
+      result = formula_on_dicts.inner_callable(*new_posargs, **new_kwargs)
+      finish = perf_counter()
+      profiler.add_to_record(
+          type(formula_on_dicts).__name__ + '.call',
+          formula_on_dicts.get_name(),
+          profiler.get_level(kwargs),
+          finish - start,
+          extraction_time = extracted - start,
+          inner_time = finish - extracted)
+      return result
+    return call
+
+  def produce_timed_function(self, category, name, function):
+    """Returns timed version of a function given to a tree method, by level."""
+    from time import perf_counter
+    profiler = self
+    def timed_function(**kwargs):
+      start = perf_counter()
+      result = function(**kwargs)
+      profiler.add_to_record(category, name, profiler.get_level(kwargs), perf_counter() - start)
+      return result
+    return timed_function
+
+  def produce_timed_tree_method(self, category, original_method):
+    """Returns timed version of a tree method receiving formulas or functions."""
+    from time import perf_counter
+    profiler = self
+    def method(tree, *posargs, **kwargs):
+      # Name of formula if any, otherwise the output key if any
+      names = [arg.get_name() for arg in list(posargs) + list(kwargs.values())
+          if hasattr(arg, 'get_name')]
+      if names:
+        name = names[0]
+      elif 'output_key' in kwargs:
+        name = kwargs['output_key']
+      elif posargs and isinstance(posargs[0], str):
+        name = posargs[0]
+      else:
+        name = None
+      # Functions (second argument) are timed at every call, by level
+      if 'function' in kwargs:
+        kwargs['function'] = profiler.produce_timed_function(category, name, kwargs['function'])
+      elif category.split('.')[-1].startswith('propagate_function') and len(posargs) > 1:
+        posargs = (posargs[0], profiler.produce_timed_function(category, name, posargs[1])) + posargs[2:]
+      previous_levels_by_dict_id = profiler.levels_by_dict_id
+      if hasattr(tree, 'get_list_of_nodes'):
+        profiler.levels_by_dict_id = {id(node.data): len(node.path) for node in tree.get_list_of_nodes()}
+      start = perf_counter()
+      try:
+        result = original_method(tree, *posargs, **kwargs)
+      finally:
+        elapsed = perf_counter() - start
+        profiler.levels_by_dict_id = previous_levels_by_dict_id
+      profiler.add_to_record(category, name, None, elapsed)
+      return result
+    return method
+
+  def enable(self):
+    """Replaces methods by timed versions, returning None."""
+    if FormulaProfiler.enabled_profiler is not None:
+      raise ValueError('Another profiler is already enabled')
+    from .. import trees # Imported here as trees depends on this module
+    classes_and_method_names = [
+        (trees.FrozenBinaryTreeOfDicts, [
+            'compute_formula_at_nodes', 'compute_formulas_at_nodes',
+            'compute_formula_graph_at_nodes', 'propagate_formula_up',
+            'propagate_formula_down']),
+        (trees.FrozenRecombiningBinaryTree, [
+            'compute_formula_at_nodes', 'compute_formulas_at_nodes',
+            'compute_formula_graph_at_nodes', 'propagate_formula_up',
+            'propagate_formula_down', 'propagate_function_up',
+            'propagate_function_down'])]
+    self.original_methods = [(Formula, 'call', Formula.__dict__['call'])]
+    Formula.call = self.produce_timed_formula_call(Formula.call)
+    # VectorizedFormulaOnDicts inherits the timed call
+    self.original_methods.append((FormulaOnDicts, 'call', FormulaOnDicts.__dict__['call']))
+    FormulaOnDicts.call = self.produce_timed_formula_on_dicts_call(FormulaOnDicts.call)
+    for cls, method_names in classes_and_method_names:
+      for method_name in method_names:
+        original_method = cls.__dict__[method_name]
+        self.original_methods.append((cls, method_name, original_method))
+        setattr(cls, method_name, self.produce_timed_tree_method(
+            cls.__name__ + '.' + method_name, original_method))
+    FormulaProfiler.enabled_profiler = self
+    return None
+
+  def disable(self):
+    """Puts back the original methods, returning None."""
+    if not self.is_enabled():
+      raise ValueError('Profiler is not enabled')
+    for cls, method_name, original_method in reversed(self.original_methods):
+      setattr(cls, method_name, original_method)
+    self.original_methods = []
+    FormulaProfiler.enabled_profiler = None
+    return None
+
+  def reset(self):
+    """Forgets all records."""
+    self.records = {}
+    return None
+
+  def to_dict(self):
+    r"""
+    Returns dict with key `records`, holding a list with a dict for every
+    record (keys `category`, `name`, `level`, `calls`, `total_time`,
+    `time_per_call`, `extraction_time`, `inner_time`), sorted by
+    decreasing total time.
+    """
+    list_of_records = []
+    for (category, name, level), record in self.records.items():
+      exported_record = {'category': category, 'name': name, 'level': level}
+      exported_record.update(record)
+      exported_record['time_per_call'] = record['total_time']/record['calls']
+      list_of_records.append(exported_record)
+    list_of_records.sort(key = lambda x: x['total_time'], reverse = True)
+    return {'records': list_of_records}
+
+  def to_json(self, **kwargs):
+    """Returns to_dict exported as a JSON string (kwargs go to json.dumps)."""
+    import json
+    return json.dumps(self.to_dict(), **kwargs)
+
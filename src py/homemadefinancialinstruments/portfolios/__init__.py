@@ -0,0 +1,29 @@
+########################################################################
+# DOCUMENTATION / README
+########################################################################
+
+# File belonging to software package "homemade_financial_instruments"
+# Implements financial instruments and solutions for pricing and hedging.
+
+# For more information on functionality, see README.md
+# For more information on bugs and planned features, see ISSUES.md
+# For more information on versioning, see RELEASES.md
+
+# Copyright (C) 2026 Eduardo Fischer
+
+# This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License version 3
+#as published by the Free Software Foundation. See LICENSE.
+# Alternatively, see https://www.gnu.org/licenses/.
+
+# This program is distributed in the hope that it will be useful,
+#but without any warranty; without even the implied warranty of
+#merchantability or fitness for a particular purpose.
+
+########################################################################
+
+# Bring all classes to the subpackage scope, essentially merging the files
+from .portfolios import *
+
+########################################################################
+
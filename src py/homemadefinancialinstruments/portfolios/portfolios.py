@@ -0,0 +1,160 @@
+########################################################################
+# DOCUMENTATION / README
+########################################################################
+
+# File belonging to software package "homemade_financial_instruments"
+# Implements financial instruments and solutions for pricing and hedging.
+
+# For more information on functionality, see README.md
+# For more information on bugs and planned features, see ISSUES.md
+# For more information on versioning, see RELEASES.md
+
+# Copyright (C) 2026 Eduardo Fischer
+
+# This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License version 3
+#as published by the Free Software Foundation. See LICENSE.
+# Alternatively, see https://www.gnu.org/licenses/.
+
+# This program is distributed in the hope that it will be useful,
+#but without any warranty; without even the implied warranty of
+#merchantability or fitness for a particular purpose.
+
+
+########################################################################
+
+# Portfolios: collections of positions on assets (possibly derivatives)
+#which are valued all at once
+
+########################################################################
+
+from ..assets import *
+
+class Portfolio():
+  r"""
+  A collection of positions, each an Asset (possibly a Derivative) held
+  in some quantity (negative for short positions).
+
+  For valuation, vanilla options with the same underlying, valued in the
+  same world and on the same step grid, form a group. For each group the
+  risk-neutral lattice of the underlying is built only once, and all
+  options of the group are priced in a single backward pass on it.
+  """
+
+  def __init__(self, list_of_positions = None):
+    r"""
+    Initializes the instance, optionally from a list of positions, each
+    a tuple (asset, quantity) or (asset, quantity, world, step_length).
+    """
+    self.list_of_positions = []
+    if list_of_positions is not None:
+      for position in list_of_positions:
+        self.add_position(*position)
+
+  def __len__(self):
+    """Returns the number of positions in the portfolio."""
+    return len(self.list_of_positions)
+
+  def add_position(self, asset, quantity = 1, world = None, step_length = None):
+    r"""
+    Adds a position with given quantity of an asset.
+
+    If world or step_length are given, they are used when valuing this
+    position instead of the ones given at valuation.
+    """
+    self.list_of_positions.append({
+        'asset': asset,
+        'quantity': quantity,
+        'world': world,
+        'step_length': step_length})
+    return None
+
+  def get_world_and_step_length_of_position(self, idx, world = None, step_length = None):
+    r"""
+    Returns tuple with world and step length to value a position, using the
+    ones given as arguments only if the position does not have its own.
+    """
+    position = self.list_of_positions[idx]
+    if position['world'] is not None:
+      world = position['world']
+    if position['step_length'] is not None:
+      step_length = position['step_length']
+    return (world, step_length)
+
+  def group_positions_for_valuation(self, world = None, step_length = None):
+    r"""
+    Returns dict whose values are lists of indices of positions which
+    can be valued together on a single lattice.
+
+    The keys are tuples with the ids of the underlying and of the world,
+    and the step length. Positions which cannot be valued on a lattice
+    (they are not vanilla options, or their underlying cannot build
+    a risk-neutral lattice) are all put under the key None.
+    """
+    groups = {}
+    for idx, position in enumerate(self.list_of_positions):
+      asset = position['asset']
+      if isinstance(asset, VanillaOption) \
+          and hasattr(asset.underlying, 'build_risk_neutral_lattice'):
+        position_world, position_step_length = self.get_world_and_step_length_of_position(
+            idx, world, step_length)
+        if position_world is None or position_step_length is None:
+          raise ValueError('World and step length needed to value derivatives')
+        key = (id(asset.underlying), id(position_world), position_step_length)
+      else:
+        key = None
+      if key not in groups:
+        groups[key] = []
+      groups[key].append(idx)
+    return groups
+
+  def compute_values(self, world = None, step_length = None):
+    r"""
+    Values the portfolio, returning a tuple whose first item is a list
+    with the value of each position (quantity times the value of one unit
+    of the asset, in the order of the positions) and whose second item
+    is the total value of the portfolio.
+
+    The world and step_length given are used for the positions which
+    were not added with their own. Assets which are not derivatives are
+    valued at their initial value.
+    """
+    values = [None]*len(self)
+    for key, indices in self.group_positions_for_valuation(world, step_length).items():
+      if key is None:
+        for idx in indices:
+          asset = self.list_of_positions[idx]['asset']
+          if isinstance(asset, Derivative):
+            position_world, position_step_length = self.get_world_and_step_length_of_position(
+                idx, world, step_length)
+            unit_value = asset.compute_present_value_in_risk_neutral_world(
+                world = position_world,
+                step_length = position_step_length)
+          else:
+            unit_value = asset.get_initial_value()
+          values[idx] = self.list_of_positions[idx]['quantity']*unit_value
+      else:
+        # All options in the group share underlying, world and step length
+        options = [self.list_of_positions[idx]['asset'] for idx in indices]
+        group_world, group_step_length = self.get_world_and_step_length_of_position(
+            indices[0], world, step_length)
+        expiry_levels = [option.get_number_of_steps_until_expiry(group_step_length)
+            for option in options]
+        underlying = options[0].underlying
+        if getattr(underlying, 'dividend_schedule', None) is not None:
+          # Dividends escrowed up to the expiry of each option, as when
+          #valued alone, and not up to the last expiry of the group
+          lattice = underlying.build_risk_neutral_lattice(
+              world = group_world,
+              number_of_steps = max(expiry_levels),
+              step_length = group_step_length,
+              dividend_horizon_levels = expiry_levels)
+        else:
+          lattice = underlying.build_risk_neutral_lattice(
+              world = group_world,
+              number_of_steps = max(expiry_levels),
+              step_length = group_step_length)
+        unit_values = VanillaOption.static_price_vanilla_options_on_lattice(options, lattice)
+        for idx, unit_value in zip(indices, unit_values):
+          values[idx] = self.list_of_positions[idx]['quantity']*unit_value
+    return (values, sum(values))
@@ -23,7 +23,10 @@
 ########################################################################
 
 # Bring all classes to the subpackage scope, essentially merging the files
-from . import *
+from .timeUnitsContext import *
+from .calendars import *
+from .timeIntervals import *
+from .rates import *
 
 ########################################################################
 
@@ -0,0 +1,222 @@
+########################################################################
+# DOCUMENTATION / README
+########################################################################
+
+# File belonging to software package "homemade_financial_instruments"
+# Implements financial instruments and solutions for pricing and hedging.
+
+# For more information on functionality, see README.md
+# For more information on bugs and planned features, see ISSUES.md
+# For more information on versioning, see RELEASES.md
+
+# Copyright (C) 2026 Eduardo Fischer
+
+# This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License version 3
+#as published by the Free Software Foundation. See LICENSE.
+# Alternatively, see https://www.gnu.org/licenses/.
+
+# This program is distributed in the hope that it will be useful,
+#but without any warranty; without even the implied warranty of
+#merchantability or fitness for a particular purpose.
+
+########################################################################
+
+# For calendars of business days, such as those behind BUS/252.
+
+########################################################################
+
+from typing import Optional
+
+class BusinessDayCalendar():
+	"""
+	Calendar telling business days from weekends and holidays, within a
+	range of dates.
+
+	At initialization, the number of business days before each date of the
+	range is computed into an array, so that the number of business days
+	between two dates (the first included, the second excluded, as in
+	BUS/252) takes two array lookups, also for arrays of dates at once.
+
+	Dates can be given as datetime.date instances, strings such as
+	"2026-10-19", or NumPy datetime64 values (or arrays of any of those).
+	"""
+
+	DEFAULT_START_DATE = "2000-01-01"
+	DEFAULT_END_DATE = "2100-12-31"
+	BUSINESS_DAYS_PER_YEAR = 252
+
+	def __init__(
+			self,
+			holidays = (),
+			startDate = None,
+			endDate = None,
+			weekmask: str = "1111100",
+	):
+		import numpy as np
+		if startDate is None:
+			startDate = self.DEFAULT_START_DATE
+		if endDate is None:
+			endDate = self.DEFAULT_END_DATE
+		self.startDate = np.datetime64(startDate, "D")
+		self.endDate = np.datetime64(endDate, "D")
+		if self.endDate < self.startDate:
+			raise ValueError("End date of calendar before its start date")
+		self.weekmask = weekmask
+		self.holidays = np.unique(np.asarray(holidays, dtype="datetime64[D]"))
+		days = np.arange(self.startDate, self.endDate + np.timedelta64(1, "D"))
+		self.areBusinessDays = np.is_busday(days, weekmask=weekmask, holidays=self.holidays)
+		# Item idx is the number of business days before the date of idx
+		#(one past the end is allowed, so endDate can be an excluded end)
+		self.cumulativeBusinessDays = np.concatenate(
+				[[0], np.cumsum(self.areBusinessDays, dtype=np.int64)])
+
+	@classmethod
+	def fromHolidaysFile(
+			cls,
+			path: str,
+			startDate = None,
+			endDate = None,
+			weekmask: str = "1111100",
+			dateFormat: Optional[str] = None,
+			numberOfHeaderLines: int = 0,
+			separator: str = ",",
+	) -> "BusinessDayCalendar":
+		"""
+		Creates calendar with holidays read from a local text file, one per
+		line (in its first field, if lines have several fields separated by
+		separator), skipping header lines, blank lines and lines starting
+		with "#".
+
+		Dates are in ISO format ("2026-10-19") unless a dateFormat for
+		datetime.strptime is given (such as "%d/%m/%Y").
+		"""
+		from datetime import datetime
+		holidays = []
+		with open(path) as file:
+			for lineNumber, line in enumerate(file, start=1):
+				if lineNumber <= numberOfHeaderLines:
+					continue
+				line = line.strip()
+				if not line or line.startswith("#"):
+					continue
+				field = line.split(separator)[0].strip()
+				try:
+					if dateFormat is None:
+						holidays.append(datetime.strptime(field, "%Y-%m-%d").date())
+					else:
+						holidays.append(datetime.strptime(field, dateFormat).date())
+				except ValueError:
+					raise ValueError("Could not read date in line " + str(lineNumber) + " of " + path)
+		return cls(holidays, startDate=startDate, endDate=endDate, weekmask=weekmask)
+
+	def getIndices(self, dates, allowOnePastTheEnd: bool = False):
+		"""
+		Gets index (or array of indices) of dates in the range of the
+		calendar, raising ValueError if any is out of it.
+		"""
+		import numpy as np
+		indices = (np.asarray(dates, dtype="datetime64[D]") - self.startDate).astype(np.int64)
+		maxIndex = len(self.areBusinessDays) - (0 if allowOnePastTheEnd else 1)
+		if np.any(indices < 0) or np.any(indices > maxIndex):
+			raise ValueError("Date out of the range of the calendar")
+		return indices
+
+	def isBusinessDay(self, dates):
+		"""Tells whether a date (or each of an array of dates) is a business day."""
+		return self.areBusinessDays[self.getIndices(dates)]
+
+	def countBusinessDays(self, startDates, endDates):
+		"""
+		Counts business days from startDates (included) to endDates (excluded).
+		Works on arrays of dates at once.
+
+		As numpy.busday_count, if endDates comes first the count is minus the
+		number of business days after endDates up to startDates (included).
+		"""
+		import numpy as np
+		startIndices = self.getIndices(startDates, allowOnePastTheEnd=True)
+		endIndices = self.getIndices(endDates, allowOnePastTheEnd=True)
+		# Shifting both dates by a day turns (end, start] into [end, start)
+		areReversed = endIndices < startIndices
+		startIndices = startIndices + areReversed
+		endIndices = endIndices + areReversed
+		if np.any(startIndices >= len(self.cumulativeBusinessDays)):
+			raise ValueError("Date out of the range of the calendar")
+		counts = self.cumulativeBusinessDays[endIndices] - self.cumulativeBusinessDays[startIndices]
+		return counts if counts.ndim else int(counts)
+
+	def computeYearFractions(self, startDates, endDates):
+		"""Computes BUS/252 year fractions between dates (or arrays of dates)."""
+		return self.countBusinessDays(startDates, endDates) / self.BUSINESS_DAYS_PER_YEAR
+
+class DayCountConvention():
+	"""
+	Day count convention computing year fractions between dates, working on
+	arrays of dates at once with NumPy datetime64 arithmetic.
+
+	Conventions are named (case-insensitively) "30/360 us", "act/365"
+	(ACT/365 Fixed), "act/360" and "bus/252", the latter needing a
+	BusinessDayCalendar. Year fractions are given in years, so they can be
+	used directly as times by FixedInterestRateWorld.compute_discount_factors.
+	"""
+
+	CONVENTION_NAMES = ["30/360 us", "act/365", "act/360", "bus/252"]
+
+	def __init__(self, name: str, calendar: Optional[BusinessDayCalendar] = None):
+		name = name.lower()
+		if name not in self.CONVENTION_NAMES:
+			raise ValueError("Unknown day count convention")
+		if name == "bus/252" and calendar is None:
+			raise ValueError("Convention BUS/252 needs a calendar")
+		self.name = name
+		self.calendar = calendar
+
+	def computeYearFractions(self, startDates, endDates):
+		"""
+		Computes year fractions from startDates to endDates (dates or arrays
+		of dates, broadcasting against each other).
+		"""
+		import numpy as np
+		if self.name == "bus/252":
+			return self.calendar.computeYearFractions(startDates, endDates)
+		startDates = np.asarray(startDates, dtype="datetime64[D]")
+		endDates = np.asarray(endDates, dtype="datetime64[D]")
+		if self.name == "act/365":
+			return (endDates - startDates).astype(np.int64) / 365.0
+		elif self.name == "act/360":
+			return (endDates - startDates).astype(np.int64) / 360.0
+		else:
+			return self.staticComputeThirtyThreeSixtyUsDays(startDates, endDates) / 360.0
+
+	@staticmethod
+	def staticSplitDates(dates):
+		"""Splits array of datetime64 dates into arrays of years, months and days."""
+		import numpy as np
+		months = dates.astype("datetime64[M]")
+		years = months.astype("datetime64[Y]").astype(np.int64) + 1970
+		monthNumbers = months.astype(np.int64) % 12 + 1
+		days = (dates - months).astype(np.int64) + 1
+		return years, monthNumbers, days
+
+	@staticmethod
+	def staticComputeThirtyThreeSixtyUsDays(startDates, endDates):
+		"""
+		Computes days between arrays of datetime64 dates under 30/360 US
+		(with the end of February rules), in order:
+		if both dates are the last day of February, the end day becomes 30;
+		if the start date is the last day of February, its day becomes 30;
+		if the end day is 31 and the start day is 30 or 31, the end day becomes 30;
+		if the start day is 31, it becomes 30.
+		"""
+		import numpy as np
+		y1, m1, d1 = DayCountConvention.staticSplitDates(startDates)
+		y2, m2, d2 = DayCountConvention.staticSplitDates(endDates)
+		oneDay = np.timedelta64(1, "D")
+		isStartLastOfFebruary = (m1 == 2) & ((startDates + oneDay).astype("datetime64[M]").astype(np.int64) % 12 == 2)
+		isEndLastOfFebruary = (m2 == 2) & ((endDates + oneDay).astype("datetime64[M]").astype(np.int64) % 12 == 2)
+		d2 = np.where(isStartLastOfFebruary & isEndLastOfFebruary, 30, d2)
+		d1 = np.where(isStartLastOfFebruary, 30, d1)
+		d2 = np.where((d2 == 31) & (d1 >= 30), 30, d2)
+		d1 = np.where(d1 == 31, 30, d1)
+		return 360 * (y2 - y1) + 30 * (m2 - m1) + (d2 - d1)
@@ -26,6 +26,8 @@
 
 ########################################################################
 
+from typing import Optional
+
 from ..time.timeUnitsContext import *
 
 class Rate():
@@ -40,7 +42,7 @@ class Rate():
 	an option for favoring inputting and outputting them as percentages.
 	"""
 
-	def __init__(self, number: float, unit: str: None, asPercentage: bool = False):
+	def __init__(self, number: float, unit: Optional[str] = None, asPercentage: bool = False):
 		self.asPercentage = asPercentage
 		if self.asPercentage:
 			self.number = number / 100.0
@@ -48,13 +50,13 @@ class Rate():
 			self.number = number
 		self.unit = unit
 		
-	def verificationBeforeConvertionToUnit(self, newUnit: str, /, context: "TimeUnitsContext" = None) -> None:
-		"""Verifies"""
+	def verificationBeforeConvertionToUnit(self, newUnit: str, /, context: "TimeUnitsContext" = None) -> "TimeUnitsContext":
+		"""Verifies the rate can be converted, returning the context to use."""
 		if self.unit is None:
 			raise ValueError("Cannot convert to another unit an unitless rate.")
 		if context is None:
 			context = TimeUnitsContext()
-		return None
+		return context
 
 class CompositeRate(Rate):
 	"""
@@ -65,8 +67,9 @@ class CompositeRate(Rate):
 	def convertToUnit(self, newUnit: str, /, context: "TimeUnitsContext" = None) -> "CompositeRate":
 		"""Creates new equivalent rate in the unit given."""
 		# super() is not strictly necessary here, but we'll use it for future flexibility
-		self.super().verificationBeforeConvertionToUnit(context)
-		raise NotImplementedError()
+		context = super().verificationBeforeConvertionToUnit(newUnit, context=context)
+		newNumber = context.inverseTransform(self.number, self.unit, newUnit, compositeNotSimple=True)
+		return CompositeRate(newNumber, newUnit)
 		
 class SimpleRate(Rate):
 	"""
@@ -76,10 +79,109 @@ class SimpleRate(Rate):
 	like simple interest: in 5 years it will amount to 100%.
 	"""
 	
-	def convertToUnit(self, newUnit: str, /, context: "TimeUnitsContext" = None) -> "CompositeRate":
+	def convertToUnit(self, newUnit: str, /, context: "TimeUnitsContext" = None) -> "SimpleRate":
 		"""Creates new equivalent rate in the unit given."""
 		# super() is not strictly necessary here, but we'll use it for future flexibility
-		self.super().verificationBeforeConvertionToUnit(context)
-		raise NotImplementedError()
+		context = super().verificationBeforeConvertionToUnit(newUnit, context=context)
+		newNumber = context.inverseTransform(self.number, self.unit, newUnit, compositeNotSimple=False)
+		return SimpleRate(newNumber, newUnit)
+
+class RateArray():
+	"""
+	Many rates at once, each either a CompositeRate or a SimpleRate, held as
+	arrays: numbers (as real numbers, never as percentages), unit ids of a
+	TimeUnitsContext (see TimeUnitsContext.getUnitIds) and flags telling
+	composite from simple rates.
+	
+	Units and flags (and asPercentage at input) can be the same for all
+	rates or given rate by rate. Conversions work on whole arrays: between
+	units, composite rates convert as (1 + r)**ratio - 1 and simple rates as
+	r*ratio; and to continuously compounded rates (over one unit) by log1p
+	and back by expm1, as FixedInterestRateWorld.set_interest_rates does.
+	"""
+	
+	def __init__(self, numbers, units, areCompositeNotSimple = True, asPercentage = False,
+			context: "TimeUnitsContext" = None):
+		import numpy as np
+		if context is None:
+			context = TimeUnitsContext()
+		self.context = context
+		numbers = np.asarray(numbers, dtype=float)
+		numbers = np.where(asPercentage, numbers / 100.0, numbers)
+		unitIds = context.getIdsIfNames(units)
+		numbers, unitIds, areCompositeNotSimple = np.broadcast_arrays(
+				numbers, unitIds, np.asarray(areCompositeNotSimple, dtype=bool))
+		# Copies, as broadcast arrays may share memory between items
+		self.numbers = numbers.copy()
+		self.unitIds = unitIds.copy()
+		self.areCompositeNotSimple = areCompositeNotSimple.copy()
+	
+	def __len__(self):
+		return len(self.numbers)
+	
+	@classmethod
+	def fromListOfRates(cls, rates: list, context: "TimeUnitsContext" = None) -> "RateArray":
+		"""Creates RateArray from a list of CompositeRates and SimpleRates."""
+		return cls(
+				numbers=[rate.number for rate in rates],
+				units=[rate.unit for rate in rates],
+				areCompositeNotSimple=[isinstance(rate, CompositeRate) for rate in rates],
+				context=context)
+	
+	@classmethod
+	def fromContinuousNumbers(cls, continuousNumbers, units, context: "TimeUnitsContext" = None) -> "RateArray":
+		"""
+		Creates RateArray of composite rates from continuously compounded
+		rates, each over one of its unit.
+		"""
+		import numpy as np
+		return cls(
+				numbers=np.expm1(continuousNumbers), # More precise than exp(_) - 1
+				units=units,
+				areCompositeNotSimple=True,
+				context=context)
+	
+	def getNumbers(self, asPercentage: bool = False):
+		"""Gets array of numbers, optionally as percentages."""
+		if asPercentage:
+			return self.numbers * 100.0
+		return self.numbers
+	
+	def getUnits(self):
+		"""Gets array of unit names (inverted names, such as "annual", if any)."""
+		import numpy as np
+		names = [self.context.directToInvertedDict.get(unit, unit) for unit in self.context.units]
+		return np.array(names)[self.unitIds]
+	
+	def toListOfRates(self) -> list:
+		"""Creates list of CompositeRates and SimpleRates."""
+		units = self.getUnits()
+		return [
+				CompositeRate(float(number), str(unit)) if isComposite else SimpleRate(float(number), str(unit))
+				for number, unit, isComposite in zip(self.numbers, units, self.areCompositeNotSimple)]
+	
+	def convertToUnits(self, newUnits) -> "RateArray":
+		"""
+		Creates new RateArray with equivalent rates in the units given (the
+		same for all rates, or rate by rate), keeping composite and simple
+		rates as such.
+		"""
+		import numpy as np
+		newUnitIds = np.broadcast_to(self.context.getIdsIfNames(newUnits), self.unitIds.shape)
+		# A rate per old unit is a rate per ratio new units
+		ratios = self.context.conversionMatrix[newUnitIds, self.unitIds]
+		newNumbers = np.where(
+				self.areCompositeNotSimple,
+				np.expm1(ratios * np.log1p(self.numbers)), # More precise than (1 + _)**ratio - 1
+				self.numbers * ratios)
+		return RateArray(newNumbers, newUnitIds, self.areCompositeNotSimple, context=self.context)
+	
+	def getContinuousNumbers(self):
+		"""
+		Gets array of the continuously compounded rates (each over one of its
+		unit) giving the same growth over one unit.
+		"""
+		import numpy as np
+		return np.log1p(self.numbers) # More precise than log(1 + _)
 
 
@@ -30,6 +30,8 @@ from typing import Optional
 
 from ..utilities import *
 from ..formulas import *
+from .timeUnitsContext import *
+from .calendars import *
 
 class TimeInterval():
 	"""
@@ -45,6 +47,27 @@ class TimeInterval():
 		if self.startTime is not None or self.endTime is not None:
 			raise NotImplementedError()
 		
+	@classmethod
+	def fromDates(cls, startDate, endDate, calendar: "BusinessDayCalendar", /,
+			unit: str = "day", context: "TimeUnitsContext" = None) -> "TimeInterval":
+		"""
+		Creates interval with the business days between two dates (the first
+		included, the second excluded) of a BusinessDayCalendar, in days or
+		converted to another unit by a TimeUnitsContext (by default the
+		Brazilian standard, with 252 days per year).
+		
+		The dates are kept as attributes startDate and endDate.
+		"""
+		length = calendar.countBusinessDays(startDate, endDate)
+		if unit != "day":
+			if context is None:
+				context = TimeUnitsContext()
+			length = context.directTransform(length, "day", unit)
+		timeInterval = cls(length, unit)
+		timeInterval.startDate = startDate
+		timeInterval.endDate = endDate
+		return timeInterval
+
 	def setUnit(self, unit: str):
 		"""Sets an unit for an unitless time interval."""
 		if self.unit is not None:
@@ -73,3 +96,149 @@ class TimeInterval():
 			raise NotImplementedError()
 		if self.startTime is not None or self.endTime is not None:
 			raise NotImplementedError()
+
+class TimeSchedule():
+	"""
+	Schedule of periods, such as those of coupons or installments, stored as
+	arrays of start dates, end dates, payment dates (datetime64) and accrual
+	fractions (year fractions of a DayCountConvention).
+	
+	Slicing (with a slice) gives another TimeSchedule sharing the arrays,
+	without copying. Iterating gives a tuple (startDate, endDate,
+	paymentDate, accrualFraction) per period, but pricing code is expected
+	to work on the arrays themselves whenever possible.
+	"""
+
+	BUSINESS_DAY_RULES = {
+		"none": None,
+		"following": "following",
+		"modified following": "modifiedfollowing",
+		"preceding": "preceding",
+		"modified preceding": "modifiedpreceding",
+	}
+
+	def __init__(self, startDates, endDates, paymentDates, accrualFractions):
+		import numpy as np
+		self.startDates = np.asarray(startDates, dtype="datetime64[D]")
+		self.endDates = np.asarray(endDates, dtype="datetime64[D]")
+		self.paymentDates = np.asarray(paymentDates, dtype="datetime64[D]")
+		self.accrualFractions = np.asarray(accrualFractions, dtype=float)
+		lengths = {len(self.startDates), len(self.endDates), len(self.paymentDates), len(self.accrualFractions)}
+		if len(lengths) != 1:
+			raise ValueError("Expected arrays of same length")
+
+	def __len__(self):
+		return len(self.startDates)
+
+	def __getitem__(self, key):
+		if not isinstance(key, slice):
+			raise TypeError("TimeSchedule can only be sliced; iterate for periods")
+		return TimeSchedule(
+				self.startDates[key],
+				self.endDates[key],
+				self.paymentDates[key],
+				self.accrualFractions[key],
+		)
+
+	def __iter__(self):
+		return zip(self.startDates, self.endDates, self.paymentDates, self.accrualFractions)
+
+	def __str__(self):
+		lines = []
+		for startDate, endDate, paymentDate, accrualFraction in self:
+			lines.append(str(startDate) + " to " + str(endDate) + ", paid " + str(paymentDate)
+					+ ", accrual " + str(accrualFraction))
+		return "\n".join(lines)
+
+	@staticmethod
+	def staticAddMonths(anchorDate, monthOffsets, rollDay: int, endOfMonth: bool = False):
+		"""
+		Adds arrays of month offsets to a datetime64 date, keeping rollDay as
+		day of month (or the last day, if the month is shorter or endOfMonth
+		is True).
+		"""
+		import numpy as np
+		months = anchorDate.astype("datetime64[M]") + np.asarray(monthOffsets)
+		firstDays = months.astype("datetime64[D]")
+		lastDays = (months + 1).astype("datetime64[D]") - firstDays
+		if endOfMonth:
+			days = lastDays.astype(np.int64)
+		else:
+			days = np.minimum(rollDay, lastDays.astype(np.int64))
+		return firstDays + (days - 1)
+
+	@classmethod
+	def generate(
+			cls,
+			startDate,
+			endDate,
+			frequencyInMonths: int,
+			/,
+			dayCountConvention: Optional["DayCountConvention"] = None,
+			stubAtStartNotEnd: bool = True,
+			longStubNotShort: bool = False,
+			endOfMonth: bool = False,
+			calendar: Optional["BusinessDayCalendar"] = None,
+			businessDayRule: str = "modified following",
+			paymentLagInBusinessDays: int = 0,
+	) -> "TimeSchedule":
+		"""
+		Generates schedule with a period every frequencyInMonths months from
+		startDate to endDate.
+		
+		Regular dates roll from endDate backwards if stubAtStartNotEnd (the
+		usual case, leaving any irregular period, the stub, at the start) or
+		from startDate forwards otherwise, on the day of month of the date
+		rolled from (or on the last day of month, if endOfMonth is True and
+		that date is the last of its month). A stub is short unless
+		longStubNotShort, in which case it is joined with the next period.
+		
+		If a calendar is given, dates other than startDate and endDate are
+		adjusted to business days with businessDayRule ("following",
+		"modified following", "preceding", "modified preceding" or "none"),
+		and payments are made paymentLagInBusinessDays business days after the
+		end of each period. Accrual fractions use dayCountConvention (by
+		default ACT/365) on adjusted dates.
+		"""
+		import numpy as np
+		startDate = np.datetime64(startDate, "D")
+		endDate = np.datetime64(endDate, "D")
+		if endDate <= startDate:
+			raise ValueError("End date of schedule should come after its start date")
+		if frequencyInMonths < 1:
+			raise ValueError("Expected frequencyInMonths to be positive")
+		if businessDayRule not in cls.BUSINESS_DAY_RULES:
+			raise ValueError("Unknown business day rule")
+		monthsBetween = (endDate.astype("datetime64[M]") - startDate.astype("datetime64[M]")).astype(np.int64)
+		numberOfOffsets = monthsBetween // frequencyInMonths + 2
+		if stubAtStartNotEnd:
+			anchorDate, direction = endDate, -1
+		else:
+			anchorDate, direction = startDate, 1
+		isAnchorLastOfMonth = (anchorDate + 1).astype("datetime64[M]") != anchorDate.astype("datetime64[M]")
+		rollDay = (anchorDate - anchorDate.astype("datetime64[M]").astype("datetime64[D]")).astype(np.int64) + 1
+		regularDates = cls.staticAddMonths(
+				anchorDate,
+				direction * frequencyInMonths * np.arange(numberOfOffsets),
+				rollDay,
+				endOfMonth and isAnchorLastOfMonth,
+		)
+		innerDates = np.sort(regularDates[(regularDates > startDate) & (regularDates < endDate)])
+		hasStub = not np.any(regularDates == (startDate if stubAtStartNotEnd else endDate))
+		if hasStub and longStubNotShort and len(innerDates) > 0:
+			innerDates = innerDates[1:] if stubAtStartNotEnd else innerDates[:-1]
+		if calendar is not None and cls.BUSINESS_DAY_RULES[businessDayRule] is not None:
+			innerDates = np.busday_offset(innerDates, 0,
+					roll=cls.BUSINESS_DAY_RULES[businessDayRule],
+					weekmask=calendar.weekmask, holidays=calendar.holidays)
+		boundaries = np.concatenate([[startDate], innerDates, [endDate]])
+		startDates, endDates = boundaries[:-1], boundaries[1:]
+		if calendar is not None:
+			paymentDates = np.busday_offset(endDates, paymentLagInBusinessDays, roll="following",
+					weekmask=calendar.weekmask, holidays=calendar.holidays)
+		else:
+			paymentDates = endDates + np.timedelta64(paymentLagInBusinessDays, "D")
+		if dayCountConvention is None:
+			dayCountConvention = DayCountConvention("act/365")
+		accrualFractions = dayCountConvention.computeYearFractions(startDates, endDates)
+		return cls(startDates, endDates, paymentDates, accrualFractions)
@@ -37,6 +37,13 @@ class TimeUnitsContext():
 	
 	Default is the Brazilian standard, with 252 days per year, but one can
 	also call the 30/360 standard using the string "30/360 us" as argument.
+	
+	Rules given only between some pairs of units are completed, once at
+	initialization, into rules between any two units which are connected
+	through other units (for example, week to year through day). The ratios
+	are kept in a dense matrix, units being numbered by integer ids, so that
+	many values can be converted at once by directTransformMany and
+	inverseTransformMany with array operations.
 	"""
 	
 	BRAZILIAN_STANDARD_CONVERSION_DICT = {
@@ -46,6 +53,7 @@ class TimeUnitsContext():
 		},
 		"month" : {
 			"day": 21,
+		},
 	}
 	
 	THIRTY_THREE_SIXTY_CONVERSION_DICT = {
@@ -55,6 +63,7 @@ class TimeUnitsContext():
 		},
 		"month" : {
 			"day": 30,
+		},
 	}
 	
 	DIRECT_TO_INVERTED_STANDARD_CONVERSION_DICT = {
@@ -69,29 +78,33 @@ class TimeUnitsContext():
 			onlyPartial = True,
 			directToInvertedDict: Optional[dict] = None,
 	):
-		if self.directTransformDict is None:
+		if directTransformDict is None:
 			onlyPartial = True
-			self.directTransformDict = dict(self.BRAZILIAN_STANDARD_CONVERSION_DICT)
+			directTransformDict = self.BRAZILIAN_STANDARD_CONVERSION_DICT
 		elif isinstance(directTransformDict, str):
 			onlyPartial = True
 			if directTransformDict.lower() == "brazilian":
-				self.directTransformDict = dict(self.BRAZILIAN_STANDARD_CONVERSION_DICT)
+				directTransformDict = self.BRAZILIAN_STANDARD_CONVERSION_DICT
 			elif directTransformDict.lower() == "30/360 us":
-				self.directTransformDict = dict(self.THIRTY_THREE_SIXTY_CONVERSION_DICT)
-		else:
-			self.directTransformDict = dict(directTransformDict)
+				directTransformDict = self.THIRTY_THREE_SIXTY_CONVERSION_DICT
+			else:
+				raise ValueError("Unknown standard for time units")
+		# Copies of the inner dicts too, as they are completed in place
+		self.directTransformDict = {
+				unit: dict(ratios) for unit, ratios in directTransformDict.items()}
 		if onlyPartial:
 			self.directTransformDict = self.completePartialDict(self.directTransformDict)
-		if directedToInvertedDict is None:
-			self.directToInvertedDict = DIRECT_TO_INVERTED_STANDARD_CONVERSION_DICT
+		if directToInvertedDict is None:
+			self.directToInvertedDict = dict(self.DIRECT_TO_INVERTED_STANDARD_CONVERSION_DICT)
 		else:
-			self.directToInvertedDict = directToInvertedDict
+			self.directToInvertedDict = dict(directToInvertedDict)
+		self.computeConversionMatrix()
 		self.inverseTransformDict = self.getInverseDict(
 				self.directTransformDict,
 				self.directToInvertedDict,
 		)
 
-	def getInverseDict(self, directDict: dict, directToInverted: dict): dict:
+	def getInverseDict(self, directDict: dict, directToInverted: dict) -> dict:
 		"""
 		Gets dict with reverse relations between time units.
 		
@@ -99,12 +112,14 @@ class TimeUnitsContext():
 		annual rate is represented as a number which is 1/12 of the latter.
 		"""
 		dictWithInverses = {}
-		for firstKey, valueDict in dict_.items():
-			inverseFirstKey = self.inverseTransformDict[firstKey]
+		for firstKey, valueDict in directDict.items():
+			inverseFirstKey = directToInverted.get(firstKey)
 			for secondKey, ratio in valueDict.items():
-				inverseSecondKey = self.inverseTransformDict[secondKey]
+				inverseSecondKey = directToInverted.get(secondKey)
+				if inverseFirstKey is None or inverseSecondKey is None:
+					continue # Units without inverted names have no rates
 				if inverseSecondKey not in dictWithInverses.keys():
-					newDict[inverseSecondKey] = {}
+					dictWithInverses[inverseSecondKey] = {}
 				dictWithInverses[inverseSecondKey][inverseFirstKey] = ratio
 		return dictWithInverses
 
@@ -116,25 +131,87 @@ class TimeUnitsContext():
 		Also adds identity rules (e.g one month is one month) for all keys.
 		
 		It assumes given partial dict is all correct (has a single occurrence
-		of each pair). It does not make further assumptions.
+		of each pair). It does not make further assumptions; in particular,
+		rules through other units (transitive closure) are only computed by
+		computeConversionMatrix.
 		"""
-		newDict = dict(dict_)
+		newDict = {key: dict(valueDict) for key, valueDict in dict_.items()}
 		for firstKey, valueDict in dict_.items():
 			for secondKey, ratio in valueDict.items():
 				if secondKey not in newDict.keys():
 					newDict[secondKey] = {}
 				newDict[secondKey][firstKey] = 1 / ratio
 		for key in newDict.keys():
-			newDick[key][key] = 1
+			newDict[key][key] = 1
 		return newDict
 
+	def computeConversionMatrix(self, relativeTolerance: float = 1e-12) -> None:
+		"""
+		Computes the transitive closure of the direct rules into a square
+		matrix, stored as conversionMatrix, such that one unit of id i is
+		conversionMatrix[i, j] units of id j (NaN if units are unrelated).
+		
+		Ids are given by unitIds (for direct names, and also for inverted
+		names, which share the id of the corresponding direct name).
+		
+		Rules are followed in both directions. Raises ValueError if two
+		paths between the same units give different ratios.
+		"""
+		import numpy as np
+		units = []
+		for firstKey, valueDict in self.directTransformDict.items():
+			for unit in [firstKey] + list(valueDict.keys()):
+				if unit not in units:
+					units.append(unit)
+		self.units = units
+		self.unitIds = {unit: idx for idx, unit in enumerate(units)}
+		for unit, invertedUnit in self.directToInvertedDict.items():
+			if unit in self.unitIds:
+				self.unitIds[invertedUnit] = self.unitIds[unit]
+		numberOfUnits = len(units)
+		matrix = np.full((numberOfUnits, numberOfUnits), np.nan)
+		np.fill_diagonal(matrix, 1.0)
+		neighbors = [[] for idx in range(numberOfUnits)]
+		for firstKey, valueDict in self.directTransformDict.items():
+			for secondKey, ratio in valueDict.items():
+				firstId, secondId = self.unitIds[firstKey], self.unitIds[secondKey]
+				neighbors[firstId].append((secondId, ratio))
+				neighbors[secondId].append((firstId, 1 / ratio))
+		# Graph search from every unit, multiplying ratios along the way
+		for originId in range(numberOfUnits):
+			toVisit = [originId]
+			while toVisit:
+				currentId = toVisit.pop()
+				for neighborId, ratio in neighbors[currentId]:
+					newRatio = matrix[originId, currentId] * ratio
+					if np.isnan(matrix[originId, neighborId]):
+						matrix[originId, neighborId] = newRatio
+						toVisit.append(neighborId)
+					elif abs(matrix[originId, neighborId] - newRatio) > relativeTolerance * abs(newRatio):
+						raise ValueError("Inconsistent rules between " + units[originId]
+								+ " and " + units[neighborId])
+		self.conversionMatrix = matrix
+
+	def getUnitIds(self, units):
+		"""
+		Gets integer id of a unit name, or array of ids of an array of names.
+		
+		For arrays, each distinct name is looked up only once.
+		"""
+		import numpy as np
+		if isinstance(units, str):
+			return self.unitIds[units]
+		distinctUnits, inverse = np.unique(np.asarray(units), return_inverse=True)
+		distinctIds = np.array([self.unitIds[str(unit)] for unit in distinctUnits], dtype=np.intp)
+		return distinctIds[inverse].reshape(np.shape(units))
+
 	def directTransform(self, num: float, unitFrom: str, unitTo: str) -> float:
 		"""
 		Converts a number from one [direct] time unit to another.
 		
 		For example, converts 2 years into 24 months.
 		"""
-		ratio = self.directTransformDict[unitFrom][unitTo]
+		ratio = self.conversionMatrix[self.unitIds[unitFrom], self.unitIds[unitTo]]
 		return num * ratio
 		
 	def inverseTransform(self, num: float, unitFrom: str, unitTo: str, compositeNotSimple: bool) -> float:
@@ -147,9 +224,48 @@ class TimeUnitsContext():
 		For example, 0.01 monthly is equivalent to 0.12 yearly via simple
 		interest, and to (1.01)*12 - 1 via composite interest. 
 		"""
-		ratio = self.inverseTransformDict[unitFrom][unitTo]
+		# A rate per unitFrom is a rate per ratio units of unitTo
+		ratio = self.conversionMatrix[self.unitIds[unitTo], self.unitIds[unitFrom]]
 		if compositeNotSimple:
 			return (1 + num)**ratio - 1
 		else:
 			return num * ratio
+
+	def directTransformMany(self, values, unitsFrom, unitsTo):
+		"""
+		Converts many numbers between [direct] time units at once, as
+		directTransform does for one.
+		
+		Units can be names (same for all values), or arrays of names or of
+		ids (see getUnitIds) broadcasting against values. Returns an array.
+		"""
+		import numpy as np
+		ratios = self.conversionMatrix[self.getIdsIfNames(unitsFrom), self.getIdsIfNames(unitsTo)]
+		return np.asarray(values, dtype=float) * ratios
+
+	def inverseTransformMany(self, values, unitsFrom, unitsTo, compositeNotSimple: bool):
+		"""
+		Converts many numbers between [inverse] time units at once, as
+		inverseTransform does for one.
+		
+		Units can be names (same for all values), or arrays of names or of
+		ids (see getUnitIds) broadcasting against values. Returns an array.
+		"""
+		import numpy as np
+		ratios = self.conversionMatrix[self.getIdsIfNames(unitsTo), self.getIdsIfNames(unitsFrom)]
+		values = np.asarray(values, dtype=float)
+		if compositeNotSimple:
+			return np.expm1(ratios * np.log1p(values)) # More precise than (1 + _)**ratio - 1
+		else:
+			return values * ratios
+
+	def getIdsIfNames(self, units):
+		"""Gets ids of units given as names, keeping units given as ids."""
+		import numpy as np
+		if isinstance(units, str):
+			return self.unitIds[units]
+		units = np.asarray(units)
+		if np.issubdtype(units.dtype, np.integer):
+			return units
+		return self.getUnitIds(units)
 		
@@ -48,9 +48,12 @@ class FrozenTree():
     return len(self.get_list_of_nodes())
 
   def reset_all_nodes_to_specific_data(self, data = None):
-    """Changes the data of all nodes to be the specified data."""
+    r"""
+    Changes the data of all nodes to be the specified data (a copy of it for
+    each node, if it is a dict, so nodes do not share their dicts).
+    """
     for node in self.get_list_of_nodes():
-      nodes.data = data
+      node.data = data.copy() if isinstance(data, dict) else data
     return None
   
   def reset_all_nodes_to_dict_with_given_keys(self, keys):
@@ -106,14 +109,12 @@ class FrozenBinaryTree(FrozenTree):
     create_frozenbinarytreenode_from_binarynode method which is called
     during initialization
     """
-    if auto_detected_initialization_argument:
-      if auto_detected_initialization_argument is None:
-        pass
-      elif isinstance(auto_detected_initialization_argument, (BinaryNode, FrozenBinaryTreeNode)):
+    if autodetected_initialization_argument is not None:
+      if isinstance(autodetected_initialization_argument, (BinaryNode, FrozenBinaryTreeNode)):
         root = autodetected_initialization_argument
-      elif isinstance(auto_detected_initialization_argument, dict):
+      elif isinstance(autodetected_initialization_argument, dict):
         left_right_addresses = autodetected_initialization_argument
-      elif isinstance(auto_detected_initialization_argument, list):
+      elif isinstance(autodetected_initialization_argument, list):
         list_of_nodes = autodetected_initialization_argument
       else:
         raise ValueError('Could not autodetect given initialization argument')
@@ -124,7 +125,7 @@ class FrozenBinaryTree(FrozenTree):
     if left_right_addresses is not None:
       if not skip_checks:
         self.ensure_consistency_of_left_right_addresses(
-            addresses = left_right_address,
+            addresses = left_right_addresses,
             require_match_of_address_and_path = False,
             forbid_picking_nodes_from_other_trees = forbid_picking_nodes_from_other_trees,
             require_perfectness = False,
@@ -133,15 +134,15 @@ class FrozenBinaryTree(FrozenTree):
           addresses = left_right_addresses,
           skip_checks = skip_checks,
           forbid_picking_nodes_from_other_trees = forbid_picking_nodes_from_other_trees)
+      # Other arguments are compared with the given nodes (self has copies)
       if not skip_checks:
         if root is not None:
-          root_from_self_right_addresses = self.left_right_addresses['']
-          if root is not root_from_self_right_addresses:
+          if root is not left_right_addresses['']:
             raise ValueError('Values for root in different arguments don\'t match')
         if list_of_nodes is not None:
             self.ensure_consistency_of_list_of_nodes_against_addresses(
                 list_of_nodes = list_of_nodes,
-                addresses = self.left_right_addresses)
+                addresses = left_right_addresses)
     elif root is not None: # left_right_addresses not given
       self.left_right_addresses = self.obtain_left_right_addresses_from_root(
           root = root,
@@ -152,7 +153,7 @@ class FrozenBinaryTree(FrozenTree):
         if list_of_nodes is not None:
           self.ensure_consistency_of_list_of_nodes_against_addresses(
               list_of_nodes = list_of_nodes,
-              addresses = self.left_right_addresses)
+              addresses = self.static_collect_addresses_of_given_nodes(root))
     elif list_of_nodes is not None: # left_right_addresses, root not given
       if not skip_checks:
         if not self.check_consistency_of_list_of_nodes(
@@ -326,12 +327,12 @@ class FrozenBinaryTree(FrozenTree):
       if node.left is not None:
         number_parent_child_relationships += 1
         should_be_address_of_child = key + 'l'
-        if not addresses[should_be_address_of_child] == node.left:
+        if addresses.get(should_be_address_of_child) is not node.left:
           raise ValueError('Incorrect parent-left child relationship in dict')
       if node.right is not None:
         number_parent_child_relationships += 1
         should_be_address_of_child = key + 'r'
-        if not addresses[should_be_address_of_child] == node.right:
+        if addresses.get(should_be_address_of_child) is not node.right:
           raise ValueError('Incorrect parent-right child relationship in dict')
     if number_parent_child_relationships != len(addresses) - 1:
       raise ValueError('Cannot form a unified tree with nodes in dict')
@@ -421,7 +422,7 @@ class FrozenBinaryTree(FrozenTree):
           elif idx == len(list_of_nodes) - 1:
             list_of_nodes = list_of_nodes[:len(list_of_nodes) - 1]
           else:
-            list_of_nodes = list_of_nodes[:idx-1] + list_of_nodes[idx+1:]
+            list_of_nodes = list_of_nodes[:idx] + list_of_nodes[idx+1:]
           break
       if not node_found_in_list:
         raise ValueError('List of nodes and dict of addresses have different nodes')
@@ -438,12 +439,12 @@ class FrozenBinaryTree(FrozenTree):
       left = node.left
       right = node.right
       if left is not None:
-        known_non_roots.append(node.left)
+        nodes_with_parents.append(node.left)
       if right is not None:
-        known_non_roots.append(node.right)
+        nodes_with_parents.append(node.right)
     parentless_nodes = []
     for node in list_of_nodes:
-      if node not in nodes_with_parents:
+      if not any(node is other_node for other_node in nodes_with_parents):
         parentless_nodes.append(node)
     return parentless_nodes
     
@@ -484,15 +485,15 @@ class FrozenBinaryTree(FrozenTree):
     (without information of path/parentage).
     """
     addresses = {}
-    def add_node_and_descendants_as_addresses(addesses, current_node, current_path, current_parent):
+    def add_node_and_descendants_as_addresses(addresses, current_node, current_path, current_parent):
       # Updates node according to specifications
-      current_node = cls.create_node_with_path_information(
+      new_node = cls.create_node_with_path_information(
           node = current_node,
           path = current_path,
           skip_checks = skip_checks,
           forbid_picking_nodes_from_other_trees = forbid_picking_nodes_from_other_trees,
           produce_loose_nodes_instead = produce_loose_nodes_instead)
-      addesses[current_path] = current_node
+      addresses[current_path] = new_node
       left = current_node.left
       right = current_node.right
       if left is not None:
@@ -513,6 +514,33 @@ class FrozenBinaryTree(FrozenTree):
         current_node = root,
         current_path = '',
         current_parent = None)
+    cls.relink_children_in_left_right_addresses(addresses)
+    return addresses
+
+  @classmethod
+  def relink_children_in_left_right_addresses(cls, addresses):
+    r"""
+    Sets left and right attributes of the nodes in a dict of left-right
+    addresses to the nodes of the dict at the addresses of their children
+    (new nodes are created with the children of the nodes they copy).
+    """
+    for address, node in addresses.items():
+      node.left = addresses.get(address + 'l')
+      node.right = addresses.get(address + 'r')
+    return None
+
+  @staticmethod
+  def static_collect_addresses_of_given_nodes(root):
+    """Returns dict of left-right addresses of the given nodes, without copies."""
+    addresses = {}
+    nodes_to_visit = [('', root)]
+    while nodes_to_visit:
+      path, node = nodes_to_visit.pop()
+      addresses[path] = node
+      if node.left is not None:
+        nodes_to_visit.append((path + 'l', node.left))
+      if node.right is not None:
+        nodes_to_visit.append((path + 'r', node.right))
     return addresses
 
   @classmethod
@@ -547,6 +575,7 @@ class FrozenBinaryTree(FrozenTree):
           forbid_picking_nodes_from_other_trees = forbid_picking_nodes_from_other_trees,
           produce_loose_nodes_instead = False)
       new_addresses[address] = new_node
+    cls.relink_children_in_left_right_addresses(new_addresses)
     return new_addresses
   
   def get_lra(self):
@@ -560,6 +589,10 @@ class FrozenBinaryTree(FrozenTree):
   def get_root(self):
     """Returns root of tree."""
     return self.get_lra()['']
+
+  def get_list_of_nodes(self):
+    """Returns list of all nodes in the tree."""
+    return list(self.get_lra().values())
     
   def get_parent_of_node_in_tree(self, node):
     """Returns parent of node in tree, or None if node is the root of the tree."""
@@ -583,8 +616,8 @@ class FrozenBinaryTree(FrozenTree):
     # Done this way to be consistent with non-binary trees in case they
     #are implemented in the future
     return [
-        self.get_left_child_of_node_in_tree(),
-        self.get_right_child_of_node_in_tree()]
+        self.get_left_child_of_node_in_tree(node),
+        self.get_right_child_of_node_in_tree(node)]
     
   def navigate_tree_by_string(self, node, string, ignore_error_if_string_has_invalid_chars = False,
       ignore_error_if_navigation_leads_to_none = False):
@@ -630,7 +663,8 @@ class FrozenBinaryTree(FrozenTree):
     return current_node
     
   def print_tree_in_lines(self, box_length, box_height, horizontal_space,
-      vertical_space):
+      vertical_space, viewport = None, center_viewport_at_path = None,
+      output_as = 'single_string'):
     r"""
     Prints the binary tree in lines, such that the root is at the top,
     and each left and right child of a node are positioned below that
@@ -659,11 +693,193 @@ class FrozenBinaryTree(FrozenTree):
     for each item as key in that node's data will be printed. That is,
     each item is looked up using "node.data[item]", what is specially
     fitting for a FrozenBinaryTreeOfDicts. Any other value raises an error.
+    
+    Layout is computed in one sweep from the leaves up (each subtree is as
+    wide as its children side by side, a missing child of a node with a
+    single child taking the space of a box, and each node is centered over
+    its children) and one sweep from the root down (turning columns
+    relative to subtrees into columns of the whole layout), and all boxes
+    and the connectors between them are then written into a single
+    CharacterCanvas.
+    
+    viewport, if given as (top_row, left_column, height, width), clips the
+    output to that rectangle, writing only nodes visible in it. If
+    center_viewport_at_path is also given (a path as in get_lra), the
+    rectangle is centered at that node instead, ignoring top_row and
+    left_column, showing the neighbourhood of a node in a large tree.
+    
+    Possible values for output_as:
+    'single_string': returns a single string, likely with '\n' characters within
+    'list_of_lines': returns a list of lines (strings without line breaks)
+    'print_instead': prints the result (returning None)
+    """
+    if not isinstance(box_length, int) or box_length < 0:
+      raise ValueError('Expected box_length to be a nonnegative integer')
+    if isinstance(box_height, (list, tuple)):
+      keys_to_print = list(box_height)
+      box_height = len(keys_to_print)
+    elif isinstance(box_height, int) and box_height > 0:
+      keys_to_print = None
+    else:
+      raise ValueError('Expected box_height to be a positive integer or a list')
+    if horizontal_space < 1 or vertical_space < 1:
+      raise ValueError('Expected positive horizontal_space and vertical_space')
+    lra_dict = self.get_lra()
+    if box_length == 0:
+      # Needs every box; otherwise, only boxes in the viewport are produced
+      lists_of_lines = self.produce_lines_of_boxes(list(lra_dict), box_height, keys_to_print)
+      box_length = max(1, max((len(line) for lines in lists_of_lines for line in lines), default = 0))
+      lines_by_path = dict(zip(lra_dict, lists_of_lines))
+    else:
+      lines_by_path = None
+    # Post-order sweep (children, with longer paths, before parents) for
+    #widths of subtrees, and columns of boxes relative to their subtrees
+    paths_by_depth = sorted(lra_dict, key = len)
+    widths = {}
+    relative_box_lefts = {}
+    children_offsets = {}
+    for path in reversed(paths_by_depth):
+      if (path + 'l') in lra_dict or (path + 'r') in lra_dict:
+        # A missing child takes the space of a box
+        left_width = widths.get(path + 'l', box_length)
+        right_width = widths.get(path + 'r', box_length)
+        children_width = left_width + horizontal_space + right_width
+        widths[path] = max(box_length, children_width)
+        children_offsets[path] = (widths[path] - children_width)//2
+        left_box_left = children_offsets[path] + relative_box_lefts.get(path + 'l', 0)
+        right_box_left = children_offsets[path] + left_width + horizontal_space \
+            + relative_box_lefts.get(path + 'r', 0)
+        relative_box_lefts[path] = (left_box_left + right_box_left)//2
+      else:
+        widths[path] = box_length
+        relative_box_lefts[path] = 0
+    # Pre-order sweep for columns in the whole layout
+    subtree_lefts = {'': 0}
+    box_lefts = {}
+    for path in paths_by_depth:
+      subtree_left = subtree_lefts[path]
+      box_lefts[path] = subtree_left + relative_box_lefts[path]
+      if path in children_offsets:
+        children_left = subtree_left + children_offsets[path]
+        subtree_lefts[path + 'l'] = children_left
+        subtree_lefts[path + 'r'] = children_left + widths.get(path + 'l', box_length) + horizontal_space
+    level_height = box_height + vertical_space
+    total_height = (max(len(path) for path in lra_dict) + 1)*level_height - vertical_space
+    total_width = widths['']
+    # Viewport, in coordinates of the whole layout
+    if viewport is None:
+      top_row, left_column, height, width = 0, 0, total_height, total_width
+    else:
+      top_row, left_column, height, width = viewport
+      if center_viewport_at_path is not None:
+        if center_viewport_at_path not in lra_dict:
+          raise ValueError('Path for center of viewport not in tree')
+        top_row = len(center_viewport_at_path)*level_height + (box_height - height)//2
+        left_column = box_lefts[center_viewport_at_path] + (box_length - width)//2
+    # Nodes visible in the viewport, with their connectors to children
+    import numpy as np
+    visible_paths, box_rows, box_columns = [], [], []
+    parent_rows, parent_centers, children_centers_by_side = [], [], {'l': [], 'r': []}
+    for path in paths_by_depth:
+      row = len(path)*level_height - top_row
+      if row >= height:
+        break
+      box_left = box_lefts[path] - left_column
+      parent_center = box_left + box_length//2
+      children_centers = {side: box_lefts[path + side] - left_column + box_length//2
+          for side in 'lr' if (path + side) in lra_dict}
+      leftmost = min([box_left] + list(children_centers.values()))
+      rightmost = max([box_left + box_length] + [center + 1 for center in children_centers.values()])
+      if row + level_height <= 0 or rightmost <= 0 or leftmost >= width:
+        continue
+      visible_paths.append(path)
+      box_rows.append(row)
+      box_columns.append(box_left)
+      if children_centers:
+        parent_rows.append(row)
+        parent_centers.append(parent_center)
+        for side in 'lr':
+          children_centers_by_side[side].append(children_centers.get(side, parent_center))
+    canvas = CharacterCanvas(height = height, width = width)
+    if lines_by_path is None:
+      lists_of_lines = self.produce_lines_of_boxes(visible_paths, box_height, keys_to_print)
+    else:
+      lists_of_lines = [lines_by_path[path] for path in visible_paths]
+    string_management = StringManagement()
+    list_of_boxes = [[string_management.center_string(line, box_length) for line in lines]
+        + [' '*box_length]*(box_height - len(lines)) for lines in lists_of_lines]
+    canvas.blit_many(list_of_boxes, box_rows, box_columns)
+    if parent_centers:
+      parent_centers = np.array(parent_centers)
+      left_centers = np.array(children_centers_by_side['l'])
+      right_centers = np.array(children_centers_by_side['r'])
+      # Vertical bars below nodes, then horizontal bars above children
+      connector_rows = np.array(parent_rows) + box_height
+      bar_rows = connector_rows + vertical_space - 1
+      vertical_rows = (connector_rows[:, None] + np.arange(vertical_space - 1)[None, :]).ravel()
+      canvas.fill_many(vertical_rows, np.repeat(parent_centers, vertical_space - 1), '\u2502')
+      canvas.fill_horizontal_segments(bar_rows, left_centers, right_centers, '\u2500')
+      # A missing child has been put at the center of its parent
+      are_left_corners = left_centers < parent_centers
+      are_right_corners = right_centers > parent_centers
+      canvas.fill_many(bar_rows[are_left_corners], left_centers[are_left_corners], '\u250C')
+      canvas.fill_many(bar_rows[are_right_corners], right_centers[are_right_corners], '\u2510')
+      # Junctions: by branch to the left, to the right, or straight down
+      junctions = np.array([ord(character) for character in '\u2502\u2514\u2518\u2534'], dtype = np.uint32)
+      canvas.fill_many(bar_rows, parent_centers,
+          junctions[are_left_corners.astype(int)*2 + are_right_corners.astype(int)])
+    all_lines = canvas.as_list_of_lines()
+    output_as = output_as.lower()
+    if output_as == 'single_string':
+      return '\n'.join(all_lines)
+    elif output_as == 'list_of_lines':
+      return all_lines
+    elif output_as == 'print_instead':
+      for line in all_lines:
+        print(line)
+      return None
+    else:
+      raise ValueError('Inexistent option for output format')
+
+  def produce_lines_of_boxes(self, paths, box_height, keys_to_print = None,
+      in_bulk = True, max_precision_for_floats = None):
+    r"""
+    Returns list with the lines of the boxes of the nodes at given paths
+    (as printed by print_tree_in_lines), cut to box_height lines: the lines
+    of StringBox.from_dict on the data of each node if it is a dict (with
+    keys_to_print, if given, printing values only, and with
+    max_precision_for_floats), and of str on the data otherwise.
+    
+    If in_bulk, when data of all nodes are dicts (with the same keys, if
+    keys_to_print is not given) they are formatted together by
+    StringBox.from_list_of_dicts, with the same result as node by node.
     """
-    #############
-    # WORK HERE
-    #############
-    pass
+    lra_dict = self.get_lra()
+    list_of_data = [lra_dict[path].data for path in paths]
+    if in_bulk and list_of_data and all(isinstance(data, dict) for data in list_of_data) \
+        and (keys_to_print is not None
+        or all(data.keys() == list_of_data[0].keys() for data in list_of_data)):
+      # Formatted in bulk, a column per key
+      list_of_string_boxes = StringBox.from_list_of_dicts(
+          list_of_dicts = list_of_data,
+          keys_to_print = keys_to_print,
+          print_values_only = keys_to_print is not None,
+          max_precision_for_floats = max_precision_for_floats,
+          force_height_to = box_height)
+      return [string_box.as_list_of_lines() for string_box in list_of_string_boxes]
+    lists_of_lines = []
+    for data in list_of_data:
+      if keys_to_print is not None:
+        lines = StringBox.from_dict(dictionary = data, keys_to_print = keys_to_print,
+            print_values_only = True,
+            max_precision_for_floats = max_precision_for_floats).as_list_of_lines()
+      elif isinstance(data, dict):
+        lines = StringBox.from_dict(dictionary = data,
+            max_precision_for_floats = max_precision_for_floats).as_list_of_lines()
+      else:
+        lines = str(data).split('\n')
+      lists_of_lines.append(lines[:box_height])
+    return lists_of_lines
 
   def print_tree_in_indented_display(
       self,
@@ -709,6 +925,7 @@ class FrozenBinaryTree(FrozenTree):
       ordered_paths_of_nodes = sorted(list(lra_dict), key = ordering_function)
     # Variable to control the vertical bars U+2502 (spanned through many lines)
     tree_levels_with_ongoing_vertical_bars = set()
+    all_lines = []
     for path in ordered_paths_of_nodes:
       node = lra_dict[path]
       current_level = len(path) # That is, 0 for root
@@ -725,8 +942,8 @@ class FrozenBinaryTree(FrozenTree):
         # Set the appropriate tree_levels_with_ongoing_vertical_bars
         #and branch_string_for_node
         if path == '': # Exceptional case, equivalent to current_level = 0
+          # The root has no brother, so no vertical bar goes on
           branch_string_for_node = ''
-          tree_levels_with_ongoing_vertical_bars.add(current_level)
         elif path.endswith('l'):
           if path[:-1]+'r' in lra_dict:
             # Left child; there will be a brother right child below
@@ -758,31 +975,31 @@ class FrozenBinaryTree(FrozenTree):
             skip_checks = False)
       else:
         node_as_string_box = StringBox(
-            single_string = str(node.data)
+            single_string = str(node.data))
       # Any trailing spaces from any line of the StringBox can simply be omitted
       # After all, there is no other information to be included in the
       #same line to the right
       node_as_even_lines = node_as_string_box.as_list_of_lines()
-      node_as_uneved_lines = [rstrip(line) for line in node_as_even_lines]
+      node_as_uneved_lines = [line.rstrip() for line in node_as_even_lines]
       for node_line in node_as_uneved_lines:
         vertical_bars_as_list = [' ']*(current_level * indentation)
         for level in tree_levels_with_ongoing_vertical_bars:
           if level != current_level:
-            vertical_bars_as_list[level * indentation] = 
+            vertical_bars_as_list[level * indentation] = '\u2502'
         vertical_bars = ''.join(vertical_bars_as_list)
         line = vertical_bars + branch_string_for_node + node_line
         all_lines.append(line)
-      output_as = output_as.lower()
-      if output_as == 'single_string':
-        return '\n'.join(all_lines)
-      elif output_as == 'list_of_lines':
-        return all_lines
-      elif output_as == 'print_instead':
-        for line in all_lines:
-          print(line)
-        return None
-      else:
-        raise ValueError('Inexistent option for output format')
+    output_as = output_as.lower()
+    if output_as == 'single_string':
+      return '\n'.join(all_lines)
+    elif output_as == 'list_of_lines':
+      return all_lines
+    elif output_as == 'print_instead':
+      for line in all_lines:
+        print(line)
+      return None
+    else:
+      raise ValueError('Inexistent option for output format')
 
 class FrozenBinaryTreeOfDicts(FrozenBinaryTree):
   """A frozen binary tree having dictionaries as data in all nodes."""
@@ -809,9 +1026,9 @@ class FrozenBinaryTreeOfDicts(FrozenBinaryTree):
       nodes_to_act_on = [self.get_root()]
     elif restrict_computation_to_leaves:
       is_leaf = lambda x: x.left is None and x.right is None
-      nodes_to_act_on = filter(is_leaf, self.list_of_nodes)
+      nodes_to_act_on = filter(is_leaf, self.get_list_of_nodes())
     else:
-      nodes_to_act = self.list_of_nodes
+      nodes_to_act_on = self.get_list_of_nodes()
     for node in nodes_to_act_on:
       kwargs = {
           'very_node_dict': node.data,
@@ -819,6 +1036,124 @@ class FrozenBinaryTreeOfDicts(FrozenBinaryTree):
       new_value_for_output_key = formula_on_dicts.call(**kwargs)
       node.data[output_key] = new_value_for_output_key
 
+  def compute_formulas_at_nodes(self, output_keys_and_formulas, all_other_args,
+      restrict_computation_to_root = False, restrict_computation_to_leaves = False):
+    r"""
+    Does the work of compute_formula_at_nodes for many pairs of output key
+    and FormulaOnDicts (given as a list of tuples) in a single traversal.
+
+    Formulas may read outputs of other formulas of the list at the same
+    node: they are evaluated in an order solving these dependencies (see
+    FormulaOnDicts.static_order_by_dependencies).
+    """
+    output_keys_and_formulas = FormulaOnDicts.static_order_by_dependencies(
+        output_keys_and_formulas, argument_name = 'very_node_dict')
+    if restrict_computation_to_root and restrict_computation_to_leaves:
+      raise ValueError('Cannot restrict simultaneously to root and to leaves')
+    elif restrict_computation_to_root:
+      nodes_to_act_on = [self.get_root()]
+    elif restrict_computation_to_leaves:
+      is_leaf = lambda x: x.left is None and x.right is None
+      nodes_to_act_on = filter(is_leaf, self.get_list_of_nodes())
+    else:
+      nodes_to_act_on = self.get_list_of_nodes()
+    for node in nodes_to_act_on:
+      for output_key, formula_on_dicts in output_keys_and_formulas:
+        node.data[output_key] = formula_on_dicts.call(
+            very_node_dict = node.data,
+            all_other_args = all_other_args)
+    return None
+
+  def compute_formula_graph_at_nodes(self, formula_graph, all_other_args,
+      restrict_computation_to_root = False, restrict_computation_to_leaves = False):
+    r"""
+    Evaluates a FormulaGraph at nodes (all, or only the root, or only the
+    leaves), writing its outputs to the data of each node.
+
+    Level-invariant formulas of the graph are evaluated once per level,
+    the level of a node being the length of its path.
+    """
+    if restrict_computation_to_root and restrict_computation_to_leaves:
+      raise ValueError('Cannot restrict simultaneously to root and to leaves')
+    elif restrict_computation_to_root:
+      nodes_to_act_on = [self.get_root()]
+    elif restrict_computation_to_leaves:
+      is_leaf = lambda x: x.left is None and x.right is None
+      nodes_to_act_on = filter(is_leaf, self.get_list_of_nodes())
+    else:
+      nodes_to_act_on = self.get_list_of_nodes()
+    plan = formula_graph.produce_plan()
+    level_invariant_values_by_level = {}
+    for node in nodes_to_act_on:
+      level_invariant_values = level_invariant_values_by_level.setdefault(len(node.path), {})
+      node.data.update(formula_graph.evaluate_at_dict(
+          very_node_dict = node.data,
+          all_other_args = all_other_args,
+          plan = plan,
+          level_invariant_values = level_invariant_values))
+    return None
+
+  def compute_formula_at_nodes_in_parallel(self, output_key, formula_on_dicts,
+      all_other_args, number_of_workers = None, chunk_size = 256,
+      restrict_computation_to_root = False, restrict_computation_to_leaves = False):
+    r"""
+    Does the work of compute_formula_at_nodes with a pool of processes,
+    worthwhile for expensive formulas (such as a root solve per node).
+
+    Nodes are split in chunks of at most chunk_size nodes, in a fixed order,
+    and only the keys read by the formula are sent to the workers (at most
+    number_of_workers, by default the number of processors). The formula
+    must be picklable (its inner function defined at module level, for
+    example). Results are the same as those of compute_formula_at_nodes.
+    If there is a single chunk, it is computed without workers.
+
+    The default chunk_size is smaller than that of the methods of
+    FrozenRecombiningBinaryTree (4096), as here every node costs a call of
+    the formula and the pickling of a dict, instead of a slice of arrays
+    given to a single call per chunk.
+    """
+    if restrict_computation_to_root and restrict_computation_to_leaves:
+      raise ValueError('Cannot restrict simultaneously to root and to leaves')
+    elif restrict_computation_to_root:
+      nodes_to_act_on = [self.get_root()]
+    elif restrict_computation_to_leaves:
+      is_leaf = lambda x: x.left is None and x.right is None
+      nodes_to_act_on = list(filter(is_leaf, self.get_list_of_nodes()))
+    else:
+      nodes_to_act_on = self.get_list_of_nodes()
+    if chunk_size < 1:
+      raise ValueError('Expected chunk_size to be positive')
+    keys_read = formula_on_dicts.get_keys_read_from_argument('very_node_dict')
+    list_of_chunks = []
+    for start in range(0, len(nodes_to_act_on), chunk_size):
+      list_of_chunks.append([{key: node.data[key] for key in keys_read if key in node.data}
+          for node in nodes_to_act_on[start:start + chunk_size]])
+    if len(list_of_chunks) <= 1:
+      # Starting a pool would cost more than the computation it shares
+      results = [result for list_of_dicts in list_of_chunks
+          for result in self.static_compute_formula_at_list_of_dicts(
+              formula_on_dicts, list_of_dicts, all_other_args)]
+    else:
+      from concurrent.futures import ProcessPoolExecutor
+      from itertools import repeat
+      with ProcessPoolExecutor(max_workers = number_of_workers) as executor:
+        # Results come in the order of the chunks, whatever the order of completion
+        results_by_chunk = executor.map(
+            self.static_compute_formula_at_list_of_dicts,
+            repeat(formula_on_dicts),
+            list_of_chunks,
+            repeat(all_other_args))
+        results = [result for results_of_chunk in results_by_chunk for result in results_of_chunk]
+    for node, result in zip(nodes_to_act_on, results):
+      node.data[output_key] = result
+    return None
+
+  @staticmethod
+  def static_compute_formula_at_list_of_dicts(formula_on_dicts, list_of_dicts, all_other_args):
+    """Returns list with results of a formula at each dict (run in workers)."""
+    return [formula_on_dicts.call(very_node_dict = very_node_dict, all_other_args = all_other_args)
+        for very_node_dict in list_of_dicts]
+
   def propagate_formula_up(self, output_key, formula_on_dicts, all_other_args):
     r"""
     Uses a formula to create or update a value for a dictionary key at
@@ -833,9 +1168,21 @@ class FrozenBinaryTreeOfDicts(FrozenBinaryTree):
     More specifically, it uses a FormulaOnDicts with named
     keyword dict arguments called `very_node_dict`, `left_child_dict`,
     `right_child_dict` and `all_other_args`. The result of the formula
-    will alter the output key of the very node.
+    will alter the output key of the very node. A missing child (in a tree
+    which is not perfect) is given as an empty dict.
     """
-    pass
+    # Nodes are visited from the deepest level up, so that children are
+    #always computed before their parent (without recursion)
+    nodes_bottom_up = sorted(self.get_list_of_nodes(), key = lambda x: len(x.path), reverse = True)
+    for node in nodes_bottom_up:
+      if node.left is None and node.right is None:
+        continue
+      node.data[output_key] = formula_on_dicts.call(
+          very_node_dict = node.data,
+          left_child_dict = node.left.data if node.left is not None else {},
+          right_child_dict = node.right.data if node.right is not None else {},
+          all_other_args = all_other_args)
+    return None
     
   def propagate_formula_down(self, output_key, formula_on_dicts, almost_all_other_args):
     r"""
@@ -856,41 +1203,30 @@ class FrozenBinaryTreeOfDicts(FrozenBinaryTree):
     `almost_all_other_args` named 'is_it_left_instead_of_right', which
     tells whether the node in question, whose `output_key` value is being
     created or altered, is the left or the right child of its parent,
-    as well as an added key `is_it_root` which is true only on the root.
+    as well as an added key `is_it_root` which is always False (the
+    formula not being called at the root).
     """
+    if almost_all_other_args is None:
+      almost_all_other_args = {}
     if 'is_it_left_instead_of_right' in almost_all_other_args:
       raise ValueError('Left and right info cannot be given early')
-    def depth_first_search(
-        self,
-        current_node,
-        formula_on_dicts,
-        almost_all_other_args):
-      # Each iteration produces the correct `output_key` corresponding
-      #value for left and right node of `current_node`
-      list_of_children_and_boolean = [
-          (current_node.left, True),
-          (current_node.right, False)]
-      for child_node, is_it_left_instead_of_right in list_of_children_and_boolean:
-        if child_node is not None:
-          all_other_args = {'is_it_left_instead_of_right': is_it_left_instead_of_right}
-          all_other_args.update(almost_all_other_args)
-          new_output_value = formula_on_dicts(
-              parent_dict = current_node.data,
-              relevant_child_dict = child_node.data,
-              all_other_args = all_other_args)
-          child_node[output_key] = new_output_value
-          depth_first_search(
-              self,
-              child_node,
-              formula_on_dicts,
-              almost_all_other_args)
-      return None # Alters each node, returning None
-    current_node = self.get_root()
-    depth_first_search(
-        self,
-        current_node,
-        formula_on_dicts,
-        almost_all_other_args)
+    all_other_args_by_side = {}
+    for is_it_left_instead_of_right in [True, False]:
+      all_other_args = {
+          'is_it_left_instead_of_right': is_it_left_instead_of_right,
+          'is_it_root': False}
+      all_other_args.update(almost_all_other_args)
+      all_other_args_by_side[is_it_left_instead_of_right] = all_other_args
+    # Nodes are visited from the root down, so that parents are always
+    #computed before their children (without recursion)
+    lra = self.get_lra()
+    for node in sorted(self.get_list_of_nodes(), key = lambda x: len(x.path)):
+      if node.path == '':
+        continue
+      node.data[output_key] = formula_on_dicts.call(
+          parent_dict = lra[node.path[:-1]].data,
+          relevant_child_dict = node.data,
+          all_other_args = all_other_args_by_side[node.path[-1] == 'l'])
     return None
 
 class FrozenPerfectBinaryTree(FrozenBinaryTree):
@@ -931,7 +1267,8 @@ class FrozenPerfectBinaryTree(FrozenBinaryTree):
   def generate_perfect_binary_tree(cls, height, data = None):
     r"""
     Generates an instance (of FrozenPerfectBinaryTree or subclass) of given height
-    holding given data at every node.
+    holding given data at every node (a copy of it for each node, if it is a
+    dict, so nodes do not share their dicts).
     """
     # At the moment does not check if height is nonnegative integer
     # Produce a list of nodes such that the node in position 0 is the root
@@ -942,12 +1279,13 @@ class FrozenPerfectBinaryTree(FrozenBinaryTree):
     list_of_nodes = [None]*number_of_nodes
     index_of_first_leaf = 2**height - 1
     for idx in reversed(range(number_of_nodes)):
+      data_of_node = data.copy() if isinstance(data, dict) else data
       if idx >= index_of_first_leaf:
-        list_of_nodes[idx] = FrozenBinaryTreeNode(data = data, left = None, right = None)
+        list_of_nodes[idx] = BinaryNode(data = data_of_node, left = None, right = None)
       else:
         left = list_of_nodes[2*idx + 1]
         right = list_of_nodes[2*idx + 2]
-        list_of_nodes[idx] = FrozenBinaryTreeNode(data = data, left = left, right = right)
+        list_of_nodes[idx] = BinaryNode(data = data_of_node, left = left, right = right)
     frozen_perfect_binary_tree = cls(
         list_of_nodes = list_of_nodes,
         root = list_of_nodes[0],
@@ -957,13 +1295,563 @@ class FrozenPerfectBinaryTree(FrozenBinaryTree):
   @classmethod
   def generate_perfect_binary_tree_of_empty_dicts(cls, height):
     """Creates a perfect binary tree holding empty dicts in every node."""
-    return generate_perfect_binary_tree(cls, height, data = {})
+    return cls.generate_perfect_binary_tree(height, data = {})
 
 class FrozenPerfectBinaryTreeOfDicts(FrozenPerfectBinaryTree, FrozenBinaryTreeOfDicts):
   """A frozen perfect binary tree having dictionaries as data in every node."""
-  
+
   pass
 
+class FrozenRecombiningBinaryTree():
+  r"""
+  A binary tree of given height which recombines (see ISSUE #0026py):
+  for any node, taking the left child and then the right child yields
+  the same node as taking the right child and then the left child.
+
+  A node is then determined by a position, the tuple (level, idx) where
+  level is its distance to the root and idx is the number of right child
+  operations needed to reach it from the root. The left child of the node
+  at (level, idx) is at (level + 1, idx) and its right child is at
+  (level + 1, idx + 1). A tree of height h has (h + 1)*(h + 2)/2 nodes,
+  and not 2**(h + 1) - 1 as a FrozenPerfectBinaryTree.
+
+  Data is stored by columns instead of node by node. For every level
+  there is a dict (called level dict) whose keys play the role of the keys
+  of the dicts in the nodes of a FrozenBinaryTreeOfDicts, and whose values
+  are NumPy arrays whose last axis has length level + 1, the item at idx
+  on that axis being the data of the node at (level, idx). Any leading axes
+  can be used to hold many quantities (for example, values of many options)
+  at once.
+
+  Data which is the same for every node (for example, the length of a step
+  in time) is stored in the dict `shared_data`.
+  """
+
+  def __init__(self, height, shared_data = None):
+    if not isinstance(height, int) or height < 0:
+      raise ValueError('Expected height to be a nonnegative integer')
+    self.height = height
+    self.list_of_level_dicts = [{} for level in range(height + 1)]
+    if shared_data is None:
+      shared_data = {}
+    self.shared_data = dict(shared_data)
+
+  def __len__(self):
+    """Returns the number of nodes of the tree."""
+    return (self.height + 1)*(self.height + 2)//2
+
+  def get_height(self):
+    """Returns the height, that is, the distance from root to every leaf node"""
+    return self.height
+
+  def get_level_dict(self, level):
+    """Returns the dict with the columns of data of the nodes at given level."""
+    return self.list_of_level_dicts[level]
+
+  def get_column(self, key, level):
+    """Returns array with the data under given key at every node of level."""
+    return self.list_of_level_dicts[level][key]
+
+  def set_column(self, key, level, column, skip_checks = False):
+    r"""
+    Sets array with the data under given key at every node of level.
+
+    Unless skip_checks is True, ensures the last axis of the array has
+    the correct length.
+    """
+    if not skip_checks:
+      if column.shape[-1:] != (level + 1,):
+        raise ValueError('Last axis of column should have length level + 1')
+    self.list_of_level_dicts[level][key] = column
+    return None
+
+  def get_node_data(self, position):
+    """Returns a new dict with the data of the node at given position."""
+    level, idx = position
+    if not 0 <= idx <= level <= self.height:
+      raise ValueError('No node at given position')
+    return {key: column[..., idx] for key, column in self.list_of_level_dicts[level].items()}
+
+  def propagate_function_up(self, output_key, function, all_other_args = None,
+      forget_output_at_children = False):
+    r"""
+    Uses a function to create or update a column at each level, from the
+    level before the leaves up to the root, based on the columns of the
+    level immediately below. It changes the instance itself, returning None.
+
+    The column at the leaves is not computed, it is assumed to be already set.
+
+    The function is called with keyword arguments `very_level_dict`,
+    `left_child_dict`, `right_child_dict` and `all_other_args`, the
+    two children dicts holding views of the columns of the level below
+    aligned with the nodes of the very level, so that a formula written
+    for a single node of a FrozenBinaryTreeOfDicts (with `very_node_dict`,
+    `left_child_dict` and `right_child_dict`) typically works unchanged
+    on whole levels. The dict `all_other_args` gets an added key `level`.
+
+    If forget_output_at_children is True, the output column at a level
+    is deleted as soon as the level above is computed, so that only the
+    root holds it at the end. This saves memory if only the root matters.
+    """
+    if all_other_args is None:
+      all_other_args = {}
+    if 'level' in all_other_args:
+      raise ValueError('Level info cannot be given early')
+    for level in reversed(range(self.height)):
+      children_level_dict = self.list_of_level_dicts[level + 1]
+      left_child_dict = {key: column[..., :-1] for key, column in children_level_dict.items()}
+      right_child_dict = {key: column[..., 1:] for key, column in children_level_dict.items()}
+      all_other_args_with_level = {'level': level}
+      all_other_args_with_level.update(all_other_args)
+      new_column = function(
+          very_level_dict = self.list_of_level_dicts[level],
+          left_child_dict = left_child_dict,
+          right_child_dict = right_child_dict,
+          all_other_args = all_other_args_with_level)
+      self.set_column(output_key, level, new_column)
+      if forget_output_at_children:
+        del children_level_dict[output_key]
+    return None
+
+  def propagate_function_down(self, output_key, function, all_other_args = None):
+    r"""
+    Uses a function to create or update a column at each level, from the
+    level after the root down to the leaves, based on the columns of the
+    level immediately above. It changes the instance itself, returning None.
+
+    The column at the root is not computed, it is assumed to be already set.
+
+    Since every node (other than those at the ends of a level) has two
+    parents, the function does not produce the column directly: it is
+    called with keyword arguments `parent_dict` (the level dict of the
+    level above) and `all_other_args` (with an added key `level`, that
+    of the parents), and returns a tuple with what each parent passes to
+    its left child and what it passes to its right child. The column of a
+    node is the sum of what its parents pass to it, which is what forward
+    induction (for example, of Arrow-Debreu prices) needs.
+
+    The function may also add columns to `parent_dict`, which allows the
+    data of a level to depend on the output just propagated to it.
+    """
+    if all_other_args is None:
+      all_other_args = {}
+    if 'level' in all_other_args:
+      raise ValueError('Level info cannot be given early')
+    import numpy as np
+    for level in range(self.height):
+      all_other_args_with_level = {'level': level}
+      all_other_args_with_level.update(all_other_args)
+      to_left_children, to_right_children = function(
+          parent_dict = self.list_of_level_dicts[level],
+          all_other_args = all_other_args_with_level)
+      to_left_children, to_right_children = np.broadcast_arrays(
+          to_left_children, to_right_children)
+      # Node at (level + 1, idx) is left child of (level, idx)
+      #and right child of (level, idx - 1)
+      padding = np.zeros(to_left_children.shape[:-1] + (1,), dtype = to_left_children.dtype)
+      new_column = np.concatenate([to_left_children, padding], axis = -1)
+      new_column[..., 1:] += to_right_children
+      self.set_column(output_key, level + 1, new_column)
+    return None
+
+  def produce_column_from_formula_result(self, result, level):
+    """Returns formula result as a column, broadcasting it if constant."""
+    import numpy as np
+    result = np.asarray(result)
+    if result.ndim == 0:
+      result = np.full(level + 1, result[()])
+    return result
+
+  def compute_formula_at_nodes(self, output_key, formula_on_dicts, all_other_args,
+      restrict_computation_to_root = False, restrict_computation_to_leaves = False):
+    r"""
+    Uses a formula to create or update a column at every level (or only
+    at the root, or only at the leaves), as for a FrozenBinaryTreeOfDicts.
+
+    The formula is evaluated once per level, on whole columns: a
+    FormulaOnDicts is treated as a VectorizedFormulaOnDicts. The dict
+    given as `very_node_dict` is the level dict, and `all_other_args`
+    gets an added key `level`.
+    """
+    self.compute_formulas_at_nodes(
+        output_keys_and_formulas = [(output_key, formula_on_dicts)],
+        all_other_args = all_other_args,
+        restrict_computation_to_root = restrict_computation_to_root,
+        restrict_computation_to_leaves = restrict_computation_to_leaves)
+    return None
+
+  def compute_formulas_at_nodes(self, output_keys_and_formulas, all_other_args,
+      restrict_computation_to_root = False, restrict_computation_to_leaves = False,
+      levels_to_act_on = None):
+    r"""
+    Does the work of compute_formula_at_nodes for many pairs of output key
+    and formula (given as a list of tuples) in a single pass over levels,
+    each level computing all outputs while its columns are at hand.
+
+    Formulas may read outputs of other formulas of the list at the same
+    node: they are evaluated in an order solving these dependencies (see
+    FormulaOnDicts.static_order_by_dependencies).
+
+    The levels can also be given directly as levels_to_act_on.
+    """
+    if levels_to_act_on is None:
+      if restrict_computation_to_root and restrict_computation_to_leaves:
+        raise ValueError('Cannot restrict simultaneously to root and to leaves')
+      elif restrict_computation_to_root:
+        levels_to_act_on = [0]
+      elif restrict_computation_to_leaves:
+        levels_to_act_on = [self.height]
+      else:
+        levels_to_act_on = range(self.height + 1)
+    if all_other_args is None:
+      all_other_args = {}
+    if 'level' in all_other_args:
+      raise ValueError('Level info cannot be given early')
+    output_keys_and_vectorized_formulas = [
+        (output_key, VectorizedFormulaOnDicts.static_produce_from_formula_on_dicts(formula_on_dicts))
+        for output_key, formula_on_dicts in FormulaOnDicts.static_order_by_dependencies(
+            output_keys_and_formulas, argument_name = 'very_node_dict')]
+    for level in levels_to_act_on:
+      all_other_args_with_level = {'level': level}
+      all_other_args_with_level.update(all_other_args)
+      level_dict = self.list_of_level_dicts[level]
+      for output_key, vectorized_formula in output_keys_and_vectorized_formulas:
+        result = vectorized_formula.call(
+            very_node_dict = level_dict,
+            all_other_args = all_other_args_with_level)
+        self.set_column(output_key, level, self.produce_column_from_formula_result(result, level))
+    return None
+
+  def compute_formula_graph_at_nodes(self, formula_graph, all_other_args,
+      restrict_computation_to_root = False, restrict_computation_to_leaves = False):
+    r"""
+    Evaluates a FormulaGraph at every level (or only at the root, or only
+    at the leaves), on whole columns, writing its outputs as columns.
+
+    Level-invariant formulas of the graph are evaluated once per level, on
+    numbers instead of columns, and broadcast if they are outputs.
+    """
+    if restrict_computation_to_root and restrict_computation_to_leaves:
+      raise ValueError('Cannot restrict simultaneously to root and to leaves')
+    elif restrict_computation_to_root:
+      levels_to_act_on = [0]
+    elif restrict_computation_to_leaves:
+      levels_to_act_on = [self.height]
+    else:
+      levels_to_act_on = range(self.height + 1)
+    if all_other_args is None:
+      all_other_args = {}
+    if 'level' in all_other_args:
+      raise ValueError('Level info cannot be given early')
+    plan = formula_graph.produce_plan()
+    for level in levels_to_act_on:
+      all_other_args_with_level = {'level': level}
+      all_other_args_with_level.update(all_other_args)
+      outputs = formula_graph.evaluate_at_dict(
+          very_node_dict = self.list_of_level_dicts[level],
+          all_other_args = all_other_args_with_level,
+          plan = plan)
+      for output_key, result in outputs.items():
+        self.set_column(output_key, level, self.produce_column_from_formula_result(result, level))
+    return None
+
+  def compute_formula_at_nodes_in_parallel(self, output_key, formula_on_dicts,
+      all_other_args, number_of_workers = None, chunk_size = 4096,
+      restrict_computation_to_root = False, restrict_computation_to_leaves = False):
+    r"""
+    Does the work of compute_formula_at_nodes with a pool of processes,
+    worthwhile for expensive formulas (such as a root solve per node, with
+    a VectorizedFormulaOnDicts vectorizing its inner function).
+
+    The columns read by the formula are joined across levels and split in
+    chunks of at most chunk_size nodes, in a fixed order; only those are
+    sent to the workers (at most number_of_workers, by default the number
+    of processors). The key `level` of `all_other_args` is then an array
+    with the level of every node of the chunk. The formula must be
+    picklable (its inner function defined at module level, for example).
+    If there is a single chunk, it is computed without workers.
+
+    The default chunk_size is larger than that of
+    FrozenBinaryTreeOfDicts.compute_formula_at_nodes_in_parallel (256), as
+    here a chunk costs a single (vectorized) call of the formula and the
+    pickling of slices of arrays, so chunks must be larger for the work
+    they hold to outweigh the cost of sending them.
+    """
+    import numpy as np
+    if restrict_computation_to_root and restrict_computation_to_leaves:
+      raise ValueError('Cannot restrict simultaneously to root and to leaves')
+    elif restrict_computation_to_root:
+      levels_to_act_on = [0]
+    elif restrict_computation_to_leaves:
+      levels_to_act_on = [self.height]
+    else:
+      levels_to_act_on = list(range(self.height + 1))
+    if all_other_args is None:
+      all_other_args = {}
+    if 'level' in all_other_args:
+      raise ValueError('Level info cannot be given early')
+    vectorized_formula = VectorizedFormulaOnDicts.static_produce_from_formula_on_dicts(
+        formula_on_dicts)
+    keys_read = vectorized_formula.get_keys_read_from_argument('very_node_dict')
+    joined_columns = {key: np.concatenate(
+        [self.list_of_level_dicts[level][key] for level in levels_to_act_on], axis = -1)
+        for key in keys_read}
+    joined_levels = np.concatenate(
+        [np.full(level + 1, level) for level in levels_to_act_on])
+    list_of_kwargs = []
+    for start in range(0, len(joined_levels), chunk_size):
+      all_other_args_with_levels = {'level': joined_levels[start:start + chunk_size]}
+      all_other_args_with_levels.update(all_other_args)
+      list_of_kwargs.append({
+          'very_node_dict': {key: column[..., start:start + chunk_size]
+              for key, column in joined_columns.items()},
+          'all_other_args': all_other_args_with_levels})
+    results = self.static_call_formula_on_chunks(
+        vectorized_formula, list_of_kwargs, number_of_workers)
+    joined_result = np.concatenate([
+        self.produce_column_from_formula_result(result, len(kwargs['all_other_args']['level']) - 1)
+        for result, kwargs in zip(results, list_of_kwargs)], axis = -1)
+    # Split back into levels
+    start = 0
+    for level in levels_to_act_on:
+      self.set_column(output_key, level, joined_result[..., start:start + level + 1])
+      start += level + 1
+    return None
+
+  def propagate_formula_up_in_parallel(self, output_key, formula_on_dicts,
+      all_other_args, number_of_workers = None, chunk_size = 4096):
+    r"""
+    Does the work of propagate_formula_up with a pool of processes, splitting
+    each level (which depends on the one below, so levels are still done one
+    after the other) in chunks of at most chunk_size nodes, sending to the
+    workers only the columns read by the formula. Levels with a single chunk
+    are computed without workers, and no pool is started if every level
+    fits in a single chunk. See compute_formula_at_nodes_in_parallel (also
+    for the default chunk_size).
+    """
+    if all_other_args is None:
+      all_other_args = {}
+    if 'level' in all_other_args:
+      raise ValueError('Level info cannot be given early')
+    vectorized_formula = VectorizedFormulaOnDicts.static_produce_from_formula_on_dicts(
+        formula_on_dicts)
+    keys_read_by_argument = {argument_name: vectorized_formula.get_keys_read_from_argument(argument_name)
+        for argument_name in ['very_node_dict', 'left_child_dict', 'right_child_dict']}
+    from concurrent.futures import ProcessPoolExecutor
+    from contextlib import nullcontext
+    import numpy as np
+    # The widest level propagated to is the one above the leaves
+    if self.height <= chunk_size:
+      executor_context = nullcontext()
+    else:
+      executor_context = ProcessPoolExecutor(max_workers = number_of_workers)
+    with executor_context as executor:
+      for level in reversed(range(self.height)):
+        very_level_dict = self.list_of_level_dicts[level]
+        children_level_dict = self.list_of_level_dicts[level + 1]
+        all_other_args_with_level = {'level': level}
+        all_other_args_with_level.update(all_other_args)
+        chunk_bounds = [(start, min(start + chunk_size, level + 1))
+            for start in range(0, level + 1, chunk_size)]
+        list_of_kwargs = []
+        for start, stop in chunk_bounds:
+          list_of_kwargs.append({
+              'very_node_dict': {key: very_level_dict[key][..., start:stop]
+                  for key in keys_read_by_argument['very_node_dict']},
+              'left_child_dict': {key: children_level_dict[key][..., start:stop]
+                  for key in keys_read_by_argument['left_child_dict']},
+              'right_child_dict': {key: children_level_dict[key][..., start + 1:stop + 1]
+                  for key in keys_read_by_argument['right_child_dict']},
+              'all_other_args': all_other_args_with_level})
+        results = self.static_call_formula_on_chunks(
+            vectorized_formula, list_of_kwargs, executor = executor)
+        self.set_column(output_key, level, np.concatenate([
+            self.produce_column_from_formula_result(result, stop - start - 1)
+            for result, (start, stop) in zip(results, chunk_bounds)], axis = -1))
+    return None
+
+  @staticmethod
+  def static_call_formula_on_chunks(formula_on_dicts, list_of_kwargs,
+      number_of_workers = None, executor = None):
+    r"""
+    Returns list with the results of a formula called with every item of
+    a list of kwargs, in order, using a pool of processes (the executor
+    given, or a new one with number_of_workers) unless there is a single
+    item.
+    """
+    if len(list_of_kwargs) == 1:
+      return [formula_on_dicts.call(**list_of_kwargs[0])]
+    from itertools import repeat
+    if executor is not None:
+      return list(executor.map(FrozenRecombiningBinaryTree.static_call_formula_with_kwargs,
+          repeat(formula_on_dicts), list_of_kwargs))
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers = number_of_workers) as executor:
+      return list(executor.map(FrozenRecombiningBinaryTree.static_call_formula_with_kwargs,
+          repeat(formula_on_dicts), list_of_kwargs))
+
+  @staticmethod
+  def static_call_formula_with_kwargs(formula_on_dicts, kwargs):
+    """Returns result of formula called with given kwargs (run in workers)."""
+    return formula_on_dicts.call(**kwargs)
+
+  def propagate_formula_up(self, output_key, formula_on_dicts, all_other_args):
+    r"""
+    Uses a formula to create or update a column at each level, based on the
+    columns of the level below, as for a FrozenBinaryTreeOfDicts.
+
+    The formula is evaluated once per level, on whole columns: a
+    FormulaOnDicts is treated as a VectorizedFormulaOnDicts. The keyword
+    arguments are `very_node_dict` (the level dict), `left_child_dict`,
+    `right_child_dict` (as in propagate_function_up) and `all_other_args`,
+    with an added key `level`.
+    """
+    vectorized_formula = VectorizedFormulaOnDicts.static_produce_from_formula_on_dicts(
+        formula_on_dicts)
+    def function(very_level_dict, left_child_dict, right_child_dict, all_other_args):
+      result = vectorized_formula.call(
+          very_node_dict = very_level_dict,
+          left_child_dict = left_child_dict,
+          right_child_dict = right_child_dict,
+          all_other_args = all_other_args)
+      return self.produce_column_from_formula_result(result, all_other_args['level'])
+    self.propagate_function_up(
+        output_key = output_key,
+        function = function,
+        all_other_args = all_other_args)
+    return None
+
+  def propagate_formula_down(self, output_key, formula_on_dicts, almost_all_other_args,
+      sum_over_parents = False):
+    r"""
+    Uses a formula to create or update a column at each level, based on the
+    columns of the level above, as for a FrozenBinaryTreeOfDicts.
+
+    The formula is evaluated twice per level, on whole columns: once for the
+    left children and once for the right children of the level above,
+    with keyword arguments `parent_dict`, `relevant_child_dict` (holding
+    views of the columns of the level below aligned with the parents) and
+    `all_other_args` (with added keys `is_it_left_instead_of_right`,
+    `is_it_root`, which is always False, and `level`, that of the parents).
+    A FormulaOnDicts is treated as a VectorizedFormulaOnDicts.
+
+    Since every node (other than those at the ends of a level) has two
+    parents, by default its column is computed from the parent of which it
+    is the left child (if any, otherwise the right child), which is correct
+    when both parents agree. If sum_over_parents is True, what both parents
+    give is summed instead, as in propagate_function_down.
+    """
+    if almost_all_other_args is None:
+      almost_all_other_args = {}
+    if 'is_it_left_instead_of_right' in almost_all_other_args:
+      raise ValueError('Left and right info cannot be given early')
+    if 'level' in almost_all_other_args:
+      raise ValueError('Level info cannot be given early')
+    vectorized_formula = VectorizedFormulaOnDicts.static_produce_from_formula_on_dicts(
+        formula_on_dicts)
+    for level in range(self.height):
+      children_level_dict = self.list_of_level_dicts[level + 1]
+      results = {}
+      for is_it_left_instead_of_right in [True, False]:
+        if is_it_left_instead_of_right:
+          relevant_child_dict = {key: column[..., :-1] for key, column in children_level_dict.items()}
+        else:
+          relevant_child_dict = {key: column[..., 1:] for key, column in children_level_dict.items()}
+        all_other_args = {
+            'is_it_left_instead_of_right': is_it_left_instead_of_right,
+            'is_it_root': False,
+            'level': level}
+        all_other_args.update(almost_all_other_args)
+        results[is_it_left_instead_of_right] = self.produce_column_from_formula_result(
+            vectorized_formula.call(
+                parent_dict = self.list_of_level_dicts[level],
+                relevant_child_dict = relevant_child_dict,
+                all_other_args = all_other_args),
+            level)
+      self.set_column(output_key, level + 1, self.static_merge_columns_from_parents(
+          results[True], results[False], sum_over_parents))
+    return None
+
+  def propagate_formula_down_in_parallel(self, output_key, formula_on_dicts,
+      almost_all_other_args, number_of_workers = None, chunk_size = 4096,
+      sum_over_parents = False):
+    r"""
+    Does the work of propagate_formula_down with a pool of processes,
+    splitting the parents of each level (which depends on the one above, so
+    levels are still done one after the other) in chunks of at most
+    chunk_size nodes, for the left and for the right children, sending to
+    the workers only the columns read by the formula. Levels with a single
+    chunk are computed without workers, and no pool is started if every
+    level fits in a single chunk. See compute_formula_at_nodes_in_parallel
+    (also for the default chunk_size).
+    """
+    if almost_all_other_args is None:
+      almost_all_other_args = {}
+    if 'is_it_left_instead_of_right' in almost_all_other_args:
+      raise ValueError('Left and right info cannot be given early')
+    if 'level' in almost_all_other_args:
+      raise ValueError('Level info cannot be given early')
+    vectorized_formula = VectorizedFormulaOnDicts.static_produce_from_formula_on_dicts(
+        formula_on_dicts)
+    keys_read_by_argument = {argument_name: vectorized_formula.get_keys_read_from_argument(argument_name)
+        for argument_name in ['parent_dict', 'relevant_child_dict']}
+    from concurrent.futures import ProcessPoolExecutor
+    from contextlib import nullcontext
+    import numpy as np
+    # The widest level propagated from is the one above the leaves
+    if self.height <= chunk_size:
+      executor_context = nullcontext()
+    else:
+      executor_context = ProcessPoolExecutor(max_workers = number_of_workers)
+    with executor_context as executor:
+      for level in range(self.height):
+        parents_level_dict = self.list_of_level_dicts[level]
+        children_level_dict = self.list_of_level_dicts[level + 1]
+        chunk_bounds = [(start, min(start + chunk_size, level + 1))
+            for start in range(0, level + 1, chunk_size)]
+        results = {}
+        for is_it_left_instead_of_right in [True, False]:
+          # Right children are one position further than their parents
+          shift = 0 if is_it_left_instead_of_right else 1
+          all_other_args = {
+              'is_it_left_instead_of_right': is_it_left_instead_of_right,
+              'is_it_root': False,
+              'level': level}
+          all_other_args.update(almost_all_other_args)
+          list_of_kwargs = []
+          for start, stop in chunk_bounds:
+            list_of_kwargs.append({
+                'parent_dict': {key: parents_level_dict[key][..., start:stop]
+                    for key in keys_read_by_argument['parent_dict']},
+                'relevant_child_dict': {key: children_level_dict[key][..., start + shift:stop + shift]
+                    for key in keys_read_by_argument['relevant_child_dict']},
+                'all_other_args': all_other_args})
+          chunk_results = self.static_call_formula_on_chunks(
+              vectorized_formula, list_of_kwargs, executor = executor)
+          results[is_it_left_instead_of_right] = np.concatenate([
+              self.produce_column_from_formula_result(result, stop - start - 1)
+              for result, (start, stop) in zip(chunk_results, chunk_bounds)], axis = -1)
+        self.set_column(output_key, level + 1, self.static_merge_columns_from_parents(
+            results[True], results[False], sum_over_parents))
+    return None
+
+  @staticmethod
+  def static_merge_columns_from_parents(from_left_parents, from_right_parents, sum_over_parents):
+    r"""
+    Returns the column of a level from the columns computed from the parents
+    of which its nodes are left children and right children (see
+    propagate_formula_down).
+    """
+    import numpy as np
+    from_left_parents, from_right_parents = np.broadcast_arrays(from_left_parents, from_right_parents)
+    if sum_over_parents:
+      padding = np.zeros(from_left_parents.shape[:-1] + (1,), dtype = from_left_parents.dtype)
+      new_column = np.concatenate([from_left_parents, padding], axis = -1)
+      new_column[..., 1:] += from_right_parents
+    else:
+      new_column = np.concatenate([from_left_parents, from_right_parents[..., -1:]], axis = -1)
+    return new_column
+
 class BinaryNode():
   r"""
   A classical binary node, with data, left and right attributes.
@@ -1001,7 +1889,7 @@ class FrozenBinaryTreeNode():
   contains data in an attribute.
   """
   
-  def __init__(self, data, left = None, right = None, parent = None):
+  def __init__(self, data, left = None, right = None, path = None):
     self.data = data
     self.left = left
     self.right = right
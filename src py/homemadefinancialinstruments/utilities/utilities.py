@@ -184,20 +184,15 @@ class StringBox():
       else:
         candidate_list_of_lines = single_string.split('\n')
       if list_of_lines is not None:
-        candidate_list_of_lines = single_string.split('\n')
         if candidate_list_of_lines != list_of_lines:
           raise ValueError('Init info must be given once not twice')
-      else:
-        candidate_list_of_lines = list_of_lines
-    if not skip_checks:
-      self.ensure_consistency_of_list_of_lines(candidate_list_of_lines)
     # Now adjust length, height, and maybe center
     if force_height_to is not None:
       # Eliminate the bottom lines
       if len(candidate_list_of_lines) > force_height_to:
         candidate_list_of_lines = candidate_list_of_lines[:force_height_to]
     if force_width_to is None:
-      correct_width = max(0, max(len(line) for line in candidate_list_of_lines))
+      correct_width = max((len(line) for line in candidate_list_of_lines), default = 0)
     else:
       correct_width = force_width_to
     correct_list_of_lines = []
@@ -214,6 +209,9 @@ class StringBox():
         else:
           correct_line = line + ' '*(correct_width - len(line))
       correct_list_of_lines.append(correct_line)
+    # Checked after uniformization of lengths, which lines need not have
+    if not skip_checks:
+      self.ensure_consistency_of_list_of_lines(correct_list_of_lines)
     self.list_of_lines = correct_list_of_lines
 
   @classmethod
@@ -230,7 +228,7 @@ class StringBox():
       for line in list_of_lines[1:]:
         if len(line) != length_of_first_line:
           raise ValueError('Not all lines have the same length')
-    for line in lines:
+    for line in list_of_lines:
       for symbol in '\t\n\r\x0b\x0c':
         if symbol in line:
           raise ValueError('Found non-space whitespace in one of the lines')
@@ -240,7 +238,7 @@ class StringBox():
     r"""Returns width (or number of columns) of the instance."""
     list_of_lines = self.as_list_of_lines()
     if list_of_lines:
-      len(list_of_lines[0])
+      return len(list_of_lines[0])
     else:
       return 0
     
@@ -313,7 +311,7 @@ class StringBox():
         if not isinstance(value, str):
           try:
             value = float(value)
-          except ValueError:
+          except (ValueError, TypeError): # As for None, for example
             pass
           else:
             # Should ensure correct display in f-string
@@ -331,6 +329,337 @@ class StringBox():
         align_to_center_instead_of_left = align_to_center_instead_of_left,
         skip_checks = skip_checks)
     return new_instance
+
+  @classmethod
+  def from_list_of_dicts(
+      cls,
+      list_of_dicts,
+      keys_to_print = None,
+      print_values_only = False,
+      max_precision_for_floats = None,
+      format_spec = None,
+      force_width_to = None,
+      force_height_to = None,
+      align_to_center_instead_of_left = False):
+    r"""
+    Produces a list of StringBoxes from a list of dicts, as from_dict would
+    for each of them (with the same arguments), but in bulk: the order of
+    keys is found once (if keys_to_print is None, from the first dict, all
+    dicts being expected to have those keys), and each key is formatted as
+    a column of values across the dicts, see static_format_column.
+    
+    If format_spec is given (a string such as '.4f', or a dict with one per
+    key), values are formatted by format(value, spec).
+    
+    Lines are padded (or cut, or centered) once per box, and instances are
+    created without running checks line by line: only the formatted values
+    are checked for non-space whitespace, once per column.
+    """
+    if isinstance(keys_to_print, dict):
+      pass
+    else:
+      if keys_to_print is None:
+        keys_to_print_as_list = list(list_of_dicts[0]) if list_of_dicts else []
+        keys_to_print_as_list.sort(key = lambda x: str(x))
+      elif isinstance(keys_to_print, (list, tuple)):
+        keys_to_print_as_list = list(keys_to_print)
+      else:
+        raise ValueError('Expect keys_to_print to be a list, a dict, or None')
+      keys_to_print = {key: key for key in keys_to_print_as_list}
+    if force_height_to is not None:
+      keys_to_print = dict(list(keys_to_print.items())[:force_height_to])
+    columns = []
+    for key, label in keys_to_print.items():
+      try:
+        values = [dictionary[key] for dictionary in list_of_dicts]
+      except KeyError:
+        raise KeyError('Key not in dictionary')
+      spec = format_spec.get(key) if isinstance(format_spec, dict) else format_spec
+      column = cls.static_format_column(values, max_precision_for_floats, spec)
+      if not print_values_only:
+        prefix = f'{label}: '
+        column = [prefix + string for string in column]
+      # A single search per symbol, on the whole column joined
+      joined_column = ''.join(column)
+      for symbol in '\t\n\r\x0b\x0c':
+        if symbol in joined_column:
+          raise ValueError('Found non-space whitespace in one of the lines')
+      columns.append(column)
+    # Transposition: from a list per key to a list per box
+    lists_of_lines = list(zip(*columns)) if columns else [()]*len(list_of_dicts)
+    if align_to_center_instead_of_left:
+      string_management = StringManagement()
+    list_of_instances = []
+    for lines in lists_of_lines:
+      if force_width_to is None:
+        width = max((len(line) for line in lines), default = 0)
+      else:
+        width = force_width_to
+      if align_to_center_instead_of_left:
+        lines = [string_management.center_string(line, width) for line in lines]
+      else:
+        lines = [line[:width].ljust(width) for line in lines]
+      new_instance = cls.__new__(cls)
+      new_instance.list_of_lines = lines
+      list_of_instances.append(new_instance)
+    return list_of_instances
+
+  @staticmethod
+  def static_format_column(values, max_precision_for_floats = None, format_spec = None):
+    r"""
+    Returns list of strings for a list of values (a column), as from_dict
+    shows them: if max_precision_for_floats is a number, values which are
+    not strings but convert to float are converted and rounded (all at
+    once by NumPy, if all of them convert), and they are then formatted by
+    format_spec if given, or by str.
+    """
+    if max_precision_for_floats is not None:
+      import numpy as np
+      are_strings = [isinstance(value, str) for value in values]
+      try:
+        # NumPy would turn None into nan instead of raising as float does
+        if any(are_strings) or any(value is None for value in values):
+          raise ValueError
+        values = np.round(np.asarray(values, dtype = float), max_precision_for_floats).tolist()
+      except (ValueError, TypeError):
+        # Mixed column: value by value, as in from_dict
+        rounded_values = []
+        for value, is_string in zip(values, are_strings):
+          if not is_string:
+            try:
+              value = round(float(value), max_precision_for_floats)
+            except (ValueError, TypeError):
+              pass
+          rounded_values.append(value)
+        values = rounded_values
+    if format_spec is None:
+      return list(map(str, values))
+    else:
+      return [format(value, format_spec) for value in values]
     
 class CharacterCanvas(StringBox):
-  pass
+  r"""
+  Mutable 2-D buffer of characters, to be visualized as a StringBox.
+  
+  The only attribute is buffer, a NumPy array of Unicode code points with
+  a row per line and a column per character, preallocated (filled with
+  spaces) at initialization.
+  
+  Boxes are written in place by blit, taking time proportional to their
+  sizes only, so composing many boxes (as in the layout of a tree) takes
+  time linear in the output, instead of rebuilding and padding every line
+  of the result at every step. Lines are built only by as_list_of_lines.
+  """
+  
+  def __init__(self, height = 0, width = 0, fill_character = ' '):
+    r"""Initializes canvas of given height and width, filled with a character."""
+    import numpy as np
+    if height < 0 or width < 0:
+      raise ValueError('Expected nonnegative height and width')
+    self.buffer = np.full((height, width), ord(fill_character), dtype = np.uint32)
+
+  @classmethod
+  def from_list_of_lines(cls, list_of_lines, fill_character = ' '):
+    r"""
+    Produces a CharacterCanvas from a list of lines, with width equal to
+    the maximum of their lengths (shorter lines are filled at their right).
+    """
+    import numpy as np
+    height = len(list_of_lines)
+    width = max((len(line) for line in list_of_lines), default = 0)
+    new_instance = cls(height = height, width = width, fill_character = fill_character)
+    if height > 0 and width > 0:
+      # Unicode strings of NumPy have 4 bytes per character, padded by NULs
+      code_points = np.array(list_of_lines, dtype = f'<U{width}').view(np.uint32)
+      code_points = code_points.reshape(height, width)
+      new_instance.buffer[:] = np.where(code_points == 0, ord(fill_character), code_points)
+    return new_instance
+
+  @classmethod
+  def from_string_box(cls, string_box):
+    r"""Produces a CharacterCanvas from a StringBox (or a CharacterCanvas)."""
+    if isinstance(string_box, CharacterCanvas):
+      new_instance = cls()
+      new_instance.buffer = string_box.buffer.copy()
+      return new_instance
+    return cls.from_list_of_lines(string_box.as_list_of_lines())
+
+  @classmethod
+  def produce_code_points(cls, box):
+    r"""
+    Returns 2-D array of code points of a CharacterCanvas (without copying),
+    a StringBox, a list of lines or a single string (cut at line breaks).
+    """
+    if isinstance(box, CharacterCanvas):
+      return box.buffer
+    elif isinstance(box, StringBox):
+      return cls.from_list_of_lines(box.as_list_of_lines()).buffer
+    elif isinstance(box, str):
+      return cls.from_list_of_lines(box.split('\n')).buffer
+    elif isinstance(box, (list, tuple)):
+      return cls.from_list_of_lines(list(box)).buffer
+    else:
+      raise ValueError('Expected CharacterCanvas, StringBox, list of lines or string')
+
+  def blit(self, box, row, column):
+    r"""
+    Writes a box (a CharacterCanvas, a StringBox, a list of lines or a
+    single string) in place, with its top left character at given row and
+    column of the canvas, which may be negative or out of the canvas: only
+    the part of the box inside the canvas is written (clipping).
+    """
+    code_points = self.produce_code_points(box)
+    box_height, box_width = code_points.shape
+    top, left = max(row, 0), max(column, 0)
+    bottom = min(row + box_height, self.get_height())
+    right = min(column + box_width, self.get_width())
+    if top < bottom and left < right:
+      self.buffer[top:bottom, left:right] = code_points[top - row:bottom - row, left - column:right - column]
+    return None
+
+  def fill_rectangle(self, row, column, height, width, character):
+    r"""
+    Fills rectangle with top left character at given row and column with
+    a character, in place, clipping to the canvas. Horizontal (or vertical)
+    lines are rectangles of height (or width) 1.
+    """
+    top, left = max(row, 0), max(column, 0)
+    bottom = min(row + height, self.get_height())
+    right = min(column + width, self.get_width())
+    if top < bottom and left < right:
+      self.buffer[top:bottom, left:right] = ord(character)
+    return None
+
+  def blit_many(self, list_of_boxes, rows, columns):
+    r"""
+    Writes many boxes of the same size (lists of lines of the same length,
+    or a 3-D array of code points) in place at once, with their top left
+    characters at given rows and columns, clipping to the canvas.
+    """
+    import numpy as np
+    if isinstance(list_of_boxes, np.ndarray):
+      code_points = list_of_boxes
+    else:
+      if len(list_of_boxes) == 0:
+        return None
+      box_height, box_width = len(list_of_boxes[0]), len(list_of_boxes[0][0]) if list_of_boxes[0] else 0
+      all_lines = [line for box in list_of_boxes for line in box]
+      code_points = self.from_list_of_lines(all_lines).buffer.reshape(
+          len(list_of_boxes), box_height, box_width)
+    number_of_boxes, box_height, box_width = code_points.shape
+    all_rows = np.asarray(rows)[:, None, None] + np.arange(box_height)[None, :, None]
+    all_columns = np.asarray(columns)[:, None, None] + np.arange(box_width)[None, None, :]
+    all_rows, all_columns = np.broadcast_arrays(all_rows, all_columns)
+    self.fill_many(all_rows.ravel(), all_columns.ravel(), code_points.ravel())
+    return None
+
+  def fill_many(self, rows, columns, characters):
+    r"""
+    Writes characters (a single one, or one per position, as a string or
+    as code points) at many positions in place at once, clipping to the
+    canvas.
+    """
+    import numpy as np
+    rows, columns = np.asarray(rows), np.asarray(columns)
+    if isinstance(characters, str):
+      code_points = np.array([ord(character) for character in characters], dtype = np.uint32)
+    else:
+      code_points = np.asarray(characters, dtype = np.uint32)
+    code_points = np.broadcast_to(code_points, rows.shape)
+    are_inside = (rows >= 0) & (rows < self.get_height()) & (columns >= 0) & (columns < self.get_width())
+    self.buffer[rows[are_inside], columns[are_inside]] = code_points[are_inside]
+    return None
+
+  def fill_horizontal_segments(self, rows, lefts, rights, character):
+    r"""
+    Fills many horizontal segments (from lefts to rights, both included)
+    with a character in place at once, clipping to the canvas.
+    """
+    import numpy as np
+    rows, lefts = np.asarray(rows), np.asarray(lefts)
+    # Clipping first, so work is bounded by the size of the canvas
+    lefts = np.maximum(lefts, 0)
+    rights = np.minimum(np.asarray(rights), self.get_width() - 1)
+    lengths = np.maximum(rights - lefts + 1, 0)
+    starts = np.cumsum(lengths) - lengths
+    columns = np.arange(lengths.sum()) - np.repeat(starts - lefts, lengths)
+    self.fill_many(np.repeat(rows, lengths), columns, character)
+    return None
+
+  def crop(self, row, column, height, width):
+    r"""
+    Returns new CharacterCanvas with given height and width, copying the
+    characters of self from given row and column (as a viewport; parts out
+    of self are filled with spaces).
+    """
+    new_instance = self.__class__(height = height, width = width)
+    new_instance.blit(self, -row, -column)
+    return new_instance
+
+  @classmethod
+  def hstack(cls, list_of_boxes, horizontal_space = 0, align_to_bottom_instead_of_top = False):
+    r"""
+    Produces CharacterCanvas with boxes (anything accepted by blit) side by
+    side, from left to right, separated by horizontal_space columns.
+    The canvas is allocated once, and each box is written once.
+    """
+    list_of_code_points = [cls.produce_code_points(box) for box in list_of_boxes]
+    height = max((code_points.shape[0] for code_points in list_of_code_points), default = 0)
+    width = sum(code_points.shape[1] for code_points in list_of_code_points) \
+        + horizontal_space*max(len(list_of_code_points) - 1, 0)
+    new_instance = cls(height = height, width = width)
+    column = 0
+    for code_points in list_of_code_points:
+      row = height - code_points.shape[0] if align_to_bottom_instead_of_top else 0
+      new_instance.buffer[row:row + code_points.shape[0], column:column + code_points.shape[1]] = code_points
+      column += code_points.shape[1] + horizontal_space
+    return new_instance
+
+  @classmethod
+  def vstack(cls, list_of_boxes, vertical_space = 0, align_to_center_instead_of_left = False):
+    r"""
+    Produces CharacterCanvas with boxes (anything accepted by blit) piled
+    from top to bottom, separated by vertical_space lines.
+    The canvas is allocated once, and each box is written once.
+    """
+    list_of_code_points = [cls.produce_code_points(box) for box in list_of_boxes]
+    width = max((code_points.shape[1] for code_points in list_of_code_points), default = 0)
+    height = sum(code_points.shape[0] for code_points in list_of_code_points) \
+        + vertical_space*max(len(list_of_code_points) - 1, 0)
+    new_instance = cls(height = height, width = width)
+    row = 0
+    for code_points in list_of_code_points:
+      column = (width - code_points.shape[1])//2 if align_to_center_instead_of_left else 0
+      new_instance.buffer[row:row + code_points.shape[0], column:column + code_points.shape[1]] = code_points
+      row += code_points.shape[0] + vertical_space
+    return new_instance
+
+  def get_width(self):
+    r"""Returns width (or number of columns) of the instance."""
+    return self.buffer.shape[1]
+
+  def get_height(self):
+    r"""Returns height (or number of rows) of the instance."""
+    return self.buffer.shape[0]
+
+  def as_list_of_lines(self):
+    r"""
+    Returns list of lines representing the instance, all built at once by
+    reinterpreting the rows of code points as strings.
+    """
+    import numpy as np
+    height, width = self.buffer.shape
+    if width == 0:
+      return ['']*height
+    rows = np.ascontiguousarray(self.buffer).view(f'<U{width}').reshape(height)
+    # Any NUL at the end would be dropped by NumPy, so lines are checked
+    list_of_lines = rows.tolist()
+    return [line if len(line) == width else line.ljust(width, '\x00') for line in list_of_lines]
+
+  def as_single_string(self):
+    r"""Returns single string representing the instance."""
+    return '\n'.join(self.as_list_of_lines())
+
+  def as_string_box(self):
+    r"""Returns StringBox (frozen in time) with the lines of the instance."""
+    return StringBox(list_of_lines = self.as_list_of_lines(), skip_checks = True)
@@ -45,7 +45,6 @@ class FixedInterestRateWorld(World):
       is_rate_discrete_instead_of_continuous = False,
       is_rate_percentage_instead_of_absolute = False):
     self.set_interest_rates(
-        self,
         interest_rate,
         is_rate_discrete_instead_of_continuous,
         is_rate_percentage_instead_of_absolute)
@@ -60,7 +59,7 @@ class FixedInterestRateWorld(World):
       interest_rate = interest_rate / 100.0 # Python-agnostic
     # Discrete interest rate is also called annualized on some sources
     # Continuouly compounded rate is also called continous, or short rate
-    if is_interest_rate_discrete_instead_of_continuous:
+    if is_rate_discrete_instead_of_continuous:
       from math import log1p # More precise than log(1 + _)
       self.continuous_interest_rate = log1p(interest_rate)
       self.discrete_interest_rate = interest_rate
@@ -73,6 +72,14 @@ class FixedInterestRateWorld(World):
     """Gets interest rate (the continuously compounded rate, or short rate)"""
     return self.continuous_interest_rate
 
+  def compute_discount_factors(self, times):
+    r"""
+    Computes the present values of units paid at given times (in years,
+    such as year fractions of a DayCountConvention), a number or an array.
+    """
+    import numpy as np
+    return np.exp(-self.continuous_interest_rate*np.asarray(times, dtype = float))
+
   def get_or_override_interest_rate(self, overriding_interest_rate):
     r"""
     Gets interest rate, unless a value is given which overrides the request,
@@ -175,3 +182,117 @@ class RiskNeutralWorld(World):
 class RiskNeutralFixedInterestRateWorld(RiskNeutralWorld, FixedInterestRateWorld):
   """World in which the expected value for any asset grow at the interest rate."""
   pass
+
+class ShortRateBinomialLatticeWorld(RiskNeutralWorld):
+  r"""
+  Risk-neutral world in which the short rate (continuously compounded over
+  each step) follows a recombining binomial lattice, stored in a
+  FrozenRecombiningBinaryTree, moving up or down with probability 1/2.
+
+  At the node (level, idx), with m = 2*idx - level, the short rate is:
+  theta_level + volatility*sqrt(step_length)*m on the Ho-Lee model, or
+  u_level*exp(volatility*sqrt(step_length)*m) on the Black-Derman-Toy model
+  (where volatility is that of the logarithm of the rate).
+
+  The drifts theta_level (or u_level) are calibrated to zero rates at times
+  step_length, 2*step_length, and so on, by forward induction: the
+  Arrow-Debreu prices (present values of a unit paid only if a node is
+  reached) of a level fix the drift of the level, which fixes in turn the
+  Arrow-Debreu prices of the next. The lattice then has height equal to
+  the number of zero rates, with short rates defined up to the level
+  before the leaves. Columns are `short_rate`, `discount_factor` (over a
+  step from the node), `probability_of_right` and `arrow_debreu_price`.
+  """
+
+  def __init__(self, zero_rates, volatility, step_length, model = 'ho_lee',
+      are_zero_rates_discrete_instead_of_continuous = False):
+    import numpy as np
+    zero_rates = np.asarray(zero_rates, dtype = float)
+    if zero_rates.ndim != 1 or len(zero_rates) == 0:
+      raise ValueError('Expected zero rates as a nonempty list')
+    if are_zero_rates_discrete_instead_of_continuous:
+      zero_rates = np.log1p(zero_rates) # More precise than log(1 + _)
+    if model not in ['ho_lee', 'black_derman_toy']:
+      raise ValueError('Inexistent option for short rate model')
+    self.zero_rates = zero_rates
+    self.volatility = volatility
+    self.step_length = step_length
+    self.model = model
+    self.lattice = self.static_build_calibrated_short_rate_lattice(
+        zero_rates = zero_rates,
+        volatility = volatility,
+        step_length = step_length,
+        model = model)
+
+  def get_short_rate_lattice(self):
+    """Returns the calibrated FrozenRecombiningBinaryTree of short rates."""
+    return self.lattice
+
+  def get_interest_rate(self, *args, **kwargs):
+    """Gets interest rate at the present time (the short rate at the root)"""
+    return float(self.lattice.get_column('short_rate', 0)[0])
+
+  def get_discount_factor(self, number_of_steps):
+    r"""
+    Gets present value of a unit paid after given number of steps, from
+    the Arrow-Debreu prices of the lattice.
+    """
+    return float(self.lattice.get_column('arrow_debreu_price', number_of_steps).sum())
+
+  @staticmethod
+  def static_build_calibrated_short_rate_lattice(zero_rates, volatility,
+      step_length, model = 'ho_lee', tolerance = 1e-14, max_iterations = 100):
+    r"""
+    Returns a FrozenRecombiningBinaryTree with short rates calibrated to
+    (continuously compounded) zero rates at times step_length,
+    2*step_length, and so on, built level by level on forward induction.
+
+    Ho-Lee drifts have a closed form. Black-Derman-Toy drifts are found
+    by Newton's method, which converges monotonically since the price of
+    the zero-coupon bond is a convex decreasing function of the drift.
+    """
+    import numpy as np
+    number_of_steps = len(zero_rates)
+    target_discount_factors = np.exp(-zero_rates*step_length*np.arange(1, number_of_steps + 1))
+    lattice = FrozenRecombiningBinaryTree(
+        height = number_of_steps,
+        shared_data = {'step_length': step_length})
+    lattice.set_column('arrow_debreu_price', 0, np.ones(1))
+    jump = volatility*np.sqrt(step_length)
+    def calibrate_level_and_propagate_arrow_debreu_prices(parent_dict, all_other_args):
+      level = all_other_args['level']
+      arrow_debreu_prices = parent_dict['arrow_debreu_price']
+      target = target_discount_factors[level]
+      m = 2*np.arange(level + 1) - level
+      if model == 'ho_lee':
+        # Prices with theta = 0, then shifted to match the target
+        weights = arrow_debreu_prices*np.exp(-jump*m*step_length)
+        theta = np.log(weights.sum()/target)/step_length
+        short_rates = theta + jump*m
+      else:
+        shapes = np.exp(jump*m)
+        # Start at the forward rate for the step
+        if level == 0:
+          drift = zero_rates[0]
+        else:
+          drift = np.log(target_discount_factors[level - 1]/target)/step_length
+        for iteration in range(max_iterations):
+          discount_factors = np.exp(-drift*shapes*step_length)
+          weighted = arrow_debreu_prices*discount_factors
+          newton_step = (weighted.sum() - target)/(step_length*(weighted*shapes).sum())
+          drift = drift + newton_step
+          if abs(newton_step) <= tolerance*max(1.0, abs(drift)):
+            break
+        else:
+          raise ValueError('Calibration of short rate lattice did not converge')
+        short_rates = drift*shapes
+      discount_factors = np.exp(-short_rates*step_length)
+      parent_dict['short_rate'] = short_rates
+      parent_dict['discount_factor'] = discount_factors
+      parent_dict['probability_of_right'] = np.full(level + 1, 0.5)
+      to_each_child = 0.5*arrow_debreu_prices*discount_factors
+      return (to_each_child, to_each_child)
+    lattice.propagate_function_down(
+        output_key = 'arrow_debreu_price',
+        function = calibrate_level_and_propagate_arrow_debreu_prices)
+    return lattice
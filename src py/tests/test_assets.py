@@ -0,0 +1,90 @@
+########################################################################
+# DOCUMENTATION / README
+########################################################################
+
+# File belonging to software package "homemade_financial_instruments"
+# Implements financial instruments and solutions for pricing and hedging.
+
+# For more information on functionality, see README.md
+# For more information on bugs and planned features, see ISSUES.md
+# For more information on versioning, see RELEASES.md
+
+# Copyright (C) 2026 Eduardo Fischer
+
+# This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License version 3
+#as published by the Free Software Foundation. See LICENSE.
+# Alternatively, see https://www.gnu.org/licenses/.
+
+# This program is distributed in the hope that it will be useful,
+#but without any warranty; without even the implied warranty of
+#merchantability or fitness for a particular purpose.
+
+########################################################################
+
+
+import unittest
+
+import numpy as np
+
+from homemadefinancialinstruments.assets import *
+from homemadefinancialinstruments.portfolios import *
+from homemadefinancialinstruments.worlds import *
+
+class TestDividendSchedule(unittest.TestCase):
+
+  def setUp(self):
+    self.times = [0.75, 0.25, 0.5, 0.5]
+    self.amounts = [1.0, 2.0, 3.0, 4.0]
+    self.schedule = DividendSchedule(self.times, self.amounts)
+
+  def scan(self, initial_time, final_time, interest_rate = 0.0):
+    return sum(amount*np.exp(-interest_rate*(time - initial_time))
+        for time, amount in zip(self.times, self.amounts) if initial_time < time <= final_time)
+
+  def test_sums_match_scan(self):
+    for initial_time, final_time in [(0, 1), (0.25, 0.5), (0.2, 0.3), (0.5, 0.5), (0.8, 2)]:
+      self.assertAlmostEqual(self.schedule.get_dividends(initial_time, final_time),
+          self.scan(initial_time, final_time))
+      self.assertAlmostEqual(self.schedule.get_present_value_of_dividends(
+          initial_time, final_time, 0.05), self.scan(initial_time, final_time, 0.05))
+    np.testing.assert_allclose(self.schedule.get_dividends([0, 0.25], 0.6), [9.0, 7.0])
+
+  def test_present_values_at_levels_with_horizons(self):
+    present_values = self.schedule.get_present_values_of_dividends_at_levels(4, 0.25, 0.05,
+        horizon_levels = [4, 2])
+    self.assertEqual(present_values.shape, (2, 5))
+    for row, horizon_level in enumerate([4, 2]):
+      for level in range(5):
+        self.assertAlmostEqual(present_values[row, level],
+            self.scan(0.25*level, 0.25*max(level, horizon_level), 0.05))
+    np.testing.assert_allclose(present_values[0],
+        self.schedule.get_present_values_of_dividends_at_levels(4, 0.25, 0.05))
+
+class TestLatticesWithDividends(unittest.TestCase):
+
+  def setUp(self):
+    self.world = FixedInterestRateWorld(0.05)
+    self.schedule = DividendSchedule([0.3, 0.8], [2.0, 2.5])
+
+  def test_european_call_converges_to_black_scholes_on_escrowed_value(self):
+    asset = ExponentialUpDownBinaryTreeAsset(100.0, 0.25, dividend_schedule = self.schedule)
+    option = VanillaEuropeanCallOption(asset, 1.0, 100.0)
+    price = option.compute_present_value_in_risk_neutral_world(self.world, 1/1000)
+    escrowed_value = 100.0 - self.schedule.get_present_value_of_dividends(0, 1.0, 0.05)
+    expected, vega = VanillaOption.static_compute_black_scholes_prices_and_vegas(
+        escrowed_value, 100.0, 1.0, 0.05, 0.25, True)
+    self.assertAlmostEqual(price, float(expected), places = 2)
+
+  def test_escrowed_value_grows_at_interest_rate(self):
+    asset = EqualUpDownBinaryTreeAsset(100.0, 2.0, dividend_schedule = self.schedule)
+    lattice = asset.build_risk_neutral_lattice(self.world, 10, 0.1)
+    present_values = self.schedule.get_present_values_of_dividends_at_levels(10, 0.1, 0.05)
+    self.assertAlmostEqual(lattice.get_column('asset_value', 0)[0], 100.0)
+    for level in range(10):
+      level_dict = lattice.get_level_dict(level)
+      children = lattice.get_column('asset_value', level + 1)
+      expected_children = level_dict['probability_of_right']*children[1:] \
+          + (1 - level_dict['probability_of_right'])*children[:-1]
+      np.testing.assert_allclose(expected_children - present_values[level + 1],
+          (level_dict['asset_value'] - present_values[level])*np.exp(0.05*0.1))
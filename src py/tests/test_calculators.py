@@ -0,0 +1,290 @@
+########################################################################
+# DOCUMENTATION / README
+########################################################################
+
+# File belonging to software package "homemade_financial_instruments"
+# Implements financial instruments and solutions for pricing and hedging.
+
+# For more information on functionality, see README.md
+# For more information on bugs and planned features, see ISSUES.md
+# For more information on versioning, see RELEASES.md
+
+# Copyright (C) 2026 Eduardo Fischer
+
+# This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License version 3
+#as published by the Free Software Foundation. See LICENSE.
+# Alternatively, see https://www.gnu.org/licenses/.
+
+# This program is distributed in the hope that it will be useful,
+#but without any warranty; without even the implied warranty of
+#merchantability or fitness for a particular purpose.
+
+########################################################################
+
+
+import unittest
+
+import numpy as np
+
+from homemadefinancialinstruments.assets import *
+from homemadefinancialinstruments.calculators import *
+from homemadefinancialinstruments.portfolios import *
+from homemadefinancialinstruments.worlds import *
+
+class TestImpliedVolatilities(unittest.TestCase):
+
+  def setUp(self):
+    generator = np.random.default_rng(11)
+    self.number_of_quotes = 500
+    self.volatilities = generator.uniform(0.05, 1.2, self.number_of_quotes)
+    self.strucks = generator.uniform(60, 160, self.number_of_quotes)
+    self.expiries = generator.uniform(0.05, 3, self.number_of_quotes)
+    self.are_calls = generator.random(self.number_of_quotes) < 0.5
+    self.calculator = ImpliedVolatilityCalculator(tolerance = 1e-10)
+
+  def test_european_chain_recovers_volatilities(self):
+    prices, vegas = VanillaOption.static_compute_black_scholes_prices_and_vegas(
+        100.0, self.strucks, self.expiries, 0.03, self.volatilities, self.are_calls)
+    implied = self.calculator.compute_implied_volatilities(prices, 100.0, self.strucks,
+        self.expiries, 0.03, self.are_calls)
+    # Quotes with negligible vega carry no information on the volatility
+    are_informative = vegas > 1e-6
+    self.assertGreater(are_informative.sum(), 450)
+    np.testing.assert_allclose(implied[are_informative], self.volatilities[are_informative], atol = 1e-7)
+
+  def test_american_options_recover_volatilities(self):
+    world = FixedInterestRateWorld(0.05)
+    calculator = ImpliedVolatilityCalculator(tolerance = 1e-10, number_of_steps = 100)
+    options, prices = [], []
+    for volatility, struck, expiry, is_call in zip([0.2, 0.35, 0.6], [95.0, 110.0, 100.0],
+        [0.5, 1.0, 2.0], [False, False, True]):
+      asset = ExponentialUpDownBinaryTreeAsset(100.0, volatility)
+      if is_call:
+        option = VanillaAmericanCallOption(asset, expiry, struck)
+      else:
+        option = VanillaAmericanPutOption(asset, expiry, struck)
+      options.append(option)
+      prices.append(option.compute_present_value_in_risk_neutral_world(world, expiry/100))
+    implied = calculator.compute_implied_volatilities_of_options(options, prices, world)
+    np.testing.assert_allclose(implied, [0.2, 0.35, 0.6], atol = 1e-6)
+
+  def test_unattainable_prices_give_nan(self):
+    implied = self.calculator.compute_implied_volatilities(
+        [150.0, 0.0, 100.5, 10.0], 100.0, [50.0, 100.0, 100.0, 100.0], [1.0, 1.0, 1.0, 0.0],
+        0.0, True)
+    self.assertTrue(np.all(np.isnan(implied)))
+
+class TestJumpAmountCalibration(unittest.TestCase):
+
+  def setUp(self):
+    self.world = FixedInterestRateWorld(0.04)
+    self.strucks = np.tile([90.0, 100.0, 110.0], 3)
+    self.expiries = np.repeat([0.25, 0.5, 1.0], 3)
+    self.are_calls = np.array([False, True, True]*3)
+
+  def price_on_asset(self, asset, are_american):
+    options = []
+    for struck, expiry, is_call in zip(self.strucks, self.expiries, self.are_calls):
+      if is_call:
+        options.append((VanillaAmericanCallOption if are_american else VanillaEuropeanCallOption)(
+            asset, expiry, struck))
+      else:
+        options.append((VanillaAmericanPutOption if are_american else VanillaEuropeanPutOption)(
+            asset, expiry, struck))
+    return (options, Portfolio([(option, 1) for option in options]).compute_values(
+        self.world, 1/40)[0])
+
+  def test_single_jump_amount_is_recovered(self):
+    options, prices = self.price_on_asset(EqualUpDownBinaryTreeAsset(100.0, 2.5), True)
+    calculator = JumpAmountCalibrationCalculator(100.0, self.world, 1/40)
+    asset = calculator.calibrate_asset(options, prices)
+    self.assertAlmostEqual(asset.jump_amount, 2.5, places = 6)
+
+  def test_schedule_of_jump_amounts_is_recovered(self):
+    calculator = JumpAmountCalibrationCalculator(100.0, self.world, 1/40, number_of_jump_amounts = 3)
+    schedule = calculator.compute_derivatives_of_jump_amounts_by_level(40)[1:] @ [2.0, 2.6, 3.0]
+    options, prices = self.price_on_asset(EqualUpDownBinaryTreeAsset(100.0, 3.0, list(schedule)), False)
+    jump_amounts, residuals = calculator.compute_calibrated_jump_amounts(prices, self.strucks,
+        self.expiries, self.are_calls)
+    np.testing.assert_allclose(jump_amounts, [2.0, 2.6, 3.0], atol = 1e-5)
+    np.testing.assert_allclose(residuals, 0, atol = 1e-8)
+
+  def test_jacobian_matches_finite_differences(self):
+    calculator = JumpAmountCalibrationCalculator(100.0, self.world, 1/40, number_of_jump_amounts = 2)
+    expiry_levels = np.rint(self.expiries*40).astype(int)
+    jump_amounts = np.array([2.2, 2.8])
+    prices, jacobian = calculator.compute_prices_and_jacobian(jump_amounts, self.strucks,
+        self.are_calls, True, expiry_levels)
+    for idx in range(2):
+      bump = np.zeros(2)
+      bump[idx] = 1e-6
+      bumped_prices, bumped_jacobian = calculator.compute_prices_and_jacobian(jump_amounts + bump,
+          self.strucks, self.are_calls, True, expiry_levels)
+      np.testing.assert_allclose((bumped_prices - prices)/1e-6, jacobian[:, idx], atol = 1e-4)
+
+class TestLoanSchedules(unittest.TestCase):
+
+  def compute_schedule_by_loop(self, principal, rate, number_of_installments, amortization_system):
+    balance = principal
+    rows = []
+    for k in range(number_of_installments):
+      interest = balance*rate
+      if amortization_system == 'price':
+        installment = principal*rate/(1 - (1 + rate)**(-number_of_installments))
+        amortization = installment - interest
+      else:
+        amortization = principal/number_of_installments
+        installment = amortization + interest
+      balance -= amortization
+      rows.append([interest, amortization, installment, balance])
+    return np.array(rows).T
+
+  def test_schedules_match_loop(self):
+    principals, rates, numbers_of_installments = [1000, 5000, 300], [0.01, 0.0, 0.03], [12, 5, 1]
+    for amortization_system in ['price', 'sac']:
+      schedules = FixedInstallmentLoanCalculator.static_compute_schedules(principals, rates,
+          numbers_of_installments, amortization_system = amortization_system)
+      for index in range(3):
+        n = numbers_of_installments[index]
+        expected = self.compute_schedule_by_loop(principals[index], rates[index], n,
+            amortization_system) if rates[index] != 0 or amortization_system == 'sac' \
+            else np.array([[0]*n, [1000]*n, [1000]*n, [4000, 3000, 2000, 1000, 0]])
+        for row, key in enumerate(['interest', 'amortization', 'installment', 'balance']):
+          np.testing.assert_allclose(schedules[key][index, :n], expected[row], atol = 1e-9)
+          np.testing.assert_array_equal(schedules[key][index, n:], 0)
+
+  def test_price_balances_are_stable_for_high_rates(self):
+    for rate, number_of_installments in [(0.08, 360), (0.12, 240)]:
+      schedules = FixedInstallmentLoanCalculator.static_compute_schedules([1e5], [rate],
+          [number_of_installments])
+      self.assertEqual(schedules['balance'][0, -1], 0)
+      self.assertTrue(np.all(schedules['balance'] >= 0))
+      self.assertAlmostEqual(schedules['amortization'].sum(), 1e5, places = 6)
+      installment = schedules['installment'][0, 0]
+      np.testing.assert_allclose(schedules['interest'][0],
+          rate*np.concatenate([[1e5], schedules['balance'][0, :-1]]), atol = 1e-9)
+      np.testing.assert_allclose(schedules['interest'][0] + schedules['amortization'][0],
+          installment, rtol = 1e-12)
+
+  def test_implied_rates_recover_rates(self):
+    rates = np.array([0.0, 0.005, 0.02, 0.12, -0.01])
+    numbers_of_installments = np.array([10, 360, 48, 240, 24])
+    installments = FixedInstallmentLoanCalculator.static_compute_schedules(
+        np.full(5, 1000.0), rates, numbers_of_installments)['installment'][:, 0]
+    implied = FixedInstallmentLoanCalculator().compute_implied_rates(1000, installments,
+        numbers_of_installments)
+    np.testing.assert_allclose(implied, rates, atol = 1e-10)
+    with self.assertRaises(ValueError):
+      FixedInstallmentLoanCalculator.static_compute_implied_rates(1000, 0, 12)
+
+  def test_aggregation_from_csv_matches_schedules_for_any_chunk_size(self):
+    import os
+    import tempfile
+    generator = np.random.default_rng(5)
+    principals = np.round(generator.uniform(1e3, 1e5, 250), 2)
+    rates = np.round(generator.uniform(6, 24, 250), 3)
+    numbers_of_installments = generator.integers(1, 61, 250)
+    calculator = FixedInstallmentLoanCalculator()
+    schedules = calculator.compute_schedules(principals, RateArray(rates, 'year', asPercentage = True),
+        numbers_of_installments)
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, 'loans.csv')
+      with open(path, 'w') as file:
+        file.write('id;number_of_installments;principal;rate\n')
+        for row in zip(range(250), numbers_of_installments, principals, rates):
+          file.write(';'.join(str(item) for item in row) + '\n')
+      for chunk_size in [1, 37, 250, 2000]:
+        totals = calculator.aggregate_cash_flows_from_csv(path, chunk_size = chunk_size,
+            rate_unit = 'year', are_rates_percentages = True, separator = ';')
+        self.assertEqual(totals['number_of_rows'], 250)
+        for key in ['interest', 'amortization', 'installment', 'balance']:
+          np.testing.assert_allclose(totals[key], schedules[key].sum(axis = 0))
+        np.testing.assert_array_equal(totals['number_of_active_loans'],
+            (np.arange(1, 61)[:, None] <= numbers_of_installments).sum(axis = 1))
+      with self.assertRaises(ValueError):
+        calculator.aggregate_cash_flows_from_csv(path, principal_column = 'amount', separator = ';')
+
+class TestInternalRatesOfReturn(unittest.TestCase):
+
+  def compute_net_present_values(self, cash_flows, rates, times = None):
+    cash_flows = np.atleast_2d(np.asarray(cash_flows, dtype = float))
+    if times is None:
+      times = np.arange(cash_flows.shape[1])
+    return (cash_flows*(1 + np.asarray(rates)[:, None])**(-np.asarray(times, dtype = float))).sum(axis = 1)
+
+  def test_regular_cash_flows(self):
+    rates = FixedInstallmentLoanCalculator.static_compute_internal_rates_of_return(
+        [[-100, 30, 30, 30, 30], [-100, 0, 0, 0, 110]])
+    self.assertAlmostEqual(rates[1], 1.1**0.25 - 1, places = 12)
+    np.testing.assert_allclose(self.compute_net_present_values(
+        [[-100, 30, 30, 30, 30]], rates[:1]), 0, atol = 1e-9)
+
+  def test_long_irregular_cash_flows_with_zero_payments(self):
+    cash_flows = np.full((3, 361), 1000.0)
+    cash_flows[:, 0] = -100000
+    cash_flows[0, 100] = 0
+    cash_flows[1, 200] = -5000
+    cash_flows[2, 300:] = 0
+    rates = FixedInstallmentLoanCalculator.static_compute_internal_rates_of_return(cash_flows)
+    self.assertFalse(np.any(np.isnan(rates)))
+    self.assertAlmostEqual(rates[0], 0.0096477, places = 6)
+    np.testing.assert_allclose(self.compute_net_present_values(cash_flows, rates), 0, atol = 1e-6)
+
+  def test_given_times_and_rows_without_roots(self):
+    times = [0, 0.5, 1.7]
+    rates = FixedInstallmentLoanCalculator.static_compute_internal_rates_of_return(
+        [[-100, 50, 60], [100, 50, 60], [0, 0, 0]], times = times)
+    np.testing.assert_allclose(self.compute_net_present_values(
+        [[-100, 50, 60]], rates[:1], times), 0, atol = 1e-9)
+    self.assertTrue(np.isnan(rates[1]) and np.isnan(rates[2]))
+
+class TestSimulationOfCashFlows(unittest.TestCase):
+
+  def setUp(self):
+    generator = np.random.default_rng(3)
+    self.principals = generator.uniform(1e3, 1e5, 400)
+    self.rates = generator.uniform(0.005, 0.02, 400)
+    self.numbers_of_installments = generator.integers(12, 61, 400)
+    self.calculator = FixedInstallmentLoanCalculator()
+    self.prepayment_rates = [[0.06], [0.2]]
+    self.default_rates = [[0.02], [0.1]]
+
+  def simulate(self, **kwargs):
+    return self.calculator.simulate_cash_flows(self.principals, self.rates,
+        self.numbers_of_installments, self.prepayment_rates, self.default_rates,
+        severity = 0.4, **kwargs)
+
+  def test_without_prepayments_and_defaults_matches_schedules(self):
+    cash_flows = self.calculator.simulate_cash_flows(self.principals, self.rates,
+        self.numbers_of_installments, 0, 0)
+    schedules = self.calculator.compute_schedules(self.principals, self.rates,
+        self.numbers_of_installments)
+    for key, other_key in [('interest', 'interest'), ('scheduled_principal', 'amortization'),
+        ('balance', 'balance')]:
+      np.testing.assert_allclose(cash_flows[key][0], schedules[other_key].sum(axis = 0))
+
+  def test_expected_cash_flows_conserve_principal(self):
+    cash_flows = self.simulate()
+    self.assertEqual(cash_flows['interest'].shape, (2, 60))
+    paid_off = cash_flows['scheduled_principal'] + cash_flows['prepayment'] + cash_flows['default']
+    np.testing.assert_allclose(paid_off.sum(axis = 1), self.principals.sum())
+    np.testing.assert_allclose(cash_flows['recovery'] + cash_flows['loss'], cash_flows['default'])
+
+  def test_monte_carlo_converges_to_expected_cash_flows(self):
+    expected = self.simulate()
+    drawn = self.simulate(is_monte_carlo = True, number_of_paths = 200, seed = 1,
+        number_of_workers = 1)
+    for key in FixedInstallmentLoanCalculator.SIMULATION_KEYS:
+      np.testing.assert_allclose(drawn[key].sum(axis = 1), expected[key].sum(axis = 1), rtol = 0.02)
+
+  def test_monte_carlo_does_not_depend_on_workers(self):
+    in_process = self.simulate(is_monte_carlo = True, seed = 7, number_of_workers = 1)
+    in_pool = self.simulate(is_monte_carlo = True, seed = 7, number_of_workers = 2)
+    for key in FixedInstallmentLoanCalculator.SIMULATION_KEYS:
+      np.testing.assert_array_equal(in_process[key], in_pool[key])
+
+  def test_rates_out_of_range_are_rejected(self):
+    with self.assertRaises(ValueError):
+      self.calculator.simulate_cash_flows(self.principals, self.rates,
+          self.numbers_of_installments, 15, 0.02)
@@ -0,0 +1,207 @@
+########################################################################
+# DOCUMENTATION / README
+########################################################################
+
+# File belonging to software package "homemade_financial_instruments"
+# Implements financial instruments and solutions for pricing and hedging.
+
+# For more information on functionality, see README.md
+# For more information on bugs and planned features, see ISSUES.md
+# For more information on versioning, see RELEASES.md
+
+# Copyright (C) 2026 Eduardo Fischer
+
+# This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License version 3
+#as published by the Free Software Foundation. See LICENSE.
+# Alternatively, see https://www.gnu.org/licenses/.
+
+# This program is distributed in the hope that it will be useful,
+#but without any warranty; without even the implied warranty of
+#merchantability or fitness for a particular purpose.
+
+########################################################################
+
+
+import unittest
+
+import numpy as np
+
+from homemadefinancialinstruments.formulas import *
+from homemadefinancialinstruments.trees import *
+
+class TestCompiledExtractors(unittest.TestCase):
+
+  def test_extractor_matches_transform_without_compilation(self):
+    posargs = ({'a': 1, 'b': 2}, 'plain', {'a': 3})
+    kwargs = {'y': {'c': 4}, 'z': 5}
+    list_of_rules_and_options = [
+        ({0: ('p', 0, 'a'), 1: ('posarg', 2, 'a'), 'x': ('k', 'y', 'c')}, {}),
+        ({0: ('p', 1, None), 'w': ('kwarg', 'z', None)}, {}),
+        ({2: ('k', 'y', 'c'), 'v': ('P', 0, 'b')}, {'complete_new_posargs_with_nones': True}),
+        ({}, {})]
+    for rules, options in list_of_rules_and_options:
+      processor = DictArgumentProcessor(rules, **options)
+      self.assertEqual(processor.transform(posargs, kwargs),
+          processor.transform_without_compilation(posargs, kwargs))
+    self.assertEqual(DictArgumentProcessor(
+        {0: ('p', 1, 'a'), 'x': ('k', 'y', None)}).extractor(({}, {'a': 6}), {'y': 7}),
+        ((6,), {'x': 7}))
+
+  def test_invalid_rules_are_rejected_at_initialization(self):
+    for rules, options in [
+        ({1: ('p', 0, 'a')}, {}),
+        ({'x': ('q', 0, 'a')}, {}),
+        ({'x': ('k', 'y', None)}, {'raise_error_if_not_all_input_items_are_dicts': True}),
+        ({'x': ('k', 'y', 'a')}, {'raise_error_if_any_input_items_is_dict': True})]:
+      with self.assertRaises((ValueError, TypeError)):
+        DictArgumentProcessor(rules, **options)
+    # Keys are written with repr, never as code
+    key = "a'] + str(1/0) + ['"
+    processor = DictArgumentProcessor({'x': ('k', 'y', key)})
+    self.assertEqual(processor.transform((), {'y': {key: 8}}), ((), {'x': 8}))
+
+  def test_formulas_survive_pickling(self):
+    import pickle
+    formula_on_dicts = FormulaOnDicts({0: ('kwarg', 'very_node_dict', 'x')},
+        inner_function = abs)
+    copy = pickle.loads(pickle.dumps(formula_on_dicts))
+    self.assertEqual(copy.call(very_node_dict = {'x': -2}), 2)
+
+class TestMemoizationOfFormulas(unittest.TestCase):
+
+  def test_cache_statistics_and_evictions(self):
+    calls = []
+    def add(x, y):
+      calls.append((x, y))
+      return x + y
+    formula = Formula(add, memoize = True, cache_size = 2)
+    self.assertEqual([formula.call(1, 2), formula.call(1, 2), formula.call(3, y = 4),
+        formula.call(5, 6), formula.call(1, 2)], [3, 3, 7, 11, 3])
+    self.assertEqual(calls, [(1, 2), (3, 4), (5, 6), (1, 2)])
+    self.assertEqual(formula.get_cache_statistics(),
+        {'hits': 1, 'misses': 4, 'evictions': 2, 'uncacheable': 0, 'size': 2})
+    formula.clear_cache()
+    formula.reset_cache_statistics()
+    self.assertEqual(formula.get_cache_statistics()['size'], 0)
+
+  def test_unhashable_arguments(self):
+    import numpy as np
+    formula = Formula(lambda items, scale: sum(items)*scale, memoize = True, cache_size = None)
+    self.assertEqual(formula.call([1, 2], scale = 2), 6)
+    self.assertEqual(formula.call([1, 2], scale = 2), 6)
+    self.assertEqual(formula.call((1, 2), scale = 2), 6)
+    self.assertEqual(formula.call(np.array([1, 2]), scale = 2), 6)
+    self.assertEqual(formula.call(np.array([1.0, 2.0]), scale = 2), 6)
+    statistics = formula.get_cache_statistics()
+    self.assertEqual((statistics['hits'], statistics['misses']), (1, 4))
+    unsortable = Formula(len, memoize = True)
+    self.assertEqual(unsortable.call({1: 2, 'a': 3}), 2)
+    self.assertEqual(unsortable.get_cache_statistics()['uncacheable'], 1)
+    with self.assertRaises(ValueError):
+      Formula(len).get_cache_statistics()
+
+  def test_modeling_tree_formula_is_memoized(self):
+    from homemadefinancialinstruments.assets import EqualUpDownBinaryTreeAsset
+    formula_on_dicts = EqualUpDownBinaryTreeAsset(100.0, 2.0).compute_formula_on_dictionary_for_modeling_tree()
+    for idx in range(10):
+      for is_left in [True, False]:
+        formula_on_dicts.call(parent_dict = {'asset_value': 100.0 + 2*(idx % 3)},
+            all_other_args = {'jump_amount': 2.0, 'is_it_left_instead_of_right': is_left})
+    statistics = formula_on_dicts.inner_formula.get_cache_statistics()
+    self.assertEqual((statistics['hits'], statistics['misses']), (14, 6))
+
+class TestFormulaProfiler(unittest.TestCase):
+
+  def setUp(self):
+    self.average = FormulaOnDicts({
+        'left_value': ('kwarg', 'left_child_dict', 'x'),
+        'right_value': ('kwarg', 'right_child_dict', 'x')},
+        inner_function = lambda left_value, right_value: (left_value + right_value)/2,
+        name = 'average')
+    self.tree = FrozenPerfectBinaryTreeOfDicts.generate_perfect_binary_tree_of_empty_dicts(3)
+    for path, node in self.tree.get_lra().items():
+      node.data['x'] = float(path.count('r'))
+
+  def test_records_of_propagation_on_tree_of_dicts(self):
+    original_method = FrozenBinaryTreeOfDicts.__dict__['propagate_formula_up']
+    with FormulaProfiler() as profiler:
+      self.tree.propagate_formula_up('x', self.average, {})
+    self.assertIs(FrozenBinaryTreeOfDicts.__dict__['propagate_formula_up'], original_method)
+    self.assertFalse(profiler.is_enabled())
+    self.assertAlmostEqual(self.tree.get_root().data['x'], 1.5)
+    records = [record for record in profiler.to_dict()['records'] if record['name'] == 'average']
+    self.assertEqual(sum(record['calls'] for record in records
+        if record['category'] == 'FormulaOnDicts.call'), 7)
+    self.assertEqual([record['calls'] for record in records
+        if record['category'] == 'FrozenBinaryTreeOfDicts.propagate_formula_up'], [1])
+    for record in records:
+      if record['category'] == 'FormulaOnDicts.call':
+        self.assertAlmostEqual(record['extraction_time'] + record['inner_time'], record['total_time'])
+
+  def test_levels_on_trees(self):
+    with FormulaProfiler() as profiler:
+      self.tree.propagate_formula_up('x', self.average, {})
+      lattice = FrozenRecombiningBinaryTree(height = 2)
+      lattice.set_column('y', 2, np.arange(3.0))
+      lattice.propagate_function_up('y',
+          lambda very_level_dict, left_child_dict, right_child_dict, all_other_args: left_child_dict['y'])
+    calls_by_level = {(record['category'], record['level']): record['calls']
+        for record in profiler.to_dict()['records']}
+    self.assertEqual(calls_by_level[('FormulaOnDicts.call', 0)], 1)
+    self.assertEqual(calls_by_level[('FormulaOnDicts.call', 2)], 4)
+    self.assertEqual(calls_by_level[('FrozenRecombiningBinaryTree.propagate_function_up', 1)], 1)
+    self.assertEqual(calls_by_level[('FrozenRecombiningBinaryTree.propagate_function_up', None)], 1)
+
+  def test_formulas_built_before_enabling(self):
+    memoized_average = FormulaOnDicts(self.average.dict_processor,
+        inner_formula = Formula(lambda left_value, right_value: (left_value + right_value)/2,
+            memoize = True, name = 'memoized_average'))
+    with FormulaProfiler() as profiler:
+      self.tree.propagate_formula_up('x', memoized_average, {})
+    records = {(record['category'], record['name']): record
+        for record in profiler.to_dict()['records']}
+    self.assertEqual(records[('Formula.call', 'memoized_average')]['calls'], 7)
+
+class TestInterningOfDictArgumentProcessors(unittest.TestCase):
+
+  def setUp(self):
+    self.rules = {'x': ('kwarg', 'very_node_dict', 'x')}
+
+  def test_instances_are_shared(self):
+    first = DictArgumentProcessor.get_interned_instance(dict(self.rules))
+    self.assertIs(DictArgumentProcessor.get_interned_instance(dict(self.rules)), first)
+    self.assertIsNot(DictArgumentProcessor.get_interned_instance(dict(self.rules),
+        raise_error_if_not_all_input_items_are_dicts = True), first)
+
+  def test_formulas_built_anew_are_validated_once(self):
+    from unittest import mock
+    def build_formula():
+      # Nothing outside keeps the formula (or its processor) alive
+      return FormulaOnDicts({0: ('kwarg', 'very_node_dict', 'y')}, inner_function = abs)
+    build_formula()
+    with mock.patch.object(DictArgumentProcessor, 'is_dict_valid_for_processing',
+        wraps = DictArgumentProcessor.is_dict_valid_for_processing) as validation:
+      for idx in range(1000):
+        build_formula()
+    self.assertEqual(validation.call_count, 0)
+    self.assertEqual(build_formula().call(very_node_dict = {'y': -2}), 2)
+
+  def test_number_of_instances_is_bounded(self):
+    from unittest import mock
+    DictArgumentProcessor.clear_interned_instances()
+    first = DictArgumentProcessor.get_interned_instance(dict(self.rules))
+    with mock.patch.object(DictArgumentProcessor, 'maximum_number_of_interned_instances', 10):
+      for idx in range(100):
+        DictArgumentProcessor.get_interned_instance({'x': ('kwarg', 'very_node_dict', 'x' + str(idx))})
+        # Used recently, so never evicted
+        self.assertIs(DictArgumentProcessor.get_interned_instance(dict(self.rules)), first)
+      self.assertEqual(len(DictArgumentProcessor.interned_instances), 10)
+
+  def test_clear_interned_instances(self):
+    first = DictArgumentProcessor.get_interned_instance(dict(self.rules))
+    DictArgumentProcessor.clear_interned_instances()
+    self.assertEqual(len(DictArgumentProcessor.interned_instances), 0)
+    second = DictArgumentProcessor.get_interned_instance(dict(self.rules))
+    self.assertIsNot(second, first)
+    self.assertEqual(second.extractor_source, first.extractor_source)
@@ -0,0 +1,103 @@
+########################################################################
+# DOCUMENTATION / README
+########################################################################
+
+# File belonging to software package "homemade_financial_instruments"
+# Implements financial instruments and solutions for pricing and hedging.
+
+# For more information on functionality, see README.md
+# For more information on bugs and planned features, see ISSUES.md
+# For more information on versioning, see RELEASES.md
+
+# Copyright (C) 2026 Eduardo Fischer
+
+# This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License version 3
+#as published by the Free Software Foundation. See LICENSE.
+# Alternatively, see https://www.gnu.org/licenses/.
+
+# This program is distributed in the hope that it will be useful,
+#but without any warranty; without even the implied warranty of
+#merchantability or fitness for a particular purpose.
+
+########################################################################
+
+
+import unittest
+
+from homemadefinancialinstruments.assets import *
+from homemadefinancialinstruments.portfolios import *
+from homemadefinancialinstruments.worlds import *
+
+class TestPortfolioValuation(unittest.TestCase):
+
+  def setUp(self):
+    self.world = FixedInterestRateWorld(0.04)
+    schedule = DividendSchedule([0.35, 0.85], [1.5, 2.0])
+    self.underlyings = [
+        EqualUpDownBinaryTreeAsset(100.0, 3.0),
+        EqualUpDownBinaryTreeAsset(100.0, 3.0, dividend_schedule = schedule),
+        ExponentialUpDownBinaryTreeAsset(100.0, 0.3, dividend_schedule = schedule)]
+
+  def produce_options(self, underlying):
+    return [
+        VanillaEuropeanCallOption(underlying, 0.5, 100.0),
+        VanillaAmericanPutOption(underlying, 1.0, 105.0),
+        VanillaEuropeanPutOption(underlying, 0.25, 95.0),
+        VanillaAmericanCallOption(underlying, 1.0, 98.0)]
+
+  def test_single_option_steps_default_to_unit_of_time(self):
+    from math import exp
+    underlying = EqualUpDownBinaryTreeAsset(100.0, 10.0)
+    option = VanillaEuropeanCallOption(underlying, 1, 100.0)
+    probability = (100.0*exp(0.04) - 100.0 + 10.0)/20.0
+    self.assertAlmostEqual(option.compute_present_value_in_risk_neutral_world(self.world),
+        exp(-0.04)*probability*10.0)
+    option = VanillaAmericanPutOption(underlying, 3, 100.0)
+    self.assertEqual(option.compute_present_value_in_risk_neutral_world(self.world),
+        option.compute_present_value_in_risk_neutral_world(self.world, 1))
+
+  def test_values_match_single_option_prices_across_expiries(self):
+    for underlying in self.underlyings:
+      options = self.produce_options(underlying)
+      quantities = [2, -1, 3, 0.5]
+      portfolio = Portfolio([(option, quantity) for option, quantity in zip(options, quantities)]
+          + [(underlying, 4)])
+      self.assertEqual(len(portfolio.group_positions_for_valuation(self.world, 0.05)), 2)
+      values, total = portfolio.compute_values(self.world, 0.05)
+      for option, quantity, value in zip(options, quantities, values):
+        self.assertAlmostEqual(value, quantity*option.compute_present_value_in_risk_neutral_world(
+            self.world, 0.05), places = 10)
+      self.assertEqual(values[-1], 400.0)
+      self.assertAlmostEqual(total, sum(values))
+
+  def test_positions_with_own_world_and_step_length_are_grouped_apart(self):
+    options = self.produce_options(self.underlyings[0])
+    other_world = FixedInterestRateWorld(0.06)
+    portfolio = Portfolio([(options[0], 1), (options[1], 1, other_world), (options[2], 1, None, 0.125)])
+    groups = portfolio.group_positions_for_valuation(self.world, 0.05)
+    self.assertEqual(sorted(groups.values()), [[0], [1], [2]])
+    values, total = portfolio.compute_values(self.world, 0.05)
+    self.assertAlmostEqual(values[1], options[1].compute_present_value_in_risk_neutral_world(
+        other_world, 0.05), places = 10)
+    self.assertAlmostEqual(values[2], options[2].compute_present_value_in_risk_neutral_world(
+        self.world, 0.125), places = 10)
+    with self.assertRaises(ValueError):
+      Portfolio([(options[0], 1)]).compute_values()
+
+  def test_lattice_is_built_once_per_group(self):
+    underlying = self.underlyings[0]
+    number_of_builds = [0]
+    original_method = underlying.build_risk_neutral_lattice
+    def build_risk_neutral_lattice(*posargs, **kwargs):
+      number_of_builds[0] += 1
+      return original_method(*posargs, **kwargs)
+    underlying.build_risk_neutral_lattice = build_risk_neutral_lattice
+    options = [VanillaAmericanPutOption(underlying, 0.05*(1 + idx % 20), 90.0 + idx % 30)
+        for idx in range(300)]
+    values, total = Portfolio([(option, 1) for option in options]).compute_values(self.world, 0.05)
+    self.assertEqual(number_of_builds[0], 1)
+    del underlying.build_risk_neutral_lattice
+    for idx in [0, 17, 299]:
+      self.assertAlmostEqual(values[idx], options[idx].compute_present_value_in_risk_neutral_world(
+          self.world, 0.05), places = 10)
@@ -23,3 +23,86 @@
 ########################################################################
 
 
+
+import unittest
+
+from homemadefinancialinstruments.utilities import *
+
+class TestCharacterCanvas(unittest.TestCase):
+
+  def test_blit_with_clipping(self):
+    canvas = CharacterCanvas(height = 3, width = 5, fill_character = '.')
+    canvas.blit(['ab', 'cd'], 0, 0)
+    canvas.blit('xyz', 2, 3)
+    canvas.blit(StringBox(list_of_lines = ['12', '34']), -1, -1)
+    self.assertEqual(canvas.as_list_of_lines(), ['4b...', 'cd...', '...xy'])
+    canvas.fill_rectangle(1, 2, 5, 1, '|')
+    self.assertEqual(canvas.as_single_string(), '4b...\ncd|..\n..|xy')
+
+  def test_blit_many_matches_blit(self):
+    boxes = [['a' + str(idx), str(idx) + 'b'] for idx in range(10)]
+    rows, columns = [idx % 3 for idx in range(10)], [2*idx - 1 for idx in range(10)]
+    in_bulk = CharacterCanvas(height = 4, width = 16)
+    in_bulk.blit_many(boxes, rows, columns)
+    one_by_one = CharacterCanvas(height = 4, width = 16)
+    for box, row, column in zip(boxes, rows, columns):
+      one_by_one.blit(box, row, column)
+    self.assertEqual(in_bulk.as_list_of_lines(), one_by_one.as_list_of_lines())
+    segments = CharacterCanvas(height = 2, width = 6)
+    segments.fill_horizontal_segments([0, 1], [-2, 3], [1, 9], '-')
+    self.assertEqual(segments.as_list_of_lines(), ['--    ', '   ---'])
+
+  def test_stacks_and_round_trips(self):
+    stacked = CharacterCanvas.hstack([['a', 'b', 'c'], 'de'], horizontal_space = 1,
+        align_to_bottom_instead_of_top = True)
+    self.assertEqual(stacked.as_list_of_lines(), ['a   ', 'b   ', 'c de'])
+    piled = CharacterCanvas.vstack([stacked, 'x'], vertical_space = 1, align_to_center_instead_of_left = True)
+    self.assertEqual(piled.as_list_of_lines(), ['a   ', 'b   ', 'c de', '    ', ' x  '])
+    self.assertEqual(piled.crop(2, 2, 2, 4).as_list_of_lines(), ['de  ', '    '])
+    string_box = piled.as_string_box()
+    self.assertIsInstance(string_box, StringBox)
+    self.assertEqual(CharacterCanvas.from_string_box(string_box).as_list_of_lines(), piled.as_list_of_lines())
+    self.assertEqual(CharacterCanvas.from_list_of_lines(['é', 'ü漢']).as_list_of_lines(), ['é ', 'ü漢'])
+    self.assertEqual(CharacterCanvas.hstack([]).as_list_of_lines(), [])
+
+class TestStringBoxFromListOfDicts(unittest.TestCase):
+
+  def setUp(self):
+    self.list_of_dicts = [
+        {'name': 'node' + str(idx), 'value': idx/7, 'count': idx, 'flag': idx % 2 == 0}
+        for idx in range(200)]
+
+  def assert_same_as_from_dict(self, **kwargs):
+    in_bulk = StringBox.from_list_of_dicts(self.list_of_dicts, **kwargs)
+    one_by_one = [StringBox.from_dict(dictionary, **kwargs) for dictionary in self.list_of_dicts]
+    self.assertEqual(len(in_bulk), len(one_by_one))
+    for string_box, other_string_box in zip(in_bulk, one_by_one):
+      self.assertEqual(string_box.as_list_of_lines(), other_string_box.as_list_of_lines())
+
+  def test_default_arguments(self):
+    self.assert_same_as_from_dict()
+
+  def test_rounding(self):
+    self.assert_same_as_from_dict(max_precision_for_floats = 3)
+
+  def test_keys_labels_and_values_only(self):
+    self.assert_same_as_from_dict(keys_to_print = ['value', 'name'])
+    self.assert_same_as_from_dict(keys_to_print = {'value': 'v', 'count': 'c'})
+    self.assert_same_as_from_dict(keys_to_print = ['name', 'count'], print_values_only = True)
+
+  def test_width_height_and_centering(self):
+    self.assert_same_as_from_dict(force_width_to = 12, force_height_to = 2)
+    self.assert_same_as_from_dict(force_width_to = 20, align_to_center_instead_of_left = True)
+
+  def test_mixed_column_and_format_spec(self):
+    string_boxes = StringBox.from_list_of_dicts(
+        [{'a': 'text', 'b': 1/3}, {'a': 2.12345, 'b': 2}],
+        max_precision_for_floats = 2, format_spec = {'b': '.3f'})
+    self.assertEqual(string_boxes[0].as_list_of_lines(), ['a: text ', 'b: 0.330'])
+    self.assertEqual(string_boxes[1].as_list_of_lines(), ['a: 2.12 ', 'b: 2.000'])
+
+  def test_errors(self):
+    with self.assertRaises(KeyError):
+      StringBox.from_list_of_dicts([{'a': 1}, {'b': 2}])
+    with self.assertRaises(ValueError):
+      StringBox.from_list_of_dicts([{'a': 'two\nlines'}])
@@ -0,0 +1,203 @@
+########################################################################
+# DOCUMENTATION / README
+########################################################################
+
+# File belonging to software package "homemade_financial_instruments"
+# Implements financial instruments and solutions for pricing and hedging.
+
+# For more information on functionality, see README.md
+# For more information on bugs and planned features, see ISSUES.md
+# For more information on versioning, see RELEASES.md
+
+# Copyright (C) 2026 Eduardo Fischer
+
+# This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License version 3
+#as published by the Free Software Foundation. See LICENSE.
+# Alternatively, see https://www.gnu.org/licenses/.
+
+# This program is distributed in the hope that it will be useful,
+#but without any warranty; without even the implied warranty of
+#merchantability or fitness for a particular purpose.
+
+########################################################################
+
+
+import unittest
+
+import numpy as np
+
+from homemadefinancialinstruments.time import *
+
+class TestTimeUnitsContext(unittest.TestCase):
+
+  def test_conversion_through_other_units(self):
+    context = TimeUnitsContext({"year": {"day": 252}, "week": {"day": 5}})
+    self.assertAlmostEqual(context.directTransform(1, "year", "week"), 50.4)
+    self.assertAlmostEqual(context.directTransform(10, "week", "year"), 10*5/252)
+    matrix = context.conversionMatrix
+    np.testing.assert_allclose(matrix * matrix.T, np.ones_like(matrix))
+    with self.assertRaises(ValueError):
+      TimeUnitsContext({"year": {"day": 252, "month": 12}, "month": {"day": 22}})
+
+  def test_unrelated_units_and_standards(self):
+    context = TimeUnitsContext({"year": {"month": 12}, "hour": {"minute": 60}})
+    self.assertTrue(np.isnan(context.directTransform(1, "year", "hour")))
+    self.assertEqual(TimeUnitsContext("30/360 us").directTransform(1, "year", "day"), 360)
+    with self.assertRaises(ValueError):
+      TimeUnitsContext("act/365")
+
+  def test_many_values_match_one_by_one(self):
+    context = TimeUnitsContext()
+    values = np.array([0.01, 0.1, 0.5, 0.0])
+    unitsFrom = np.array(["monthly", "annual", "daily", "annual"])
+    unitsTo = np.array(["annual", "daily", "monthly", "monthly"])
+    for compositeNotSimple in [True, False]:
+      expected = [context.inverseTransform(value, unitFrom, unitTo, compositeNotSimple)
+          for value, unitFrom, unitTo in zip(values, unitsFrom, unitsTo)]
+      np.testing.assert_allclose(
+          context.inverseTransformMany(values, unitsFrom, unitsTo, compositeNotSimple), expected)
+    self.assertAlmostEqual(context.inverseTransform(0.01, "monthly", "annual", True), 1.01**12 - 1)
+    np.testing.assert_allclose(context.directTransformMany([1, 2], "year", context.getUnitIds(["month", "day"])),
+        [12, 504])
+
+class TestRateArray(unittest.TestCase):
+
+  def test_conversions_match_single_rates(self):
+    rates = [CompositeRate(1, "monthly", asPercentage = True), SimpleRate(0.12, "annual"),
+        CompositeRate(0.15, "annual"), SimpleRate(0.0004, "daily")]
+    newUnits = ["annual", "monthly", "daily", "annual"]
+    converted = RateArray.fromListOfRates(rates).convertToUnits(newUnits)
+    expected = [rate.convertToUnit(unit) for rate, unit in zip(rates, newUnits)]
+    np.testing.assert_allclose(converted.getNumbers(), [rate.number for rate in expected])
+    np.testing.assert_array_equal(converted.getUnits(), newUnits)
+    self.assertEqual([type(rate) for rate in converted.toListOfRates()], [type(rate) for rate in expected])
+    self.assertAlmostEqual(converted.getNumbers()[0], 1.01**12 - 1)
+    self.assertAlmostEqual(converted.getNumbers()[1], 0.01)
+
+  def test_percentages_and_continuous_numbers(self):
+    rates = RateArray([10, 0.5], "annual", asPercentage = [True, False])
+    np.testing.assert_allclose(rates.getNumbers(asPercentage = True), [10, 50])
+    np.testing.assert_allclose(rates.getContinuousNumbers(), np.log([1.1, 1.5]))
+    roundTrip = RateArray.fromContinuousNumbers(rates.getContinuousNumbers(), "annual")
+    np.testing.assert_allclose(roundTrip.getNumbers(), rates.getNumbers())
+    # Continuous rates scale with time, whatever the unit
+    np.testing.assert_allclose(rates.convertToUnits("daily").getContinuousNumbers() * 252,
+        rates.getContinuousNumbers())
+
+class TestBusinessDayCalendar(unittest.TestCase):
+
+  def setUp(self):
+    self.holidays = ['2026-10-12', '2026-11-02', '2026-11-15', '2026-11-20']
+    self.calendar = BusinessDayCalendar(self.holidays, startDate = '2026-01-01',
+        endDate = '2027-12-31')
+
+  def test_counts_match_numpy_in_both_directions(self):
+    generator = np.random.default_rng(0)
+    dates = np.datetime64('2026-09-01') + generator.integers(0, 120, (2, 3000))
+    np.testing.assert_array_equal(self.calendar.countBusinessDays(dates[0], dates[1]),
+        np.busday_count(dates[0], dates[1], holidays = self.holidays))
+    # From Friday back to Monday of a week with a holiday on Monday
+    self.assertEqual(self.calendar.countBusinessDays('2026-11-06', '2026-11-02'),
+        np.busday_count('2026-11-06', '2026-11-02', holidays = self.holidays))
+    self.assertEqual(self.calendar.countBusinessDays('2026-10-19', '2026-10-19'), 0)
+
+  def test_year_fractions_and_range(self):
+    self.assertAlmostEqual(self.calendar.computeYearFractions('2026-10-19', '2026-10-26'), 5/252)
+    self.assertEqual(self.calendar.countBusinessDays('2027-12-31', '2028-01-01'), 1)
+    with self.assertRaises(ValueError):
+      self.calendar.countBusinessDays('2025-12-31', '2026-01-05')
+    with self.assertRaises(ValueError):
+      self.calendar.countBusinessDays('2028-01-01', '2027-12-30')
+
+  def test_holidays_from_file(self):
+    import os
+    import tempfile
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, 'holidays.csv')
+      with open(path, 'w') as file:
+        file.write('date;name\n# Comment\n12/10/2026;Children\n\n02/11/2026;All souls\n')
+      calendar = BusinessDayCalendar.fromHolidaysFile(path, dateFormat = '%d/%m/%Y',
+          numberOfHeaderLines = 1, separator = ';')
+    np.testing.assert_array_equal(calendar.isBusinessDay(['2026-10-12', '2026-10-13', '2026-11-02']),
+        [False, True, False])
+
+class TestDayCountConvention(unittest.TestCase):
+
+  def test_thirty_three_sixty_us_end_of_february(self):
+    convention = DayCountConvention("30/360 US")
+    startDates = ['2024-02-29', '2023-02-28', '2024-02-28', '2026-01-31', '2026-03-31', '2026-03-30', '2026-03-29']
+    endDates = ['2024-03-31', '2024-02-29', '2024-03-31', '2026-02-28', '2026-04-30', '2026-05-31', '2026-05-31']
+    np.testing.assert_allclose(convention.computeYearFractions(startDates, endDates),
+        np.array([30, 360, 33, 28, 30, 60, 62]) / 360)
+
+  def test_actual_and_business_conventions(self):
+    startDates = np.array(['2026-01-01', '2026-10-19'], dtype = 'datetime64[D]')
+    endDates = np.array(['2027-01-01', '2026-10-26'], dtype = 'datetime64[D]')
+    np.testing.assert_allclose(DayCountConvention("ACT/365").computeYearFractions(startDates, endDates),
+        [1, 7/365])
+    np.testing.assert_allclose(DayCountConvention("act/360").computeYearFractions(startDates, endDates),
+        [365/360, 7/360])
+    calendar = BusinessDayCalendar(['2026-01-01'], startDate = '2026-01-01', endDate = '2027-12-31')
+    np.testing.assert_allclose(DayCountConvention("bus/252", calendar).computeYearFractions(startDates, endDates),
+        np.busday_count(startDates, endDates, holidays = ['2026-01-01']) / 252)
+
+  def test_invalid_conventions(self):
+    with self.assertRaises(ValueError):
+      DayCountConvention("act/act")
+    with self.assertRaises(ValueError):
+      DayCountConvention("bus/252")
+
+class TestTimeSchedule(unittest.TestCase):
+
+  def assertBoundaries(self, schedule, dates):
+    dates = np.array(dates, dtype = 'datetime64[D]')
+    np.testing.assert_array_equal(schedule.startDates, dates[:-1])
+    np.testing.assert_array_equal(schedule.endDates, dates[1:])
+
+  def test_stubs(self):
+    self.assertBoundaries(TimeSchedule.generate('2026-01-15', '2027-01-31', 6),
+        ['2026-01-15', '2026-01-31', '2026-07-31', '2027-01-31'])
+    self.assertBoundaries(TimeSchedule.generate('2026-01-15', '2027-01-31', 6, longStubNotShort = True),
+        ['2026-01-15', '2026-07-31', '2027-01-31'])
+    self.assertBoundaries(TimeSchedule.generate('2026-01-15', '2027-01-31', 6, stubAtStartNotEnd = False),
+        ['2026-01-15', '2026-07-15', '2027-01-15', '2027-01-31'])
+    self.assertBoundaries(TimeSchedule.generate('2026-01-15', '2027-01-31', 6, stubAtStartNotEnd = False,
+        longStubNotShort = True), ['2026-01-15', '2026-07-15', '2027-01-31'])
+    # Without stub, a long stub changes nothing
+    self.assertBoundaries(TimeSchedule.generate('2026-01-15', '2027-01-15', 6, longStubNotShort = True),
+        ['2026-01-15', '2026-07-15', '2027-01-15'])
+
+  def test_rolls_and_end_of_month(self):
+    schedule = TimeSchedule.generate('2026-02-28', '2026-06-30', 1, stubAtStartNotEnd = False)
+    self.assertBoundaries(schedule, ['2026-02-28', '2026-03-28', '2026-04-28', '2026-05-28', '2026-06-28', '2026-06-30'])
+    schedule = TimeSchedule.generate('2026-02-28', '2026-06-30', 1, stubAtStartNotEnd = False, endOfMonth = True)
+    self.assertBoundaries(schedule, ['2026-02-28', '2026-03-31', '2026-04-30', '2026-05-31', '2026-06-30'])
+    # Rolling on day 31 falls back to the last day of shorter months
+    schedule = TimeSchedule.generate('2026-01-31', '2026-05-31', 1, stubAtStartNotEnd = False)
+    self.assertBoundaries(schedule, ['2026-01-31', '2026-02-28', '2026-03-31', '2026-04-30', '2026-05-31'])
+    np.testing.assert_allclose(schedule.accrualFractions, [28/365, 31/365, 30/365, 31/365])
+
+  def test_business_days_and_payment_lag(self):
+    calendar = BusinessDayCalendar(['2026-11-02'], startDate = '2026-01-01', endDate = '2027-12-31')
+    schedule = TimeSchedule.generate('2026-04-30', '2026-10-30', 1, calendar = calendar,
+        paymentLagInBusinessDays = 2)
+    # May 30th is a Saturday, and the following business day is in June
+    self.assertEqual(schedule.endDates[0], np.datetime64('2026-05-29'))
+    self.assertEqual(schedule.paymentDates[-1], np.datetime64('2026-11-04'))
+    schedule = TimeSchedule.generate('2026-04-30', '2026-10-30', 1, calendar = calendar,
+        businessDayRule = "following")
+    self.assertEqual(schedule.endDates[0], np.datetime64('2026-06-01'))
+    np.testing.assert_array_equal(schedule.paymentDates, schedule.endDates)
+    with self.assertRaises(ValueError):
+      TimeSchedule.generate('2026-04-30', '2026-10-30', 1, businessDayRule = "nearest")
+
+  def test_slicing_shares_arrays(self):
+    schedule = TimeSchedule.generate('2026-01-15', '2028-01-15', 3)
+    tail = schedule[2:]
+    self.assertEqual(len(tail), len(schedule) - 2)
+    self.assertTrue(np.shares_memory(tail.startDates, schedule.startDates))
+    self.assertTrue(np.shares_memory(tail.accrualFractions, schedule.accrualFractions))
+    self.assertEqual(list(tail)[0][0], schedule.startDates[2])
+    with self.assertRaises(TypeError):
+      schedule[0]
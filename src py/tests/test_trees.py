@@ -23,3 +23,378 @@
 ########################################################################
 
 
+
+import unittest
+
+from homemadefinancialinstruments.formulas import *
+from homemadefinancialinstruments.trees import *
+
+def move_asset(parent_value, is_it_left_instead_of_right, up_factor):
+  return parent_value/up_factor if is_it_left_instead_of_right else parent_value*up_factor
+
+def call_payoff(asset_value, strike):
+  import numpy as np
+  return np.maximum(asset_value - strike, 0.0)
+
+def discount_expectation(left_value, right_value, probability, discount_factor):
+  return discount_factor*(probability*right_value + (1 - probability)*left_value)
+
+class TestPropagationOfFormulas(unittest.TestCase):
+
+  def setUp(self):
+    self.move = FormulaOnDicts({
+        'parent_value': ('kwarg', 'parent_dict', 'asset_value'),
+        'is_it_left_instead_of_right': ('kwarg', 'all_other_args', 'is_it_left_instead_of_right'),
+        'up_factor': ('kwarg', 'all_other_args', 'up_factor')},
+        inner_function = move_asset)
+    self.payoff = FormulaOnDicts({
+        'asset_value': ('kwarg', 'very_node_dict', 'asset_value'),
+        'strike': ('kwarg', 'all_other_args', 'strike')},
+        inner_function = call_payoff)
+    self.discount = FormulaOnDicts({
+        'left_value': ('kwarg', 'left_child_dict', 'option_value'),
+        'right_value': ('kwarg', 'right_child_dict', 'option_value'),
+        'probability': ('kwarg', 'all_other_args', 'probability'),
+        'discount_factor': ('kwarg', 'all_other_args', 'discount_factor')},
+        inner_function = discount_expectation)
+    self.args = {'up_factor': 1.1, 'strike': 100.0, 'probability': 0.55, 'discount_factor': 0.99}
+
+  def test_option_price_matches_recombining_tree(self):
+    import numpy as np
+    from math import comb
+    tree = FrozenPerfectBinaryTreeOfDicts.generate_perfect_binary_tree_of_empty_dicts(5)
+    tree.get_root().data['asset_value'] = 100.0
+    tree.propagate_formula_down('asset_value', self.move, self.args)
+    for path, node in tree.get_lra().items():
+      self.assertAlmostEqual(node.data['asset_value'],
+          100.0*1.1**(path.count('r') - path.count('l')), places = 9)
+    tree.compute_formula_at_nodes('option_value', self.payoff, self.args,
+        restrict_computation_to_leaves = True)
+    tree.propagate_formula_up('option_value', self.discount, self.args)
+    expected = 0.99**5*sum(comb(5, idx)*0.55**idx*0.45**(5 - idx)
+        *max(100.0*1.1**(2*idx - 5) - 100.0, 0.0) for idx in range(6))
+    self.assertAlmostEqual(tree.get_root().data['option_value'], expected, places = 9)
+    recombining_tree = FrozenRecombiningBinaryTree(5)
+    recombining_tree.set_column('asset_value', 0, np.array([100.0]))
+    recombining_tree.propagate_formula_down('asset_value', self.move, self.args)
+    recombining_tree.compute_formula_at_nodes('option_value', self.payoff, self.args,
+        restrict_computation_to_leaves = True)
+    recombining_tree.propagate_formula_up('option_value', self.discount, self.args)
+    self.assertAlmostEqual(recombining_tree.get_column('option_value', 0)[0], expected, places = 9)
+
+  def test_left_and_right_info_cannot_be_given_early(self):
+    tree = FrozenPerfectBinaryTreeOfDicts.generate_perfect_binary_tree_of_empty_dicts(1)
+    with self.assertRaises(ValueError):
+      tree.propagate_formula_down('asset_value', self.move, {'is_it_left_instead_of_right': True})
+
+class TestComputationOfManyFormulas(unittest.TestCase):
+
+  def setUp(self):
+    self.tree = FrozenPerfectBinaryTreeOfDicts.generate_perfect_binary_tree_of_empty_dicts(3)
+    for path, node in self.tree.get_lra().items():
+      node.data['x'] = float(len(path) + path.count('r'))
+    # Listed before the formula whose output it reads
+    self.output_keys_and_formulas = [
+        ('z', FormulaOnDicts({'y': ('kwarg', 'very_node_dict', 'y'),
+            'scale': ('kwarg', 'all_other_args', 'scale')},
+            inner_function = lambda y, scale: scale*y)),
+        ('y', FormulaOnDicts({'x': ('kwarg', 'very_node_dict', 'x')},
+            inner_function = lambda x: x + 1))]
+
+  def test_formulas_are_ordered_by_dependencies(self):
+    self.tree.compute_formulas_at_nodes(self.output_keys_and_formulas, {'scale': 2})
+    for node in self.tree.get_list_of_nodes():
+      self.assertEqual(node.data['y'], node.data['x'] + 1)
+      self.assertEqual(node.data['z'], 2*(node.data['x'] + 1))
+
+  def test_same_results_as_one_formula_at_a_time(self):
+    other_tree = FrozenPerfectBinaryTreeOfDicts.generate_perfect_binary_tree_of_empty_dicts(3)
+    for path, node in other_tree.get_lra().items():
+      node.data['x'] = float(len(path) + path.count('r'))
+    for output_key, formula_on_dicts in reversed(self.output_keys_and_formulas):
+      other_tree.compute_formula_at_nodes(output_key, formula_on_dicts, {'scale': 3},
+          restrict_computation_to_leaves = True)
+    self.tree.compute_formulas_at_nodes(self.output_keys_and_formulas, {'scale': 3},
+        restrict_computation_to_leaves = True)
+    for path, node in self.tree.get_lra().items():
+      self.assertEqual(node.data, other_tree.get_lra()[path].data)
+      self.assertEqual('z' in node.data, len(path) == 3)
+
+  def test_invalid_formulas_and_restrictions(self):
+    circular = [
+        ('a', FormulaOnDicts({'b': ('kwarg', 'very_node_dict', 'b')}, inner_function = abs)),
+        ('b', FormulaOnDicts({'a': ('kwarg', 'very_node_dict', 'a')}, inner_function = abs))]
+    with self.assertRaises(ValueError):
+      self.tree.compute_formulas_at_nodes(circular, {})
+    with self.assertRaises(ValueError):
+      self.tree.compute_formulas_at_nodes(self.output_keys_and_formulas + [
+          ('y', self.output_keys_and_formulas[1][1])], {'scale': 1})
+    with self.assertRaises(ValueError):
+      self.tree.compute_formulas_at_nodes(self.output_keys_and_formulas, {'scale': 1},
+          restrict_computation_to_root = True, restrict_computation_to_leaves = True)
+
+class TestComputationOfFormulaGraphs(unittest.TestCase):
+
+  def setUp(self):
+    self.calls = {'discount_factor': 0, 'value': 0}
+
+  def produce_formula_graph(self, level_rule):
+    def compute_discount_factor(rate, level):
+      self.calls['discount_factor'] += 1
+      return 1/(1 + rate)**level
+    def compute_value(x, discount_factor):
+      self.calls['value'] += 1
+      return discount_factor*x
+    discount_factor_rules = {'rate': ('kwarg', 'all_other_args', 'rate'), 'level': level_rule}
+    formula_graph = FormulaGraph()
+    formula_graph.add_formula('discount_factor',
+        FormulaOnDicts(discount_factor_rules, inner_function = compute_discount_factor),
+        is_output = False)
+    # Same computation under another name, deduplicated
+    self.assertEqual(formula_graph.add_formula('same_discount_factor',
+        FormulaOnDicts(dict(discount_factor_rules), inner_function = compute_discount_factor)),
+        'discount_factor')
+    formula_graph.add_formula('value', FormulaOnDicts({
+        'x': ('kwarg', 'very_node_dict', 'x'),
+        'discount_factor': ('kwarg', 'very_node_dict', 'same_discount_factor')},
+        inner_function = compute_value))
+    return formula_graph
+
+  def test_duplicates_are_computed_once_at_nodes(self):
+    tree = FrozenPerfectBinaryTreeOfDicts.generate_perfect_binary_tree_of_empty_dicts(3)
+    for path, node in tree.get_lra().items():
+      node.data['x'] = float(path.count('r'))
+      node.data['level'] = len(path)
+    # Level read from the node, so computed once per node
+    formula_graph = self.produce_formula_graph(('kwarg', 'very_node_dict', 'level'))
+    tree.compute_formula_graph_at_nodes(formula_graph, {'rate': 0.1})
+    self.assertEqual(self.calls, {'discount_factor': 15, 'value': 15})
+    for path, node in tree.get_lra().items():
+      self.assertAlmostEqual(node.data['value'], path.count('r')/1.1**len(path))
+      self.assertAlmostEqual(node.data['same_discount_factor'], 1/1.1**len(path))
+      self.assertNotIn('discount_factor', node.data)
+
+  def test_level_invariant_formulas_are_computed_once_per_level(self):
+    import numpy as np
+    formula_graph = self.produce_formula_graph(('kwarg', 'all_other_args', 'level'))
+    tree = FrozenRecombiningBinaryTree(3)
+    for level in range(4):
+      tree.set_column('x', level, np.arange(level + 1.0))
+    tree.compute_formula_graph_at_nodes(formula_graph, {'rate': 0.1})
+    self.assertEqual(self.calls, {'discount_factor': 4, 'value': 4})
+    for level in range(4):
+      np.testing.assert_allclose(tree.get_column('value', level), np.arange(level + 1.0)/1.1**level)
+      np.testing.assert_allclose(tree.get_column('same_discount_factor', level),
+          np.full(level + 1, 1/1.1**level))
+    tree_of_dicts = FrozenPerfectBinaryTreeOfDicts.generate_perfect_binary_tree_of_empty_dicts(3)
+    for node in tree_of_dicts.get_list_of_nodes():
+      node.data['x'] = 1.0
+    self.calls['discount_factor'] = 0
+    tree_of_dicts.compute_formula_graph_at_nodes(self.produce_formula_graph(
+        ('kwarg', 'all_other_args', 'number_of_steps')), {'rate': 0.1, 'number_of_steps': 2})
+    self.assertEqual(self.calls['discount_factor'], 4)
+    for node in tree_of_dicts.get_list_of_nodes():
+      self.assertAlmostEqual(node.data['value'], 1/1.21)
+
+  def test_explain_shows_deduplication(self):
+    lines = self.produce_formula_graph(('kwarg', 'all_other_args', 'level')).explain(
+        output_as = 'list_of_lines')
+    self.assertEqual(lines[0], 'FormulaGraph with 3 formulas, 2 evaluated, 1 deduplicated')
+    self.assertEqual(lines[1], '1. discount_factor (intermediate, once per level)')
+    self.assertIn('   also serves (deduplicated): same_discount_factor', lines)
+    self.assertIn('2. value (output, once per node)', lines)
+
+def add_one(value):
+  return value + 1
+
+def average_of_children(left_value, right_value):
+  return (left_value + right_value)/2
+
+class TestFormulasInParallel(unittest.TestCase):
+
+  def setUp(self):
+    self.add_one = FormulaOnDicts({'value': ('kwarg', 'very_node_dict', 'x')},
+        inner_function = add_one)
+    self.average = FormulaOnDicts({
+        'left_value': ('kwarg', 'left_child_dict', 'x'),
+        'right_value': ('kwarg', 'right_child_dict', 'x')},
+        inner_function = average_of_children)
+
+  def produce_tree_of_dicts(self):
+    tree = FrozenPerfectBinaryTreeOfDicts.generate_perfect_binary_tree_of_empty_dicts(4)
+    for path, node in tree.get_lra().items():
+      node.data['x'] = len(path) + path.count('r')
+    return tree
+
+  def produce_recombining_tree(self, height = 6):
+    import numpy as np
+    tree = FrozenRecombiningBinaryTree(height)
+    tree.set_column('x', height, np.arange(height + 1.0)**2)
+    return tree
+
+  def test_single_chunk_is_computed_without_workers(self):
+    # A formula with a lambda cannot be sent to workers
+    unpicklable = FormulaOnDicts({'value': ('kwarg', 'very_node_dict', 'x')},
+        inner_function = lambda value: value + 1)
+    tree = self.produce_tree_of_dicts()
+    tree.compute_formula_at_nodes_in_parallel('y', unpicklable, {})
+    for node in tree.get_list_of_nodes():
+      self.assertEqual(node.data['y'], node.data['x'] + 1)
+    recombining_tree = self.produce_recombining_tree()
+    unpicklable_average = FormulaOnDicts({
+        'left_value': ('kwarg', 'left_child_dict', 'x'),
+        'right_value': ('kwarg', 'right_child_dict', 'x')},
+        inner_function = lambda left_value, right_value: (left_value + right_value)/2)
+    recombining_tree.propagate_formula_up_in_parallel('x', unpicklable_average, {})
+    self.assertAlmostEqual(recombining_tree.get_column('x', 0)[0], 0.5**6*sum(
+        [1, 6, 15, 20, 15, 6, 1][idx]*idx**2 for idx in range(7)))
+
+  def test_many_chunks_match_serial_computation(self):
+    import numpy as np
+    tree = self.produce_tree_of_dicts()
+    tree.compute_formula_at_nodes_in_parallel('y', self.add_one, {},
+        number_of_workers = 2, chunk_size = 4)
+    for node in tree.get_list_of_nodes():
+      self.assertEqual(node.data['y'], node.data['x'] + 1)
+    in_pool = self.produce_recombining_tree()
+    in_pool.propagate_formula_up_in_parallel('x', self.average, {},
+        number_of_workers = 2, chunk_size = 2)
+    serial = self.produce_recombining_tree()
+    serial.propagate_formula_up('x', self.average, {})
+    for level in range(7):
+      np.testing.assert_array_equal(in_pool.get_column('x', level), serial.get_column('x', level))
+
+  def test_propagation_down_matches_serial_computation(self):
+    import numpy as np
+    move = FormulaOnDicts({
+        'parent_value': ('kwarg', 'parent_dict', 'x'),
+        'is_it_left_instead_of_right': ('kwarg', 'all_other_args', 'is_it_left_instead_of_right'),
+        'up_factor': ('kwarg', 'all_other_args', 'up_factor')},
+        inner_function = move_asset)
+    for sum_over_parents in [False, True]:
+      serial = FrozenRecombiningBinaryTree(6)
+      serial.set_column('x', 0, np.array([100.0]))
+      serial.propagate_formula_down('x', move, {'up_factor': 1.1}, sum_over_parents = sum_over_parents)
+      for chunk_size in [2, 4096]:
+        tree = FrozenRecombiningBinaryTree(6)
+        tree.set_column('x', 0, np.array([100.0]))
+        tree.propagate_formula_down_in_parallel('x', move, {'up_factor': 1.1},
+            number_of_workers = 2, chunk_size = chunk_size, sum_over_parents = sum_over_parents)
+        for level in range(7):
+          np.testing.assert_allclose(tree.get_column('x', level), serial.get_column('x', level))
+
+class TestFrozenBinaryTreeConstruction(unittest.TestCase):
+
+  def setUp(self):
+    self.root = BinaryNode('a', BinaryNode('b'), BinaryNode('c', None, BinaryNode('d')))
+
+  def test_initialization_from_root_list_and_addresses(self):
+    from_root = FrozenBinaryTree(self.root)
+    self.assertEqual(sorted(from_root.get_lra()), ['', 'l', 'r', 'rr'])
+    from_list = FrozenBinaryTree(list_of_nodes = [
+        self.root.right.right, self.root, self.root.left, self.root.right])
+    self.assertEqual(from_list.get_root().data, 'a')
+    from_both = FrozenBinaryTree(root = self.root, list_of_nodes = [
+        self.root, self.root.left, self.root.right, self.root.right.right])
+    self.assertEqual(len(from_both), 4)
+    from_addresses = FrozenBinaryTree(dict(from_root.get_lra()))
+    self.assertEqual(from_addresses.get_lra()['rr'].data, 'd')
+
+  def test_nodes_know_their_paths_and_children(self):
+    tree = FrozenBinaryTree(self.root)
+    for path, node in tree.get_lra().items():
+      self.assertEqual(node.path, path)
+    node_d = tree.navigate_tree_by_string(tree.get_root(), 'rr')
+    self.assertEqual(node_d.data, 'd')
+    self.assertIs(tree.get_parent_of_node_in_tree(node_d), tree.get_lra()['r'])
+
+  def test_perfect_tree_of_dicts_has_independent_dicts(self):
+    tree = FrozenPerfectBinaryTreeOfDicts.generate_perfect_binary_tree_of_empty_dicts(2)
+    self.assertEqual(len(tree), 7)
+    self.assertEqual(tree.get_height(), 2)
+    tree.get_root().data['key'] = 1
+    self.assertEqual(tree.get_lra()['l'].data, {})
+
+class TestPrintTreeInLines(unittest.TestCase):
+
+  def setUp(self):
+    root = BinaryNode('a', BinaryNode('b'), BinaryNode('c', None, BinaryNode('d')))
+    self.tree = FrozenBinaryTree(root)
+
+  def test_whole_tree(self):
+    lines = self.tree.print_tree_in_lines(3, 1, 1, 1, output_as = 'list_of_lines')
+    self.assertEqual(lines, [
+        '    a      ',
+        ' ┌──┴──┐   ',
+        ' b     c   ',
+        '       └─┐ ',
+        '         d '])
+
+  def test_longer_vertical_space(self):
+    lines = self.tree.print_tree_in_lines(1, 1, 1, 2, output_as = 'list_of_lines')
+    self.assertEqual(lines, [' a   ', ' │   ', '┌┴─┐ ', 'b  c ', '   │ ', '   └┐', '    d'])
+
+  def test_viewport(self):
+    lines = self.tree.print_tree_in_lines(3, 1, 1, 1, viewport = (0, 0, 3, 5),
+        output_as = 'list_of_lines')
+    self.assertEqual(lines, ['    a', ' ┌──┴', ' b   '])
+
+  def test_viewport_centered_at_path(self):
+    lines = self.tree.print_tree_in_lines(3, 1, 1, 1, viewport = (0, 0, 3, 5),
+        center_viewport_at_path = 'rr', output_as = 'list_of_lines')
+    self.assertEqual(lines, ['└─┐  ', '  d  ', '     '])
+
+  def test_keys_of_dicts_as_box_height(self):
+    tree = FrozenPerfectBinaryTreeOfDicts.generate_perfect_binary_tree_of_empty_dicts(1)
+    for path, node in tree.get_lra().items():
+      node.data.update({'name': path or 'root', 'value': len(path)})
+    lines = tree.print_tree_in_lines(0, ['name'], 2, 1, output_as = 'list_of_lines')
+    self.assertEqual(lines, ['   root   ', '  ┌──┴──┐ ', ' l     r  '])
+
+  def test_invalid_arguments(self):
+    with self.assertRaises(ValueError):
+      self.tree.print_tree_in_lines(-1, 1, 1, 1)
+    with self.assertRaises(ValueError):
+      self.tree.print_tree_in_lines(3, 0, 1, 1)
+    with self.assertRaises(ValueError):
+      self.tree.print_tree_in_lines(3, 1, 1, 1, viewport = (0, 0, 3, 5),
+          center_viewport_at_path = 'll')
+
+class TestBulkRenderingOfDicts(unittest.TestCase):
+
+  def setUp(self):
+    self.tree = FrozenPerfectBinaryTreeOfDicts.generate_perfect_binary_tree_of_empty_dicts(7)
+    for path, node in self.tree.get_lra().items():
+      node.data.update({'path': path or 'root', 'level': len(path), 'value': len(path)/3})
+
+  def test_bulk_lines_match_from_dict(self):
+    paths = list(self.tree.get_lra())
+    self.assertEqual(len(paths), 255)
+    for keys_to_print in [None, ['value', 'path']]:
+      for max_precision_for_floats in [None, 2]:
+        in_bulk = self.tree.produce_lines_of_boxes(paths, 3, keys_to_print,
+            max_precision_for_floats = max_precision_for_floats)
+        one_by_one = self.tree.produce_lines_of_boxes(paths, 3, keys_to_print, in_bulk = False,
+            max_precision_for_floats = max_precision_for_floats)
+        self.assertEqual(in_bulk, one_by_one)
+    for path, lines in zip(paths, self.tree.produce_lines_of_boxes(paths, 3)):
+      dictionary = self.tree.get_lra()[path].data
+      self.assertEqual(lines, StringBox.from_dict(dictionary).as_list_of_lines())
+    # Values which do not convert to float are shown as they are, in both ways
+    for node in self.tree.get_list_of_nodes():
+      node.data['value'] = None if len(node.path) % 2 else node.data['value']
+    in_bulk = self.tree.produce_lines_of_boxes(paths, 3, max_precision_for_floats = 2)
+    one_by_one = self.tree.produce_lines_of_boxes(paths, 3, in_bulk = False, max_precision_for_floats = 2)
+    self.assertEqual(in_bulk, one_by_one)
+    self.assertTrue(any('value: None' in lines for lines in in_bulk))
+
+  def test_rendered_boxes_are_from_dict_boxes(self):
+    lines = self.tree.print_tree_in_lines(0, 3, 1, 1, output_as = 'list_of_lines')
+    box_length = max(len(line) for dictionary in
+        [node.data for node in self.tree.get_list_of_nodes()]
+        for line in StringBox.from_dict(dictionary).as_list_of_lines())
+    root_lines = StringBox.from_dict(self.tree.get_root().data).as_list_of_lines()
+    for line, root_line in zip(lines, root_lines):
+      self.assertIn(root_line.center(box_length), line)
+    # Leaves are all in the last lines (sorted keys: level, path, value)
+    self.assertEqual(lines[-2].count('path: '), 128)
@@ -0,0 +1,68 @@
+########################################################################
+# DOCUMENTATION / README
+########################################################################
+
+# File belonging to software package "homemade_financial_instruments"
+# Implements financial instruments and solutions for pricing and hedging.
+
+# For more information on functionality, see README.md
+# For more information on bugs and planned features, see ISSUES.md
+# For more information on versioning, see RELEASES.md
+
+# Copyright (C) 2026 Eduardo Fischer
+
+# This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License version 3
+#as published by the Free Software Foundation. See LICENSE.
+# Alternatively, see https://www.gnu.org/licenses/.
+
+# This program is distributed in the hope that it will be useful,
+#but without any warranty; without even the implied warranty of
+#merchantability or fitness for a particular purpose.
+
+########################################################################
+
+
+import unittest
+
+import numpy as np
+
+from homemadefinancialinstruments.worlds import *
+
+class TestShortRateBinomialLatticeWorld(unittest.TestCase):
+
+  def setUp(self):
+    months = np.arange(1, 361)
+    self.zero_rates = 0.03 + 0.02*(1 - np.exp(-months/60)) - 0.004*np.sin(months/40)
+
+  def test_lattices_fit_zero_curve(self):
+    for model in ['ho_lee', 'black_derman_toy']:
+      world = ShortRateBinomialLatticeWorld(self.zero_rates, 0.01 if model == 'ho_lee' else 0.2,
+          1/12, model = model)
+      for number_of_steps in [1, 12, 120, 360]:
+        self.assertAlmostEqual(world.get_discount_factor(number_of_steps),
+            np.exp(-self.zero_rates[number_of_steps - 1]*number_of_steps/12), places = 12)
+      self.assertAlmostEqual(world.get_interest_rate(), self.zero_rates[0], places = 12)
+
+  def test_zero_coupon_bond_by_backward_induction(self):
+    world = ShortRateBinomialLatticeWorld(self.zero_rates[:60], 0.25, 1/12, model = 'black_derman_toy')
+    lattice = world.get_short_rate_lattice()
+    lattice.set_column('bond_value', 60, np.ones(61))
+    def discount_expectation(very_level_dict, left_child_dict, right_child_dict, all_other_args):
+      return very_level_dict['discount_factor']*(left_child_dict['bond_value']
+          + right_child_dict['bond_value'])/2
+    lattice.propagate_function_up('bond_value', discount_expectation)
+    self.assertAlmostEqual(lattice.get_column('bond_value', 0)[0], world.get_discount_factor(60),
+        places = 12)
+    # Rates of the Black-Derman-Toy model have constant ratios along a level
+    short_rates = lattice.get_column('short_rate', 30)
+    np.testing.assert_allclose(short_rates[1:]/short_rates[:-1], np.exp(2*0.25*np.sqrt(1/12)))
+
+  def test_invalid_arguments(self):
+    with self.assertRaises(ValueError):
+      ShortRateBinomialLatticeWorld([], 0.01, 1/12)
+    with self.assertRaises(ValueError):
+      ShortRateBinomialLatticeWorld([0.03], 0.01, 1/12, model = 'vasicek')
+    world = ShortRateBinomialLatticeWorld([0.05, 0.05], 0.01, 1,
+        are_zero_rates_discrete_instead_of_continuous = True)
+    self.assertAlmostEqual(world.get_discount_factor(2), 1/1.05**2, places = 12)